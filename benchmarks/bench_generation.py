@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark generate_stimuli against the bundled mock model server
+
+Example:
+    python benchmarks/bench_generation.py --iterations 20 --latency-mean 0.2 \
+        --settings '{"agent_2_individual_validation": true}'
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from multiprocessing import Value
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stimulus_generator.backend import generate_stimuli, get_timeout_pool  # noqa: E402
+from stimulus_generator.async_backend import run_async_generation  # noqa: E402
+from stimulus_generator.mock_server import MockServerProfile, start_mock_server_in_thread  # noqa: E402
+
+
+AGENT_1_PROPERTIES = {
+    "word_pair": {"type": "string"},
+    "supportive_context": {"type": "string"},
+    "neutral_context": {"type": "string"},
+}
+AGENT_2_PROPERTIES = {
+    "word_pair_valid": {"type": "boolean", "description": "The word pair differs only in length."},
+    "contexts_valid": {"type": "boolean", "description": "The supportive context predicts the word."},
+    "grammatical": {"type": "boolean", "description": "Both contexts are grammatical."},
+}
+AGENT_3_PROPERTIES = {
+    "predictability": {"type": "integer", "description": "How predictable the word is.", "minimum": 0, "maximum": 10},
+    "naturalness": {"type": "integer", "description": "How natural the contexts are.", "minimum": 0, "maximum": 10},
+}
+
+
+def build_settings(api_url, iterations, extra_settings):
+    settings = {
+        'agent_1_properties': AGENT_1_PROPERTIES,
+        'agent_2_properties': AGENT_2_PROPERTIES,
+        'agent_3_properties': AGENT_3_PROPERTIES,
+        'api_key': 'mock-key',
+        'model_choice': 'custom',
+        'apiUrl': api_url,
+        'modelName': 'mock-model',
+        'experiment_design': "Each item contains a word pair and two contexts.",
+        'previous_stimuli': [{
+            "word_pair": "math/mathematics",
+            "supportive_context": "The student solved the simple arithmetic problem using basic...",
+            "neutral_context": "The student was working on a problem that required..."
+        }],
+        'iteration': iterations,
+        'stop_event': threading.Event(),
+        'current_iteration': Value('i', 0),
+        'total_iterations': Value('i', 1),
+        'session_id': 'benchmark',
+        'websocket_callback': None,
+        'ablation': {"use_agent_2": True, "use_agent_3": True},
+        'response_cache': False,
+    }
+    settings.update(extra_settings)
+    return settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--async-engine", action="store_true",
+                        help="use async_generate_stimuli instead of generate_stimuli")
+    parser.add_argument("--settings", type=str, default="{}",
+                        help="extra generate_stimuli settings as JSON")
+    parser.add_argument("--profile", type=str,
+                        help="mock server profile JSON file")
+    parser.add_argument("--latency-mean", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    profile_options = {"latency_mean": args.latency_mean, "seed": args.seed}
+    if args.profile:
+        profile_options = MockServerProfile.from_file(args.profile).to_dict()
+    server, api_url, shutdown = start_mock_server_in_thread(
+        profile=MockServerProfile(**profile_options))
+
+    settings = build_settings(
+        api_url, args.iterations, json.loads(args.settings))
+    start = time.perf_counter()
+    if args.async_engine:
+        df, _ = run_async_generation(settings)
+    else:
+        df, _ = generate_stimuli(settings)
+    elapsed = time.perf_counter() - start
+    shutdown()
+
+    accepted = 0 if df is None else len(df)
+    mock_stats = server.get_stats()
+    print("=" * 60)
+    print(f"Accepted stimuli:        {accepted}/{args.iterations}")
+    print(f"Wall clock:              {elapsed:.2f} s")
+    if accepted:
+        print(f"Seconds per stimulus:    {elapsed / accepted:.3f}")
+        print(
+            f"Requests per stimulus:   {mock_stats['requests'] / accepted:.2f}")
+    print(f"Mock server:             {json.dumps(mock_stats)}")
+    if not args.async_engine:
+        print(
+            f"Timeout pool:            {json.dumps(get_timeout_pool().get_stats())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark the repetition check: linear check_stimulus_repetition vs RepetitionIndex,
+and the near-duplicate (MinHash LSH) filter
+
+Example:
+    python benchmarks/bench_repetition.py --items 100000 --checks 200
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stimulus_generator.backend import RepetitionIndex, check_stimulus_repetition  # noqa: E402
+from stimulus_generator.near_duplicates import NearDuplicateIndex  # noqa: E402
+
+
+FIELDS = ("word_pair", "supportive_context", "neutral_context")
+
+
+def make_stimulus(number, rng):
+    return {field: f"{field} {rng.random():.12f} Item {number}" for field in FIELDS}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--items", type=int, default=100000,
+                        help="seed + accepted stimuli already in the run")
+    parser.add_argument("--checks", type=int, default=200,
+                        help="candidate stimuli to check (half of them repeat an existing one)")
+    parser.add_argument("--near-duplicate-threshold", type=float, default=0.8)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    stimuli = [make_stimulus(number, rng) for number in range(args.items)]
+    candidates = []
+    for number in range(args.checks):
+        candidate = make_stimulus(args.items + number, rng)
+        if number % 2:
+            # repeat one dimension of an existing stimulus, in a different case
+            field = rng.choice(FIELDS)
+            candidate[field] = rng.choice(stimuli)[field].upper()
+        candidates.append(candidate)
+
+    start = time.perf_counter()
+    linear = [check_stimulus_repetition(candidate, stimuli)
+              for candidate in candidates]
+    linear_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = RepetitionIndex(stimuli)
+    build_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    indexed = [index.is_repetition(candidate) for candidate in candidates]
+    indexed_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for number in range(1000):
+        index.add(make_stimulus(args.items + args.checks + number, rng))
+    add_seconds = time.perf_counter() - start
+
+    near_duplicates = NearDuplicateIndex(threshold=args.near_duplicate_threshold)
+    start = time.perf_counter()
+    for stimulus in stimuli:
+        near_duplicates.add(stimulus)
+    near_build_seconds = time.perf_counter() - start
+    # reworded repeats: one character of an existing value changed
+    reworded = []
+    for candidate in candidates[:args.checks // 2]:
+        field = rng.choice(FIELDS)
+        value = rng.choice(stimuli)[field]
+        position = rng.randrange(len(value))
+        candidate = dict(candidate, **{field: value[:position] + "#" + value[position + 1:]})
+        reworded.append(candidate)
+    start = time.perf_counter()
+    near_found = sum(near_duplicates.find_duplicate(candidate) is not None
+                     for candidate in reworded)
+    near_seconds = time.perf_counter() - start
+
+    print("=" * 60)
+    print(f"Stimuli:                 {args.items} x {len(FIELDS)} fields")
+    print(f"Candidates checked:      {args.checks} ({sum(linear)} repetitions)")
+    print(f"Same answers:            {linear == indexed}")
+    print(
+        f"Linear scan:             {linear_seconds * 1000 / args.checks:.3f} ms per check")
+    print(
+        f"Index:                   {indexed_seconds * 1e6 / args.checks:.2f} us per check")
+    print(f"Index build:             {build_seconds:.3f} s (once per run)")
+    print(f"Index add:               {add_seconds * 1e6 / 1000:.2f} us per accepted stimulus")
+    print(
+        f"Near-duplicate filter:   {near_seconds * 1e6 / len(reworded):.0f} us per check, {near_found}/{len(reworded)} rewordings caught")
+    print(
+        f"Near-duplicate build:    {near_build_seconds:.1f} s ({near_build_seconds * 1e6 / args.items:.0f} us per stimulus)")
+
+
+if __name__ == "__main__":
+    main()
@@ -475,6 +475,10 @@ function handleLogMessage(type, message) {
             appendLogMessage(validatorLog, message);
             appendLogMessage(scorerLog, message);
             break;
+        case 'yield':
+            // Live acceptance rate of the regeneration loop
+            appendLogMessage(validatorLog, message);
+            break;
         case 'setup':
             // Send message to Console only
             console.log('Setup:', message);
@@ -6,7 +6,14 @@ import os
 import pickle
 from threading import Event, Thread, Lock
 from multiprocessing import Value
-from .backend import generate_stimuli, custom_model_inference_handler
+from .backend import generate_stimuli, custom_model_inference_handler, get_timeout_pool
+from .async_backend import run_async_generation
+from .response_cache import get_all_cache_stats
+from .rate_limit import get_request_scheduler
+from .concurrency import get_all_concurrency_stats
+from .hedging import get_all_hedging_stats
+from .circuit_breaker import get_all_circuit_stats
+from .load_balancer import get_all_balancer_stats
 from collections import defaultdict
 import io
 from flask_socketio import SocketIO, emit
@@ -291,6 +298,21 @@ def health_check():
     })
 
 
+@app.route("/api/engine_stats")
+def engine_stats():
+    """Expose API call execution statistics (per-call overhead etc.)"""
+    return jsonify({
+        "timeout_pool": get_timeout_pool().get_stats(),
+        "response_cache": get_all_cache_stats(),
+        "rate_limits": get_request_scheduler().get_stats(),
+        "concurrency": get_all_concurrency_stats(),
+        "hedging": get_all_hedging_stats(),
+        "circuit_breakers": get_all_circuit_stats(),
+        "load_balancers": get_all_balancer_stats(),
+        "timestamp": time.time()
+    })
+
+
 @app.route("/")
 def homepage():
     # Create a new session ID
@@ -400,8 +422,56 @@ def generate_stimulus(session_id):
             'total_iterations': session_state['total_iterations'],
             'session_id': session_id,
             'websocket_callback': session_websocket_callback,
+            'agent_1_candidates_per_call': data.get('agent1CandidatesPerCall', 1),
+            'context_policy': data.get('contextPolicy', 'all'),
+            'context_size': data.get('contextSize'),
+            'context_token_budget': data.get('contextTokenBudget'),
+            'context_max_pinned': data.get('contextMaxPinned'),
+            'near_duplicate_threshold': data.get('nearDuplicateThreshold'),
+            'near_duplicate_ngram': data.get('nearDuplicateNgram'),
+            'near_duplicate_shingles': data.get('nearDuplicateShingles'),
+            'near_duplicate_fields': data.get('nearDuplicateFields'),
             'agent_2_individual_validation': data.get('agent2IndividualValidation', False),
+            'agent_2_concurrent_validation': data.get('agent2ConcurrentValidation', False),
+            'agent_2_criteria_group_size': data.get('agent2CriteriaGroupSize', 1),
+            'agent_2_adaptive_order': data.get('agent2AdaptiveOrder', False),
+            'agent_2_batch_validation': data.get('agent2BatchValidation', False),
+            'agent_2_batch_size': data.get('agent2BatchSize', 8),
+            'agent_2_local_rules': data.get('agent2LocalRules'),
+            'rejection_cache': data.get('rejectionCache', 'run'),
+            'rejection_cache_path': data.get('rejectionCachePath'),
+            'retry_policy': data.get('retryPolicy', 'partial'),
+            'max_iteration_attempts': data.get('maxIterationAttempts', 100),
+            'max_run_attempts': data.get('maxRunAttempts'),
+            'max_attempts_per_stimulus': data.get('maxAttemptsPerStimulus'),
+            'retry_min_attempts': data.get('retryMinAttempts'),
             'agent_3_individual_scoring': data.get('agent3IndividualScoring', False),
+            'agent_3_scoring_concurrency': data.get('agent3ScoringConcurrency'),
+            'agent_3_batch_scoring': data.get('agent3BatchScoring', False),
+            'agent_3_batch_size': data.get('agent3BatchSize', 5),
+            'agent_3_flush_interval': data.get('agent3FlushInterval', 5.0),
+            'http_pool_size': data.get('httpPoolSize'),
+            'http_keep_alive': data.get('httpKeepAlive', True),
+            'prewarm_connections': data.get('prewarmConnections', 0),
+            'async_generation': data.get('asyncGeneration', False),
+            'async_concurrency': data.get('asyncConcurrency'),
+            'parallel_workers': data.get('parallelWorkers', 1),
+            'pipeline': data.get('pipeline', False),
+            'pipeline_generators': data.get('pipelineGenerators'),
+            'pipeline_validators': data.get('pipelineValidators'),
+            'pipeline_scorers': data.get('pipelineScorers'),
+            'pipeline_queue_size': data.get('pipelineQueueSize'),
+            'response_cache': data.get('responseCache', True),
+            'cache_generator': data.get('cacheGenerator', False),
+            'rate_limit_rpm': data.get('rateLimitRpm'),
+            'rate_limit_tpm': data.get('rateLimitTpm'),
+            'adaptive_concurrency': data.get('adaptiveConcurrency', True),
+            'concurrency_min': data.get('concurrencyMin'),
+            'concurrency_max': data.get('concurrencyMax'),
+            'hedge_requests': data.get('hedgeRequests', False),
+            'hedge_percentile': data.get('hedgePercentile'),
+            'hedge_budget': data.get('hedgeBudget'),
+            'circuit_max_wait': data.get('circuitMaxWait', 300),
         }
 
         # Add custom model parameters if custom model is selected
@@ -409,6 +479,16 @@ def generate_stimulus(session_id):
             settings['apiUrl'] = data.get('apiUrl', '')
             settings['modelName'] = data.get('modelName', '')
             settings['params'] = data.get('params', None)
+            # optional extra replicas / keys to spread the run over
+            if data.get('endpoints'):
+                settings['endpoints'] = [{
+                    'apiUrl': endpoint.get('apiUrl') or settings['apiUrl'],
+                    'api_key': endpoint.get('apiKey') or settings['api_key'],
+                    'modelName': endpoint.get('modelName') or settings['modelName'],
+                    'weight': endpoint.get('weight', 1),
+                } for endpoint in data['endpoints']]
+                settings['load_balancing'] = data.get(
+                    'loadBalancing', 'least_outstanding')
             print(
                 f"Session {session_id} - Custom model parameters: URL={settings['apiUrl']}, Model={settings['modelName']}")
 
@@ -467,7 +547,10 @@ def generate_stimulus(session_id):
                     "use_agent_2": True,
                     "use_agent_3": True
                 }
-                df, filename = generate_stimuli(settings)
+                if settings['async_generation']:
+                    df, filename = run_async_generation(settings)
+                else:
+                    df, filename = generate_stimuli(settings)
 
                 # Check if there is a stop signal again
                 if session_state['stop_event'].is_set():
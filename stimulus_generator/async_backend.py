@@ -0,0 +1,1144 @@
+"""
+Asyncio model clients and generation engine
+
+Async counterparts of the model clients, agents and generate_stimuli loop in backend.py.
+Every LLM request is a coroutine on one shared event loop, so many requests (across
+workers and sessions) can be in flight without a thread or subprocess per call.
+"""
+
+import asyncio
+import atexit
+import json
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+import openai
+import pandas as pd
+
+from .backend import (
+    AGENT_1_PROMPT_TEMPLATE,
+    AGENT_2_PROMPT_TEMPLATE,
+    AGENT_2_INDIVIDUAL_PROMPT_TEMPLATE,
+    AGENT_3_PROMPT_TEMPLATE,
+    AGENT_3_INDIVIDUAL_PROMPT_TEMPLATE,
+    RepetitionIndex,
+    _endpoint_key,
+    build_custom_request_data,
+    build_json_schema_format,
+    create_context_policy,
+    create_local_validator,
+    create_near_duplicate_index,
+    create_rejection_cache,
+    create_response_cache,
+    create_yield_tracker,
+    generate_scoring_requirements,
+    model_api_url,
+)
+from .response_cache import make_cache_key
+from .rate_limit import estimate_request_tokens, get_request_scheduler, limit_key
+from .concurrency import configure_concurrency, get_concurrency_controller
+from .circuit_breaker import CircuitOpenError, get_circuit_breaker, wait_until_available_async
+from .load_balancer import BalancerMember, EndpointBalancer, register_balancer
+from .hedging import (DEFAULT_HEDGE_BUDGET, DEFAULT_HEDGE_PERCENTILE, get_latency_tracker,
+                      request_kind, response_outcome, run_hedged_async)
+from .yield_tracker import REPORT_INTERVAL, RetryBudgetExceeded
+
+DEFAULT_ASYNC_POOL_SIZE = 100
+DEFAULT_ASYNC_CONCURRENCY = 8
+REQUEST_TIMEOUT = 60
+
+# generate_stimuli options the async engine does not implement, with their "off" value
+SYNC_ONLY_SETTINGS = {
+    'agent_1_candidates_per_call': 1,
+    'agent_2_batch_validation': False,
+    'agent_2_criteria_group_size': 1,
+    'agent_2_adaptive_order': False,
+    'agent_3_batch_scoring': False,
+    'parallel_workers': 1,
+    'pipeline': False,
+}
+
+
+# ======================
+# 1. Shared aiohttp sessions
+# ======================
+# One aiohttp session per (event loop, endpoint), shared by every async client on that loop
+_aiohttp_sessions = {}
+
+
+def get_aiohttp_session(api_url, pool_size=DEFAULT_ASYNC_POOL_SIZE):
+    """Get the shared aiohttp session for the endpoint of api_url on the running loop"""
+    loop = asyncio.get_running_loop()
+    key = (id(loop), _endpoint_key(api_url))
+    session = _aiohttp_sessions.get(key)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=pool_size, limit_per_host=pool_size)
+        session = aiohttp.ClientSession(connector=connector)
+        _aiohttp_sessions[key] = session
+    return session
+
+
+async def close_aiohttp_sessions():
+    """Close the sessions created on the running loop"""
+    loop_id = id(asyncio.get_running_loop())
+    for key in [key for key in _aiohttp_sessions if key[0] == loop_id]:
+        await _aiohttp_sessions.pop(key).close()
+
+
+# ======================
+# 2. Abstract Async Model Client Interface
+# ======================
+class AsyncModelClient(ABC):
+    """Abstract base class for asyncio model clients"""
+
+    @abstractmethod
+    async def generate_completion(self, prompt, properties, params=None):
+        """Generate a completion with JSON schema response format"""
+        pass
+
+    @abstractmethod
+    def get_default_params(self):
+        """Get default parameters for this model"""
+        pass
+
+    def get_model_identity(self):
+        """Identify the model behind this client (used in response cache keys)"""
+        return type(self).__name__
+
+    def get_endpoints(self):
+        """URLs of the model endpoints this client sends requests to"""
+        return []
+
+    # session the client works for, used to share rate limits fairly between sessions
+    session_id = None
+    # adapt the number of concurrent requests to the endpoint's health (AIMD)
+    adaptive_concurrency = True
+    # websocket_callback(message_type, message) of the session, for request-layer events
+    websocket_callback = None
+    # hedge slow requests with a duplicate (see hedging.py)
+    hedge_requests = False
+    hedge_percentile = DEFAULT_HEDGE_PERCENTILE
+    hedge_budget = DEFAULT_HEDGE_BUDGET
+
+    def _notify(self, message_type, message):
+        print(message)
+        if self.websocket_callback:
+            # the callback may block on socket I/O, keep it off the shared event loop
+            asyncio.get_running_loop().run_in_executor(
+                None, self.websocket_callback, message_type, message)
+
+    async def _send_with_retries(self, label, api_call, api_url, estimated_tokens, kind="generator"):
+        """
+        Async counterpart of ModelClient._send_with_retries: api_call() is a coroutine
+        function returning {"status_code", "headers", "json", "text"}.
+        """
+        scheduler = get_request_scheduler()
+        rate_limit_key = limit_key(api_url, self.api_key)
+        controller = get_concurrency_controller(
+            _endpoint_key(api_url)) if self.adaptive_concurrency else None
+        breaker = get_circuit_breaker(_endpoint_key(api_url))
+
+        async def send(hedged=False):
+            if not hedged:
+                return await asyncio.wait_for(api_call(), REQUEST_TIMEOUT)
+            # the primary request already holds its rate-limit grant and concurrency slot,
+            # a hedge needs its own
+            if controller:
+                await controller.acquire_async()
+            outcome = "cancelled"
+            start = time.perf_counter()
+            try:
+                await scheduler.acquire_async(rate_limit_key, estimated_tokens, self.session_id)
+                outcome = "error"
+                start = time.perf_counter()
+                result = await asyncio.wait_for(api_call(), REQUEST_TIMEOUT)
+                outcome = response_outcome(result)
+                return result
+            except asyncio.TimeoutError:
+                outcome = "timeout"
+                raise
+            except (aiohttp.ClientConnectionError, openai.error.APIConnectionError):
+                outcome = "connection_error"
+                raise
+            finally:
+                if controller:
+                    message = controller.release(outcome, time.perf_counter() - start)
+                    if message:
+                        self._notify("concurrency", message)
+
+        # retry mechanism
+        backoff = 0
+        for attempt in range(3):
+            if backoff:
+                await asyncio.sleep(backoff)
+                backoff = 0
+            if not breaker.allow_request():
+                message = f"{label} API endpoint {_endpoint_key(api_url)} unavailable (circuit open, next probe in {breaker.retry_in():.0f}s)"
+                print(message)
+                return {"error": message}
+
+            outcome = "error"
+            start = time.perf_counter()
+            if controller:
+                await controller.acquire_async()
+            try:
+                await scheduler.acquire_async(rate_limit_key, estimated_tokens, self.session_id)
+                start = time.perf_counter()
+                if self.hedge_requests:
+                    result = await run_hedged_async(
+                        send, get_latency_tracker(
+                            f"{_endpoint_key(api_url)}|{kind}"),
+                        self.hedge_percentile, self.hedge_budget)
+                else:
+                    result = await send()
+
+                # hedged calls report their failures as {"error": ...} instead of raising
+                if "error" in result:
+                    outcome = "timeout" if "timed out" in result["error"] else "connection_error"
+                    print(f"{label} API {outcome.replace('_', ' ')} attempt {attempt + 1}/3: {result['error']}")
+                    if attempt == 2:
+                        return {"error": f"API {outcome.replace('_', ' ')} after 3 attempts: {result['error']}"}
+                    backoff = 2 ** attempt
+                    continue
+
+                body = result.get("json")
+                usage = body.get("usage") if isinstance(body, dict) else None
+                scheduler.record_response(
+                    rate_limit_key, result["status_code"], result.get("headers"),
+                    (usage or {}).get("total_tokens"), estimated_tokens)
+
+                if result["status_code"] == 429:
+                    outcome = "rate_limited"
+                    print(f"{label} API rate limited attempt {attempt + 1}/3")
+                    if attempt == 2:
+                        return {"error": "API rate limited after 3 attempts"}
+                    continue
+                if result["status_code"] >= 400:
+                    outcome = "server_error" if result["status_code"] >= 500 else "error"
+                    raise RuntimeError(
+                        f"{result['status_code']} error: {result.get('text', '')}")
+
+                outcome = "success"
+                content = body["choices"][0]["message"]["content"]
+                return json.loads(content)
+            except asyncio.CancelledError:
+                # abandoned by the caller, says nothing about the endpoint
+                outcome = "cancelled"
+                raise
+            except (json.JSONDecodeError, KeyError, TypeError) as e:
+                print(f"{label} API parsing error attempt {attempt + 1}/3: {e}")
+                if attempt == 2:
+                    return {"error": f"API parsing error after 3 attempts: {str(e)}"}
+                backoff = 2 ** attempt
+            except asyncio.TimeoutError:
+                outcome = "timeout"
+                print(f"{label} API timeout attempt {attempt + 1}/3")
+                if attempt == 2:
+                    return {"error": "API timeout after 3 attempts"}
+                backoff = 2 ** attempt
+            except (aiohttp.ClientConnectionError, openai.error.APIConnectionError) as e:
+                outcome = "connection_error"
+                print(f"{label} API connection error attempt {attempt + 1}/3: {e}")
+                if attempt == 2:
+                    return {"error": f"API connection error after 3 attempts: {str(e)}"}
+                backoff = 2 ** attempt
+            except Exception as e:
+                print(f"{label} API error attempt {attempt + 1}/3: {e}")
+                if attempt == 2:
+                    return {"error": f"API error after 3 attempts: {str(e)}"}
+                backoff = 2 ** attempt
+            finally:
+                if controller:
+                    message = controller.release(
+                        outcome, time.perf_counter() - start)
+                    if message:
+                        self._notify("concurrency", message)
+                message = breaker.record(outcome)
+                if message:
+                    self._notify("circuit", message)
+
+
+# ======================
+# 3. Concrete Async Model Client Implementations
+# ======================
+class AsyncOpenAIClient(AsyncModelClient):
+    """OpenAI GPT model client (asyncio)"""
+
+    API_BASE = "https://api.openai.com/v1"
+
+    def __init__(self, api_key=None, pool_size=DEFAULT_ASYNC_POOL_SIZE):
+        self.api_key = api_key
+        self.pool_size = pool_size
+        if not api_key:
+            print("Warning: No OpenAI API key provided!")
+
+    async def _api_call(self, prompt, properties, params):
+        openai.aiosession.set(get_aiohttp_session(
+            self.API_BASE, self.pool_size))
+        # the requestor keeps the response headers, see OpenAIClient._api_call
+        requestor = openai.api_requestor.APIRequestor(
+            key=self.api_key, api_base=self.API_BASE)
+        try:
+            response, _, _ = await requestor.arequest("post", "/chat/completions", params={
+                "model": params["model"],
+                "messages": [{"role": "user", "content": prompt}],
+                "response_format": build_json_schema_format(properties)
+            })
+        except openai.error.OpenAIError as e:
+            if e.http_status is None:
+                raise
+            return {"status_code": e.http_status, "headers": dict(e.headers or {}),
+                    "json": None, "text": str(e)}
+        return {"status_code": 200, "headers": dict(response._headers or {}),
+                "json": response.data, "text": ""}
+
+    async def generate_completion(self, prompt, properties, params=None):
+        """Generate completion using OpenAI API"""
+        if params is None:
+            params = self.get_default_params()
+
+        return await self._send_with_retries(
+            "OpenAI", lambda: self._api_call(prompt, properties, params),
+            self.API_BASE,
+            estimate_request_tokens([{"content": prompt}], params),
+            request_kind(properties))
+
+    def get_default_params(self):
+        return {"model": "gpt-4o"}
+
+    def get_model_identity(self):
+        return "openai"
+
+    def get_endpoints(self):
+        return [self.API_BASE]
+
+
+class AsyncCustomModelClient(AsyncModelClient):
+    """Custom model client for user-defined APIs (asyncio)"""
+
+    def __init__(self, api_url, api_key, model_name, pool_size=DEFAULT_ASYNC_POOL_SIZE):
+        self.api_url = api_url
+        self.api_key = api_key
+        self.model_name = model_name
+        self.pool_size = pool_size
+
+    async def _api_call(self, request_data, headers):
+        session = get_aiohttp_session(self.api_url, self.pool_size)
+        async with session.post(self.api_url, headers=headers, json=request_data) as response:
+            text = await response.text()
+            try:
+                body = json.loads(text)
+            except ValueError:
+                body = None
+            return {
+                "status_code": response.status,
+                "headers": dict(response.headers),
+                "json": body,
+                "text": text[:500] if response.status >= 400 else ""
+            }
+
+    async def generate_completion(self, prompt, properties, params=None):
+        request_data = build_custom_request_data(
+            self.api_url, self.model_name, prompt, properties, params)
+
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+        return await self._send_with_retries(
+            "Custom", lambda: self._api_call(request_data, headers),
+            self.api_url,
+            estimate_request_tokens(request_data["messages"], request_data),
+            request_kind(properties))
+
+    def get_default_params(self):
+        return {
+        }
+
+    def get_model_identity(self):
+        return f"{self.api_url.strip()}|{self.model_name}"
+
+    def get_endpoints(self):
+        return [self.api_url]
+
+
+class AsyncLoadBalancedModelClient(AsyncModelClient):
+    """Spreads requests over several endpoints / API keys serving the same model (asyncio)"""
+
+    def __init__(self, members, strategy="least_outstanding"):
+        self.balancer = EndpointBalancer(members, strategy)
+        register_balancer(self.balancer)
+
+    async def generate_completion(self, prompt, properties, params=None):
+        tried = set()
+        result = {"error": "No endpoint available"}
+        # fail over to another member once if the chosen one fails
+        for _ in range(min(2, len(self.balancer.members))):
+            member = self.balancer.acquire(exclude=tried)
+            if member is None:
+                break
+            tried.add(member.name)
+            start = time.perf_counter()
+            ok = False
+            try:
+                result = await member.client.generate_completion(prompt, properties, params)
+                ok = not (isinstance(result, dict) and "error" in result)
+            except asyncio.CancelledError:
+                # the caller abandoned the request, not the member's fault
+                ok = None
+                raise
+            finally:
+                message = self.balancer.release(
+                    member, time.perf_counter() - start, ok)
+                if message:
+                    self._notify("load_balancer", message)
+            if ok:
+                return result
+            print(f"Request via {member.name} failed, trying another endpoint")
+        return result
+
+    def get_default_params(self):
+        return self.balancer.members[0].client.get_default_params()
+
+    def get_model_identity(self):
+        # replicas of the same model may share cached responses
+        model_names = sorted({member.client.model_name for member in self.balancer.members})
+        return f"pool|{','.join(model_names)}"
+
+    def get_endpoints(self):
+        return [member.client.api_url for member in self.balancer.members]
+
+
+def create_async_model_client(model_choice, settings=None):
+    """Factory function to create appropriate async model client"""
+    if model_choice == 'custom' and settings and settings.get('endpoints'):
+        members = []
+        for endpoint in settings['endpoints']:
+            member_settings = dict(settings, endpoints=None)
+            member_settings.update(
+                {key: value for key, value in endpoint.items() if key != 'weight' and value})
+            member = create_async_model_client('custom', member_settings)
+            members.append(BalancerMember(
+                member, f"{limit_key(member.api_url, member.api_key)}|{member.model_name}",
+                _endpoint_key(member.api_url), endpoint.get('weight', 1)))
+        client = AsyncLoadBalancedModelClient(
+            members, settings.get('load_balancing') or "least_outstanding")
+        client.session_id = settings.get('session_id')
+        client.websocket_callback = settings.get('websocket_callback')
+        return client
+
+    client = _create_async_model_client(model_choice, settings)
+    if settings:
+        client.session_id = settings.get('session_id')
+        client.websocket_callback = settings.get('websocket_callback')
+        client.adaptive_concurrency = settings.get(
+            'adaptive_concurrency', True) is not False
+        client.hedge_requests = bool(settings.get('hedge_requests'))
+        if settings.get('hedge_percentile'):
+            client.hedge_percentile = float(settings['hedge_percentile'])
+        if settings.get('hedge_budget') is not None:
+            client.hedge_budget = float(settings['hedge_budget'])
+        if settings.get('concurrency_min') or settings.get('concurrency_max'):
+            configure_concurrency(_endpoint_key(model_api_url(model_choice, settings)), settings.get(
+                'concurrency_min'), settings.get('concurrency_max'))
+        if settings.get('rate_limit_rpm') or settings.get('rate_limit_tpm'):
+            get_request_scheduler().configure(
+                limit_key(model_api_url(model_choice, settings),
+                          settings.get('api_key')),
+                rpm=settings.get('rate_limit_rpm'),
+                tpm=settings.get('rate_limit_tpm'))
+    return client
+
+
+def _create_async_model_client(model_choice, settings=None):
+    pool_size = int((settings or {}).get(
+        'http_pool_size') or DEFAULT_ASYNC_POOL_SIZE)
+    if model_choice == 'GPT-4o':
+        api_key = settings.get('api_key') if settings else None
+        return AsyncOpenAIClient(api_key, pool_size)
+    elif model_choice == 'custom':
+        if not settings:
+            raise ValueError("Settings required for custom model")
+        return AsyncCustomModelClient(
+            api_url=settings.get('apiUrl'),
+            api_key=settings.get('api_key'),
+            model_name=settings.get('modelName'),
+            pool_size=pool_size
+        )
+    else:
+        raise ValueError(f"Unsupported model choice: {model_choice}")
+
+
+async def async_request_completion(model_client, prompt, properties, params=None, response_cache=None):
+    """Await model_client.generate_completion, going through response_cache when one is given"""
+    if response_cache is None:
+        return await model_client.generate_completion(prompt, properties, params)
+    key = make_cache_key(model_client.get_model_identity(),
+                         prompt, properties, params)
+    return await response_cache.get_or_compute_async(
+        key, lambda: model_client.generate_completion(prompt, properties, params))
+
+
+# ======================
+# 4. Async Agent Functions
+# ======================
+async def async_agent_1_generate_stimulus(
+        model_client,
+        experiment_design,
+        previous_stimuli,
+        properties,
+        prompt_template=AGENT_1_PROMPT_TEMPLATE,
+        params=None,
+        stop_event=None,
+        response_cache=None):
+    """
+    Agent 1: Generate new stimulus using the provided async model client
+    """
+    if stop_event and stop_event.is_set():
+        return {"stimulus": "STOPPED"}
+
+    generation_requirements = "Please generate a new stimulus in the same format as the existing stimuli, and ensure that the new stimulus is different from those in the existing stimuli."
+
+    prompt = prompt_template.format(
+        experiment_design=experiment_design,
+        previous_stimuli=previous_stimuli,
+        generation_requirements=generation_requirements
+    )
+
+    try:
+        result = await async_request_completion(
+            model_client, prompt, properties, params, response_cache)
+
+        if stop_event and stop_event.is_set():
+            return {"stimulus": "STOPPED"}
+
+        if "error" in result:
+            return {"stimulus": "ERROR/ERROR"}
+
+        return result
+    except Exception as e:
+        print(f"Error in async_agent_1_generate_stimulus: {e}")
+        return {"stimulus": "ERROR/ERROR"}
+
+
+async def async_agent_2_validate_stimulus(
+        model_client,
+        new_stimulus,
+        experiment_design,
+        properties,
+        prompt_template=AGENT_2_PROMPT_TEMPLATE,
+        stop_event=None,
+        response_cache=None):
+    """
+    Agent 2: Validate experimental stimulus using the provided async model client
+    """
+    if stop_event and stop_event.is_set():
+        return {"error": "Stopped by user"}
+
+    prompt = prompt_template.format(
+        experiment_design=experiment_design,
+        new_stimulus=new_stimulus
+    )
+
+    try:
+        fixed_params = model_client.get_default_params()
+        fixed_params["temperature"] = 0
+        result = await async_request_completion(
+            model_client, prompt, properties, fixed_params, response_cache)
+
+        if stop_event and stop_event.is_set():
+            return {"error": "Stopped by user"}
+
+        if "error" in result:
+            print(f"Agent 2 API error: {result}")
+            return {"error": f"Failed to validate stimulus: {result.get('error', 'Unknown error')}"}
+
+        return result
+    except Exception as e:
+        print(f"Error in async_agent_2_validate_stimulus: {e}")
+        return {"error": "Failed to validate stimulus"}
+
+
+async def async_agent_2_validate_stimulus_individual(
+        model_client,
+        new_stimulus,
+        experiment_design,
+        properties,
+        stop_event=None,
+        websocket_callback=None,
+        response_cache=None):
+    """
+    Agent 2: Validate each criterion in its own request, all criteria in flight at once.
+    Outstanding checks are cancelled as soon as one criterion fails.
+    """
+    if stop_event and stop_event.is_set():
+        return {"error": "Stopped by user"}
+
+    async def check_criterion(property_name, property_description):
+        prompt = AGENT_2_INDIVIDUAL_PROMPT_TEMPLATE.format(
+            new_stimulus=new_stimulus,
+            experiment_design=experiment_design,
+            property_name=property_name,
+            property_description=property_description
+        )
+        fixed_params = model_client.get_default_params()
+        fixed_params["temperature"] = 0
+        result = await async_request_completion(
+            model_client, prompt, {property_name: property_description}, fixed_params,
+            response_cache)
+        return property_name, result
+
+    validation_results = {}
+    tasks = [asyncio.ensure_future(check_criterion(name, description))
+             for name, description in properties.items()]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            property_name, result = await next_done
+
+            if stop_event and stop_event.is_set():
+                return {"error": "Stopped by user"}
+
+            if "error" in result:
+                if websocket_callback:
+                    websocket_callback(
+                        "validator", f"Error validating criterion {property_name}: {result.get('error', 'Unknown error')}")
+                return {"error": f"Failed to validate criterion {property_name}: {result.get('error', 'Unknown error')}"}
+
+            passed = bool(result.get(property_name, False))
+            validation_results[property_name] = passed
+            if websocket_callback:
+                websocket_callback(
+                    "validator", f"Criterion {property_name}: {'PASSED' if passed else 'FAILED'}")
+            if not passed:
+                if websocket_callback:
+                    websocket_callback(
+                        "validator", f"Early rejection: Criterion {property_name} failed. Stopping validation.")
+                return validation_results
+
+        if websocket_callback:
+            websocket_callback(
+                "validator", "All criteria passed successfully!")
+        return validation_results
+    except Exception as e:
+        print(f"Error in async_agent_2_validate_stimulus_individual: {e}")
+        return {"error": "Failed to validate stimulus individually"}
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def async_agent_3_score_stimulus(
+        model_client,
+        valid_stimulus,
+        experiment_design,
+        properties,
+        prompt_template=AGENT_3_PROMPT_TEMPLATE,
+        stop_event=None,
+        response_cache=None):
+    """
+    Agent 3: Score experimental stimulus using the provided async model client
+    """
+    if stop_event and stop_event.is_set():
+        return {field: 0 for field in properties.keys()} if properties else {}
+
+    prompt = prompt_template.format(
+        experiment_design=experiment_design,
+        valid_stimulus=valid_stimulus,
+        scoring_requirements=generate_scoring_requirements(properties)
+    )
+
+    try:
+        fixed_params = model_client.get_default_params()
+        fixed_params["temperature"] = 0
+        result = await async_request_completion(
+            model_client, prompt, properties, fixed_params, response_cache)
+
+        if "error" in result:
+            print(f"Agent 3 API error: {result}")
+            return {field: 0 for field in properties.keys()}
+
+        return result
+    except Exception as e:
+        print(f"Error in async_agent_3_score_stimulus: {e}")
+        return {field: 0 for field in properties.keys()}
+
+
+async def async_agent_3_score_stimulus_individual(
+        model_client,
+        valid_stimulus,
+        experiment_design,
+        properties,
+        stop_event=None,
+        websocket_callback=None,
+        response_cache=None):
+    """
+    Agent 3: Score each aspect in its own request, all aspects in flight at once
+    """
+    if stop_event and stop_event.is_set():
+        return {field: 0 for field in properties.keys()} if properties else {}
+
+    async def score_aspect(aspect_name, aspect_details):
+        min_score = aspect_details.get('minimum', 0)
+        max_score = aspect_details.get('maximum', 10)
+        description = aspect_details.get('description', aspect_name)
+        prompt = AGENT_3_INDIVIDUAL_PROMPT_TEMPLATE.format(
+            valid_stimulus=valid_stimulus,
+            experiment_design=experiment_design,
+            aspect_name=aspect_name,
+            aspect_description=description,
+            min_score=min_score,
+            max_score=max_score
+        )
+        single_aspect = {aspect_name: {
+            'type': 'integer',
+            'description': description,
+            'minimum': min_score,
+            'maximum': max_score
+        }}
+        fixed_params = model_client.get_default_params()
+        fixed_params["temperature"] = 0
+        try:
+            result = await async_request_completion(
+                model_client, prompt, single_aspect, fixed_params, response_cache)
+        except Exception as e:
+            result = {"error": str(e)}
+
+        score = result.get(aspect_name) if "error" not in result else None
+        if isinstance(score, (int, float)):
+            score = max(min_score, min(max_score, int(score)))
+        else:
+            score = 0
+        if websocket_callback:
+            websocket_callback(
+                "scorer", f"Aspect {aspect_name}: {score}/{max_score}")
+        return aspect_name, score
+
+    results = await asyncio.gather(
+        *(score_aspect(name, details) for name, details in properties.items()))
+    scoring_results = dict(results)
+
+    if websocket_callback:
+        total_score = sum(scoring_results.values())
+        max_possible = sum(aspect_details.get('maximum', 10)
+                           for aspect_details in properties.values())
+        websocket_callback(
+            "scorer", f"Individual scoring completed! Total: {total_score}/{max_possible}")
+    return scoring_results
+
+
+# ======================
+# 5. Async Main Flow Function
+# ======================
+async def async_generate_stimuli(settings):
+    """
+    Async version of generate_stimuli: `async_concurrency` workers each run the
+    generate -> validate -> score loop on one event loop, sharing the accepted stimuli.
+    Callbacks and cache I/O run on threads, so they never stall the other sessions on the loop.
+    """
+    # websocket and progress callbacks may block (socket I/O, session files); they run in
+    # order on one thread of their own
+    callback_executor = ThreadPoolExecutor(
+        max_workers=1, thread_name_prefix=f"async-callbacks-{settings.get('session_id', 'default')}")
+    try:
+        return await _async_generate_stimuli(settings, callback_executor)
+    finally:
+        # deliver the remaining messages without blocking the loop
+        await asyncio.get_running_loop().run_in_executor(None, callback_executor.shutdown)
+
+
+async def _async_generate_stimuli(settings, callback_executor):
+    loop = asyncio.get_running_loop()
+    stop_event = settings['stop_event']
+    current_iteration = settings['current_iteration']
+    total_iterations = settings['total_iterations']
+    experiment_design = settings['experiment_design']
+    previous_stimuli = settings['previous_stimuli'] if settings['previous_stimuli'] else [
+    ]
+    model_choice = settings.get('model_choice', 'GPT-4o')
+    ablation = settings.get('ablation', {
+        "use_agent_2": True,
+        "use_agent_3": True
+    })
+    custom_params = settings.get('params', None)
+    session_update_callback = settings.get('session_update_callback')
+    websocket_callback = None
+    if settings.get('websocket_callback'):
+        def websocket_callback(message_type, message):
+            callback_executor.submit(
+                settings['websocket_callback'], message_type, message)
+    agent_1_properties = settings.get('agent_1_properties', {})
+    agent_2_properties = settings.get('agent_2_properties', {})
+    agent_3_properties = settings.get('agent_3_properties', {})
+    individual_validation = settings.get(
+        'agent_2_individual_validation', False)
+    individual_scoring = settings.get('agent_3_individual_scoring', False)
+
+    def send(message_type, message):
+        print(message)
+        if websocket_callback:
+            websocket_callback(message_type, message)
+
+    try:
+        repetition_index = RepetitionIndex(
+            previous_stimuli, create_near_duplicate_index(settings))
+    except ValueError as e:
+        send("setup", f"Invalid near-duplicate settings: {str(e)}")
+        return None, None
+    # Which existing stimuli the generator sees (the seed stimuli the run started with stay pinned)
+    try:
+        context_policy = create_context_policy(settings, len(previous_stimuli))
+    except ValueError as e:
+        send("setup", f"Invalid prompt context settings: {str(e)}")
+        return None, None
+    try:
+        local_validator = create_local_validator(settings)
+    except ValueError as e:
+        send("setup", f"Invalid local validation rules: {str(e)}")
+        return None, None
+    model_properties = agent_2_properties
+    if local_validator is not None:
+        model_properties = local_validator.model_properties(agent_2_properties)
+    try:
+        rejection_cache = await loop.run_in_executor(
+            None, create_rejection_cache, settings, model_properties)
+    except Exception as e:
+        print(f"Rejection cache unavailable, continuing without it: {e}")
+        rejection_cache = None
+    try:
+        yield_tracker = create_yield_tracker(settings)
+    except ValueError as e:
+        send("setup", f"Invalid retry settings: {str(e)}")
+        return None, None
+    ignored = [name for name, off in SYNC_ONLY_SETTINGS.items()
+               if settings.get(name) and settings.get(name) != off]
+    if ignored:
+        send("setup",
+             f"Not supported by the async engine, ignoring: {', '.join(ignored)}")
+
+    with current_iteration.get_lock(), total_iterations.get_lock():
+        current_iteration.value = 0
+        total_iterations.value = settings['iteration']
+    if session_update_callback:
+        callback_executor.submit(session_update_callback)
+
+    if stop_event.is_set():
+        send("all", "Generation stopped before starting.")
+        return None, None
+
+    try:
+        model_client = create_async_model_client(model_choice, settings)
+        send("setup", f"Using model: {model_choice} (async engine)")
+    except Exception as e:
+        send("setup", f"Failed to create model client: {str(e)}")
+        return None, None
+
+    # Deterministic (temperature=0) validator and scorer calls go through the response cache,
+    # generator calls only when explicitly enabled
+    try:
+        response_cache = await loop.run_in_executor(None, create_response_cache, settings)
+    except Exception as e:
+        print(f"Response cache unavailable, continuing without it: {e}")
+        response_cache = None
+    generator_cache = response_cache if settings.get(
+        'cache_generator', False) else None
+
+    total_iter_value = total_iterations.value
+    concurrency = max(1, min(int(settings.get('async_concurrency')
+                                 or DEFAULT_ASYNC_CONCURRENCY), total_iter_value))
+    record_list = []
+    counters = {"claimed": 0, "repetition_count": 0, "validation_fails": 0}
+
+    endpoints = sorted({_endpoint_key(api_url)
+                        for api_url in model_client.get_endpoints()})
+    circuit_breakers = [get_circuit_breaker(endpoint) for endpoint in endpoints]
+    circuit_max_wait = float(settings.get('circuit_max_wait', 300))
+
+    async def wait_for_endpoint(worker_id):
+        """Pause while every endpoint's circuit is open instead of failing every iteration"""
+        if not circuit_breakers or any(breaker.is_available() for breaker in circuit_breakers):
+            return
+        send("circuit",
+             f"[Worker {worker_id}] Model endpoint {', '.join(endpoints)} is unavailable (circuit open), next probe in {min(b.retry_in() for b in circuit_breakers):.0f}s...")
+        if not await wait_until_available_async(circuit_breakers, stop_event, circuit_max_wait) \
+                and not stop_event.is_set():
+            raise CircuitOpenError(
+                f"Model endpoint {', '.join(endpoints)} still unavailable after {circuit_max_wait:.0f}s")
+
+    def update_progress():
+        with current_iteration.get_lock(), total_iterations.get_lock():
+            current_iteration.value = min(
+                len(record_list), total_iterations.value)
+        if session_update_callback:
+            callback_executor.submit(session_update_callback)
+
+    def track_attempt(worker_id, outcome, failed_criteria=()):
+        """Record an attempt and stream the yield; True when a retry budget ended the run"""
+        action, reason = yield_tracker.record(
+            outcome, failed_criteria, worker_id)
+        if outcome == "accepted" or yield_tracker.attempts % REPORT_INTERVAL == 0:
+            send("yield", yield_tracker.describe())
+        if action is None:
+            return False
+        if reason is None:
+            return True  # the run is already ending, and was reported
+        budget_msg = f"Retry budget exceeded: {reason}"
+        if action == "partial":
+            budget_msg += ", returning the stimuli accepted so far"
+        send("all", budget_msg)
+        if action == "abort":
+            raise RetryBudgetExceeded(budget_msg)
+        return action == "partial"
+
+    async def produce_one(worker_id):
+        """
+        Run the regeneration loop until one stimulus is accepted (None when stopped or a
+        retry budget ended the run)
+        """
+        while not stop_event.is_set() and not yield_tracker.exhausted:
+            await wait_for_endpoint(worker_id)
+            if stop_event.is_set():
+                return None
+            stimuli = await async_agent_1_generate_stimulus(
+                model_client, experiment_design, context_policy.select(previous_stimuli), agent_1_properties,
+                params=custom_params, stop_event=stop_event, response_cache=generator_cache)
+            if stop_event.is_set():
+                return None
+            send("generator",
+                 f"[Worker {worker_id}] Generator's Output: {json.dumps(stimuli, indent=2)}")
+
+            if repetition_index.is_repetition(stimuli):
+                counters["repetition_count"] += 1
+                if ablation["use_agent_2"]:
+                    send("generator",
+                         f"[Worker {worker_id}] Detected repeated stimulus, regenerating...")
+                    if track_attempt(worker_id, "repetition"):
+                        return None
+                    continue
+
+            # local rules first, then known rejections, the model validator only checks
+            # the remaining criteria of new candidates
+            local_result, reasons = local_validator.check(
+                stimuli) if local_validator is not None else ({}, {})
+            known_failures = await loop.run_in_executor(
+                None, rejection_cache.lookup, stimuli) if rejection_cache is not None and not reasons else None
+            if reasons:
+                send("validator", f"[Worker {worker_id}] Rejected by local rules: " + "; ".join(
+                    f"{name} ({reason})" for name, reason in reasons.items()))
+                validation_result = local_result
+            elif local_validator is not None and not model_properties:
+                validation_result = local_result
+            elif known_failures is not None:
+                send("validator",
+                     f"[Worker {worker_id}] Candidate was already rejected ({', '.join(known_failures)}), skipping validation")
+                validation_result = {name: False for name in known_failures}
+            else:
+                if individual_validation:
+                    validation_result = await async_agent_2_validate_stimulus_individual(
+                        model_client, stimuli, experiment_design, model_properties,
+                        stop_event=stop_event, websocket_callback=websocket_callback,
+                        response_cache=response_cache)
+                else:
+                    validation_result = await async_agent_2_validate_stimulus(
+                        model_client, stimuli, experiment_design, model_properties,
+                        stop_event=stop_event, response_cache=response_cache)
+                if rejection_cache is not None and 'error' not in validation_result:
+                    await loop.run_in_executor(
+                        None, rejection_cache.add, stimuli,
+                        [name for name, value in validation_result.items() if not value])
+            if local_result and 'error' not in validation_result:
+                validation_result = {**local_result, **validation_result}
+            if stop_event.is_set():
+                return None
+            send("validator",
+                 f"[Worker {worker_id}] Validator's Output: {json.dumps(validation_result, indent=2)}")
+
+            if 'error' in validation_result:
+                send("validator",
+                     f"[Worker {worker_id}] Validation error: {validation_result['error']}")
+                if track_attempt(worker_id, "error"):
+                    return None
+                continue
+
+            failed_fields = yield_tracker.enforced(
+                [key for key, value in validation_result.items() if not value])
+            if failed_fields:
+                counters["validation_fails"] += 1
+                send("validator",
+                     f"[Worker {worker_id}] Failed validation for fields: {failed_fields}, regenerating...")
+                if ablation["use_agent_2"]:
+                    if track_attempt(worker_id, "validation_fail", failed_fields):
+                        return None
+                    continue
+
+            # Another worker may have accepted the same stimulus while this one was validated
+            if ablation["use_agent_2"] and repetition_index.is_repetition(stimuli):
+                counters["repetition_count"] += 1
+                send("generator",
+                     f"[Worker {worker_id}] Stimulus was accepted by another worker, regenerating...")
+                if track_attempt(worker_id, "repetition"):
+                    return None
+                continue
+
+            previous_stimuli.append(stimuli)
+            repetition_index.add(stimuli)
+            track_attempt(worker_id, "accepted")
+            return stimuli, validation_result
+        return None
+
+    async def worker(worker_id):
+        while not stop_event.is_set() and not yield_tracker.exhausted and counters["claimed"] < total_iter_value:
+            counters["claimed"] += 1
+            produced = await produce_one(worker_id)
+            if produced is None:
+                return
+            stimuli, validation_result = produced
+
+            scores = {}
+            if ablation["use_agent_3"]:
+                if individual_scoring:
+                    scores = await async_agent_3_score_stimulus_individual(
+                        model_client, stimuli, experiment_design, agent_3_properties,
+                        stop_event=stop_event, websocket_callback=websocket_callback,
+                        response_cache=response_cache)
+                else:
+                    scores = await async_agent_3_score_stimulus(
+                        model_client, stimuli, experiment_design, agent_3_properties,
+                        stop_event=stop_event, response_cache=response_cache)
+                send("scorer",
+                     f"[Worker {worker_id}] Scorer's Output: {json.dumps(scores, indent=2)}")
+            if stop_event.is_set():
+                return
+
+            record = {
+                "stimulus_id": len(record_list) + 1,
+                "stimulus_content": stimuli,
+                "repetition_count": counters["repetition_count"],
+                "validation_fails": counters["validation_fails"],
+                "validation_failure_reasons": validation_result
+            }
+            if ablation["use_agent_3"]:
+                record.update(scores or {})
+            record_list.append(record)
+            send("all",
+                 f"=== Accepted stimulus {len(record_list)}/{total_iter_value} ===")
+            update_progress()
+
+    async def watch_stop(tasks):
+        while not all(task.done() for task in tasks):
+            if stop_event.is_set():
+                for task in tasks:
+                    task.cancel()
+                return
+            await asyncio.sleep(0.2)
+
+    send("all",
+         f"Starting async generation with {concurrency} concurrent workers...")
+    tasks = [asyncio.ensure_future(worker(i + 1)) for i in range(concurrency)]
+    watcher = asyncio.ensure_future(watch_stop(tasks))
+    try:
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        watcher.cancel()
+
+    errors = [r for r in results if isinstance(
+        r, Exception) and not isinstance(r, asyncio.CancelledError)]
+    if stop_event.is_set():
+        send("all", "Generation stopped by user.")
+        return None, None
+    if errors and not record_list:
+        raise errors[0]
+
+    if not record_list:
+        send("all", "No records generated.")
+        return None, None
+
+    df = pd.DataFrame(record_list)
+    session_id = settings.get('session_id', 'default')
+    timestamp = int(time.time())
+    unique_id = ''.join(random.choice('0123456789abcdef') for _ in range(6))
+    suggested_filename = f"experiment_stimuli_results_{session_id}_{timestamp}_{unique_id}.csv"
+
+    df['generation_timestamp'] = timestamp
+    df['batch_id'] = unique_id
+    df['total_iterations'] = total_iter_value
+    df['error_occurred'] = bool(errors)
+    df['error_message'] = str(errors[0]) if errors else ""
+
+    send("yield", yield_tracker.describe())
+    send("all", f"Data generation completed for session {session_id}")
+    return df, suggested_filename
+
+
+# ======================
+# 6. Shared Event Loop
+# ======================
+class AsyncGenerationEngine:
+    """
+    Event loop running in a background thread. All sessions submit their generation
+    coroutines to the same loop, so their requests share one loop and connection pool.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name="async-generation-engine", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def submit(self, coro):
+        """Schedule a coroutine on the engine loop, returning a concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_started())
+
+    def run(self, coro):
+        """Run a coroutine on the engine loop and block the calling thread until it finishes"""
+        return self.submit(coro).result()
+
+    def shutdown(self):
+        """Close pooled connections and stop the loop"""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(
+                close_aiohttp_sessions(), loop).result(5)
+        except Exception as e:
+            print(f"Error closing async sessions: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_async_engine():
+    """Get the process-wide async generation engine"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = AsyncGenerationEngine()
+        return _engine
+
+
+@atexit.register
+def _shutdown_async_engine():
+    if _engine is not None:
+        _engine.shutdown()
+
+
+def run_async_generation(settings):
+    """Blocking entry point used by the web app: run async_generate_stimuli on the shared loop"""
+    return get_async_engine().run(async_generate_stimuli(settings))
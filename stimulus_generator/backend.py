@@ -2,59 +2,356 @@ import openai
 import pandas as pd
 import json
 
+import os
 import time
 import random
 import requests
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlsplit
 from flask import request, jsonify
 from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait as wait_futures
+from contextlib import contextmanager
 import threading
+import atexit
 import multiprocessing
 from multiprocessing import Process, Queue
 import queue
 import traceback
 
+from .response_cache import get_response_cache, make_cache_key
+from .rate_limit import estimate_request_tokens, get_request_scheduler, limit_key
+from .concurrency import configure_concurrency, get_concurrency_controller
+from .circuit_breaker import CircuitOpenError, get_circuit_breaker, wait_until_available
+from .load_balancer import BalancerMember, EndpointBalancer, register_balancer
+from .pipeline import DEFAULT_QUEUE_SIZE, PipelineStage, StagePipeline
+from .batching import BatchCollector
+from .validation_planner import ValidationPlanner, get_criteria_stats
+from .prompt_context import DEFAULT_CONTEXT_SIZE, DEFAULT_CONTEXT_TOKEN_BUDGET, PromptContextPolicy
+from .near_duplicates import DEFAULT_NGRAM, NearDuplicateIndex
+from .local_rules import LocalRuleValidator
+from .rejection_cache import get_rejection_cache
+from .yield_tracker import (DEFAULT_MAX_ITERATION_ATTEMPTS, DEFAULT_MIN_ATTEMPTS, REPORT_INTERVAL,
+                            RetryBudgetExceeded, YieldTracker)
+from .hedging import (DEFAULT_HEDGE_BUDGET, DEFAULT_HEDGE_PERCENTILE, get_latency_tracker,
+                      request_kind, response_outcome, run_hedged)
+
 # Set OpenAI API key
 # openai.api_key = ""
 
 # Set Chutes AI API key (commented out)
 
-# Use multiprocessing to implement real timeout mechanism
+# ======================
+# 0. Timeout Execution Engine
+# ======================
+# API calls run in long-lived worker processes so that a hung call can still be
+# force terminated, without paying a process spawn for every request.
 
+DEFAULT_TIMEOUT_WORKERS = 16
+CANCELLED_ERROR = "API call cancelled"
 
-def _timeout_target(queue, func, args, kwargs):
-    """multiprocessing target function, must be defined at module level to be pickled"""
-    try:
-        result = func(*args, **kwargs)
-        queue.put(('success', result))
-    except Exception as e:
-        tb = traceback.format_exc()
-        print(f"Exception in subprocess:\n{tb}")
-        queue.put(('error', f"{type(e).__name__}: {str(e)}\n{tb}"))
-
-
-def call_with_timeout(func, args, kwargs, timeout_seconds=60):
-    """use multiprocessing to implement API call timeout, can force terminate"""
-    queue = Queue()
-    process = Process(target=_timeout_target, args=(queue, func, args, kwargs))
-    process.start()
-    process.join(timeout_seconds)
-
-    if process.is_alive():
-        # force terminate process
-        process.terminate()
-        process.join()
-        print(
-            f"API call timed out after {timeout_seconds} seconds and process was terminated")
-        return {"error": f"API call timed out after {timeout_seconds} seconds"}
 
-    try:
-        result_type, result = queue.get_nowait()
-        if result_type == 'success':
-            return result
-        else:
+def _pool_worker_main(task_queue, result_queue):
+    """worker process loop, must be defined at module level to be pickled"""
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        func, args, kwargs = task
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+            result_queue.put(('success', result, time.perf_counter() - start))
+        except Exception as e:
+            tb = traceback.format_exc()
+            print(f"Exception in worker process:\n{tb}")
+            result_queue.put(
+                ('error', f"{type(e).__name__}: {str(e)}\n{tb}", time.perf_counter() - start))
+
+
+class _PoolWorker:
+    """A single long-lived worker process with its own task and result queues"""
+
+    def __init__(self):
+        self.task_queue = Queue()
+        self.result_queue = Queue()
+        self.process = Process(target=_pool_worker_main,
+                               args=(self.task_queue, self.result_queue))
+        self.process.daemon = True
+        self.process.start()
+
+    def is_alive(self):
+        return self.process.is_alive()
+
+    def kill(self):
+        """force terminate the worker, used when a call hangs"""
+        self.process.terminate()
+        self.process.join()
+
+    def stop(self):
+        try:
+            self.task_queue.put(None)
+            self.process.join(1)
+        except Exception:
+            pass
+        if self.process.is_alive():
+            self.kill()
+
+
+class TimeoutWorkerPool:
+    """
+    Pool of long-lived worker processes that execute API calls with a hard timeout.
+    Workers are spawned lazily and reused; a worker whose call times out is terminated
+    and replaced on demand, so hung calls are still killed.
+    """
+
+    def __init__(self, max_workers=DEFAULT_TIMEOUT_WORKERS):
+        self.max_workers = max(1, int(max_workers))
+        self._idle_workers = []
+        self._worker_count = 0
+        self._condition = threading.Condition()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "calls": 0,
+            "timeouts": 0,
+            "cancelled": 0,
+            "errors": 0,
+            "workers_spawned": 0,
+            "workers_killed": 0,
+            "total_overhead": 0.0,
+            "max_overhead": 0.0,
+            "last_overhead": 0.0,
+        }
+
+    def _acquire_worker(self, cancel_event=None):
+        """An idle (or newly spawned) worker; None if cancel_event was set while waiting"""
+        with self._condition:
+            while True:
+                if cancel_event is not None and cancel_event.is_set():
+                    return None
+                while self._idle_workers:
+                    worker = self._idle_workers.pop()
+                    if worker.is_alive():
+                        return worker
+                    self._worker_count -= 1
+                if self._worker_count < self.max_workers:
+                    self._worker_count += 1
+                    break
+                self._condition.wait(None if cancel_event is None else 0.05)
+
+        try:
+            worker = _PoolWorker()
+        except Exception:
+            with self._condition:
+                self._worker_count -= 1
+                self._condition.notify()
+            raise
+        with self._stats_lock:
+            self._stats["workers_spawned"] += 1
+        return worker
+
+    def _release_worker(self, worker, healthy):
+        with self._condition:
+            if healthy and worker.is_alive():
+                self._idle_workers.append(worker)
+            else:
+                self._worker_count -= 1
+            self._condition.notify()
+
+    def _record_call(self, overhead=None, timed_out=False, failed=False, cancelled=False,
+                     killed=True):
+        with self._stats_lock:
+            self._stats["calls"] += 1
+            if timed_out:
+                self._stats["timeouts"] += 1
+                self._stats["workers_killed"] += 1
+            if cancelled:
+                self._stats["cancelled"] += 1
+                if killed:
+                    self._stats["workers_killed"] += 1
+            if failed:
+                self._stats["errors"] += 1
+            if overhead is not None:
+                self._stats["total_overhead"] += overhead
+                self._stats["last_overhead"] = overhead
+                self._stats["max_overhead"] = max(
+                    self._stats["max_overhead"], overhead)
+
+    def run(self, func, args, kwargs, timeout_seconds=60, cancel_event=None):
+        """
+        Run func(*args, **kwargs) in a worker, returning {"error": ...} on timeout or failure.
+        Setting cancel_event abandons the call: before dispatch (e.g. while waiting for a
+        free worker) it just returns, afterwards it also terminates the worker (used by hedging).
+        """
+        start = time.perf_counter()
+        worker = self._acquire_worker(cancel_event)
+        if worker is None:
+            self._record_call(cancelled=True, killed=False)
+            return {"error": CANCELLED_ERROR}
+        healthy = False
+        try:
+            # cancelled while a worker was being spawned: keep it, nothing was dispatched
+            if cancel_event is not None and cancel_event.is_set():
+                healthy = True
+                self._record_call(cancelled=True, killed=False)
+                return {"error": CANCELLED_ERROR}
+            worker.task_queue.put((func, args, kwargs))
+            deadline = time.perf_counter() + timeout_seconds
+            while True:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    # force terminate the worker, a fresh one is spawned on demand
+                    worker.kill()
+                    self._record_call(timed_out=True)
+                    print(
+                        f"API call timed out after {timeout_seconds} seconds and worker process was terminated")
+                    return {"error": f"API call timed out after {timeout_seconds} seconds"}
+                if cancel_event is not None and cancel_event.is_set():
+                    worker.kill()
+                    self._record_call(cancelled=True)
+                    return {"error": CANCELLED_ERROR}
+                try:
+                    result_type, result, exec_time = worker.result_queue.get(
+                        timeout=min(remaining, 0.5 if cancel_event is None else 0.05))
+                    break
+                except queue.Empty:
+                    if not worker.is_alive():
+                        self._record_call(failed=True)
+                        return {"error": "Worker process exited but no result returned"}
+
+            healthy = True
+            # everything except the call itself: queueing, pickling, worker spawn
+            overhead = max(0.0, time.perf_counter() - start - exec_time)
+            self._record_call(overhead=overhead,
+                              failed=result_type != 'success')
+            print(
+                f"API call finished in {exec_time:.3f}s (execution overhead: {overhead * 1000:.1f} ms)")
+            if result_type == 'success':
+                return result
             return {"error": result}
-    except queue.Empty:
-        return {"error": "Process completed but no result returned"}
+        finally:
+            self._release_worker(worker, healthy)
+
+    def get_stats(self):
+        """Return call counters and per-call overhead (in milliseconds)"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        completed = stats["calls"] - stats["timeouts"] - stats["cancelled"]
+        stats["avg_overhead_ms"] = (
+            stats.pop("total_overhead") / completed * 1000) if completed else 0.0
+        stats["max_overhead_ms"] = stats.pop("max_overhead") * 1000
+        stats["last_overhead_ms"] = stats.pop("last_overhead") * 1000
+        with self._condition:
+            stats["workers"] = self._worker_count
+            stats["idle_workers"] = len(self._idle_workers)
+        return stats
+
+    def warm_up(self, func, args, kwargs, count, timeout_seconds=10):
+        """Run the same call on up to `count` distinct workers concurrently (e.g. to pre-open connections)"""
+        count = max(0, min(int(count), self.max_workers))
+        threads = [threading.Thread(target=self.run, args=(func, args, kwargs, timeout_seconds), daemon=True)
+                   for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout_seconds + 1)
+        return count
+
+    def shutdown(self):
+        with self._condition:
+            workers = self._idle_workers
+            self._idle_workers = []
+            self._worker_count -= len(workers)
+        for worker in workers:
+            worker.stop()
+
+
+_timeout_pool = None
+_timeout_pool_lock = threading.Lock()
+
+
+def get_timeout_pool():
+    """Get the process-wide timeout worker pool, creating it on first use"""
+    global _timeout_pool
+    with _timeout_pool_lock:
+        if _timeout_pool is None:
+            max_workers = int(os.environ.get(
+                "STIMULUS_TIMEOUT_WORKERS", DEFAULT_TIMEOUT_WORKERS))
+            _timeout_pool = TimeoutWorkerPool(max_workers)
+        return _timeout_pool
+
+
+def configure_timeout_pool(max_workers):
+    """Resize the timeout worker pool (idle workers of the old pool are stopped)"""
+    global _timeout_pool
+    with _timeout_pool_lock:
+        old_pool = _timeout_pool
+        _timeout_pool = TimeoutWorkerPool(max_workers)
+    if old_pool is not None:
+        old_pool.shutdown()
+    return _timeout_pool
+
+
+@atexit.register
+def _shutdown_timeout_pool():
+    if _timeout_pool is not None:
+        _timeout_pool.shutdown()
+
+
+def call_with_timeout(func, args, kwargs, timeout_seconds=60, cancel_event=None):
+    """run API call in a pooled worker process with a hard timeout, can force terminate"""
+    return get_timeout_pool().run(func, args, kwargs, timeout_seconds, cancel_event)
+
+
+# ---- Pooled keep-alive HTTP sessions ----
+# One requests.Session per endpoint (scheme + host), shared by every client in the
+# process. Each timeout worker is a long-lived process, so its sessions keep their
+# connections open across iterations, agents and sessions.
+DEFAULT_HTTP_POOL_SIZE = 10
+
+_http_sessions = {}
+_http_sessions_pid = None
+_http_sessions_lock = threading.Lock()
+
+
+def _endpoint_key(api_url):
+    parts = urlsplit(api_url.strip())
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+def get_http_session(api_url, pool_size=DEFAULT_HTTP_POOL_SIZE, keep_alive=True):
+    """Get the shared HTTP session for the endpoint of api_url"""
+    global _http_sessions_pid
+    key = (_endpoint_key(api_url), int(pool_size), bool(keep_alive))
+    with _http_sessions_lock:
+        # sockets must not be shared with a forked child, start from an empty registry
+        if _http_sessions_pid != os.getpid():
+            _http_sessions.clear()
+            _http_sessions_pid = os.getpid()
+
+        session = _http_sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1,
+                                  pool_maxsize=key[1], max_retries=0)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            if not keep_alive:
+                session.headers["Connection"] = "close"
+            _http_sessions[key] = session
+        return session
+
+
+def _prewarm_http_session(api_url, pool_size, keep_alive):
+    """Open a connection to the endpoint so later requests skip the TCP/TLS handshake"""
+    try:
+        get_http_session(api_url, pool_size, keep_alive).head(
+            api_url, timeout=10).close()
+        return True
+    except requests.RequestException as e:
+        print(f"Connection pre-warming failed for {_endpoint_key(api_url)}: {e}")
+        return False
 
 
 # ======================
@@ -71,6 +368,17 @@ Existing stimuli: {previous_stimuli}
 Requirement: {generation_requirements} Please return in JSON format.
 """
 
+# ---- Agent 1 Multi-Candidate Prompt ----
+AGENT_1_MULTI_PROMPT_TEMPLATE = """\
+Please help me construct {candidate_count} different items as stimuli for a psycholinguistic experiment based on the description: 
+
+Experimental stimuli design: {experiment_design}
+
+Existing stimuli: {previous_stimuli}
+
+Requirement: {generation_requirements} The {candidate_count} items must also be different from each other. Please return in JSON format, with the items in the "candidates" list.
+"""
+
 # ---- Agent 2 Prompt ----
 AGENT_2_PROMPT_TEMPLATE = """\
 Please verify the following NEW STIMULUS with utmost precision, ensuring they meet the Experimental stimuli design and following strict criteria.
@@ -82,6 +390,47 @@ Experimental stimuli design: {experiment_design}
 Please return in JSON format.
 """
 
+# ---- Agent 2 Batch Prompt ----
+AGENT_2_BATCH_PROMPT_TEMPLATE = """\
+Please verify each of the following {stimulus_count} NEW STIMULI with utmost precision, ensuring they meet the Experimental stimuli design and following strict criteria. Judge every stimulus on its own.
+
+NEW STIMULI:
+{new_stimuli}
+
+Experimental stimuli design: {experiment_design}
+
+Please return in JSON format, with one entry per stimulus in the "results" list, in the same order as the stimuli above.
+"""
+
+# ---- Agent 2 Individual Criterion Prompt ----
+AGENT_2_INDIVIDUAL_PROMPT_TEMPLATE = """\
+Please verify the following NEW STIMULUS with utmost precision for the specific criterion mentioned below.
+
+NEW STIMULUS: {new_stimulus}
+
+Experimental stimuli design: {experiment_design}
+
+SPECIFIC CRITERION TO VALIDATE:
+Property: {property_name}
+Description: {property_description}
+
+Please return in JSON format with only one field: "{property_name}" (boolean: true if criterion is met, false otherwise).
+"""
+
+# ---- Agent 2 Criteria Group Prompt ----
+AGENT_2_GROUP_PROMPT_TEMPLATE = """\
+Please verify the following NEW STIMULUS with utmost precision for each of the specific criteria mentioned below.
+
+NEW STIMULUS: {new_stimulus}
+
+Experimental stimuli design: {experiment_design}
+
+SPECIFIC CRITERIA TO VALIDATE:
+{criteria}
+
+Please return in JSON format with one boolean field per criterion: {criteria_names} (true if the criterion is met, false otherwise).
+"""
+
 # ---- Agent 3 Prompt ----
 AGENT_3_PROMPT_TEMPLATE = """\
 Please rate the following STIMULUS based on the Experimental stimuli design provided for a psychological experiment:
@@ -95,6 +444,40 @@ SCORING REQUIREMENTS:
 Please return in JSON format including the score for each dimension within the specified ranges.
 """
 
+# ---- Agent 3 Batch Prompt ----
+AGENT_3_BATCH_PROMPT_TEMPLATE = """\
+Please rate each of the following STIMULI based on the Experimental stimuli design provided for a psychological experiment. Rate every stimulus on its own.
+
+STIMULI:
+{valid_stimuli}
+Experimental stimuli design: {experiment_design}
+
+SCORING REQUIREMENTS:
+{scoring_requirements}
+
+Please return in JSON format, with one entry per stimulus in the "scores" list: its "stimulus_id" and the score for each dimension within the specified ranges.
+"""
+
+# ---- Agent 3 Individual Aspect Prompt ----
+AGENT_3_INDIVIDUAL_PROMPT_TEMPLATE = """\
+Please rate the following STIMULUS based on the specific aspect mentioned below for a psychological experiment:
+
+STIMULUS: {valid_stimulus}
+Experimental stimuli design: {experiment_design}
+
+SPECIFIC ASPECT TO SCORE:
+- Aspect Name: {aspect_name}
+- Description: {aspect_description}
+- Minimum Score: {min_score}
+- Maximum Score: {max_score}
+- Score Range: You must provide an integer score between {min_score} and {max_score} (inclusive)
+
+SCORING INSTRUCTIONS:
+Rate this stimulus on the "{aspect_name}" dimension based on the provided description. Your score should reflect how well the stimulus meets this criterion, with {min_score} being the lowest possible score and {max_score} being the highest possible score.
+
+Please return in JSON format with only one field: "{aspect_name}" (integer score within the specified range {min_score}-{max_score}).
+"""
+
 # ---- Agent 1 Stimulus Schema ----
 AGENT_1_PROPERTIES = {}
 
@@ -105,6 +488,71 @@ AGENT_2_PROPERTIES = {}
 AGENT_3_PROPERTIES = {}
 
 
+def build_json_schema_format(properties):
+    """Build the json_schema response_format for the given properties"""
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "response_schema",
+            "schema": {
+                "type": "object",
+                "properties": properties,
+                "required": list(properties.keys()),
+                "additionalProperties": False
+            }
+        }
+    }
+
+
+# ---- Request cancellation ----
+_request_context = threading.local()
+
+
+class _AnyEvent:
+    """Reads as set as soon as any of the wrapped events is set"""
+
+    def __init__(self, *events):
+        self.events = events
+
+    def is_set(self):
+        return any(event.is_set() for event in self.events)
+
+
+def _any_event(*events):
+    events = [event for event in events if event is not None]
+    if not events:
+        return None
+    return events[0] if len(events) == 1 else _AnyEvent(*events)
+
+
+@contextmanager
+def cancellable_requests(cancel_event):
+    """Model requests made by this thread inside the block are abandoned once cancel_event is set"""
+    previous = getattr(_request_context, "cancel_event", None)
+    _request_context.cancel_event = _any_event(previous, cancel_event)
+    try:
+        yield
+    finally:
+        _request_context.cancel_event = previous
+
+
+# shared threads for fanning out independent requests (e.g. per-criterion validation)
+FANOUT_WORKERS = 32
+# aspects individual scoring evaluates at the same time by default
+DEFAULT_SCORING_CONCURRENCY = 4
+_fanout_executor = None
+_fanout_executor_lock = threading.Lock()
+
+
+def get_fanout_executor():
+    global _fanout_executor
+    with _fanout_executor_lock:
+        if _fanout_executor is None:
+            _fanout_executor = ThreadPoolExecutor(
+                max_workers=FANOUT_WORKERS, thread_name_prefix="request-fanout")
+        return _fanout_executor
+
+
 # ======================
 # 2. Abstract Model Client Interface
 # ======================
@@ -121,6 +569,181 @@ class ModelClient(ABC):
         """Get default parameters for this model"""
         pass
 
+    def prewarm_connections(self, count=1):
+        """Open connections to the model endpoint ahead of the first request"""
+        return 0
+
+    def get_model_identity(self):
+        """Identify the model behind this client (used in response cache keys)"""
+        return type(self).__name__
+
+    def get_endpoints(self):
+        """URLs of the model endpoints this client sends requests to"""
+        return []
+
+    # session the client works for, used to share rate limits fairly between sessions
+    session_id = None
+    # adapt the number of concurrent requests to the endpoint's health (AIMD)
+    adaptive_concurrency = True
+    # websocket_callback(message_type, message) of the session, for request-layer events
+    websocket_callback = None
+    # send a duplicate of requests slower than hedge_percentile of their observed latency,
+    # for at most hedge_budget (fraction) of the requests
+    hedge_requests = False
+    hedge_percentile = DEFAULT_HEDGE_PERCENTILE
+    hedge_budget = DEFAULT_HEDGE_BUDGET
+
+    def __getstate__(self):
+        # bound _api_call methods are pickled into the timeout pool workers,
+        # the session callback (usually a closure) stays in this process
+        state = self.__dict__.copy()
+        state.pop("websocket_callback", None)
+        return state
+
+    def _notify(self, message_type, message):
+        print(message)
+        if self.websocket_callback:
+            self.websocket_callback(message_type, message)
+
+    def _send_with_retries(self, label, api_call, api_args, api_url, estimated_tokens, kind="generator"):
+        """
+        Send a request through the rate-limit scheduler, the endpoint's concurrency
+        controller and the timeout pool, with retries (and hedging when enabled).
+        api_call runs in a worker process and returns {"status_code", "headers", "json", "text"}.
+        kind ("generator", "validator" or "scorer") selects the latency history used for hedging.
+        Returns the parsed JSON content of the first choice, or {"error": ...}.
+        """
+        scheduler = get_request_scheduler()
+        rate_limit_key = limit_key(api_url, self.api_key)
+        controller = get_concurrency_controller(
+            _endpoint_key(api_url)) if self.adaptive_concurrency else None
+        breaker = get_circuit_breaker(_endpoint_key(api_url))
+        # set by cancellable_requests() when the caller no longer needs the answer
+        cancel_event = getattr(_request_context, "cancel_event", None)
+
+        def send(hedge_cancel_event=None, hedged=False):
+            stop = _any_event(cancel_event, hedge_cancel_event)
+            if not hedged:
+                return call_with_timeout(api_call, api_args, {}, 60, stop)
+            # the primary request already holds its rate-limit grant and concurrency slot,
+            # a hedge needs its own
+            if controller and not controller.acquire(stop):
+                return {"error": CANCELLED_ERROR}
+            outcome = "cancelled"
+            start = time.perf_counter()
+            try:
+                if not scheduler.acquire(rate_limit_key, estimated_tokens, self.session_id, stop):
+                    return {"error": CANCELLED_ERROR}
+                outcome = "error"
+                start = time.perf_counter()
+                result = call_with_timeout(api_call, api_args, {}, 60, stop)
+                outcome = "cancelled" if result.get(
+                    "error") == CANCELLED_ERROR else response_outcome(result)
+                return result
+            finally:
+                if controller:
+                    message = controller.release(
+                        outcome, time.perf_counter() - start)
+                    if message:
+                        self._notify("concurrency", message)
+
+        # retry mechanism
+        backoff = 0
+        for attempt in range(3):
+            if backoff:
+                if cancel_event is not None:
+                    _wait_for_cancel(cancel_event, backoff)
+                else:
+                    time.sleep(backoff)
+                backoff = 0
+            if cancel_event is not None and cancel_event.is_set():
+                return {"error": CANCELLED_ERROR}
+            # fail fast while the endpoint's circuit is open
+            if not breaker.allow_request():
+                message = f"{label} API endpoint {_endpoint_key(api_url)} unavailable (circuit open, next probe in {breaker.retry_in():.0f}s)"
+                print(message)
+                return {"error": message}
+
+            outcome = "cancelled"
+            start = time.perf_counter()
+            acquired = controller.acquire(cancel_event) if controller else True
+            try:
+                if not acquired or not scheduler.acquire(
+                        rate_limit_key, estimated_tokens, self.session_id, cancel_event):
+                    return {"error": CANCELLED_ERROR}
+                outcome = "error"
+                start = time.perf_counter()
+
+                if self.hedge_requests:
+                    result = run_hedged(
+                        send, get_latency_tracker(
+                            f"{_endpoint_key(api_url)}|{kind}"),
+                        self.hedge_percentile, self.hedge_budget)
+                else:
+                    result = send()
+
+                if isinstance(result, dict) and "error" in result:
+                    if result["error"] == CANCELLED_ERROR:
+                        outcome = "cancelled"
+                        return result
+                    outcome = "timeout" if "timed out" in result["error"] else "connection_error"
+                    print(f"{label} API {outcome.replace('_', ' ')} attempt {attempt + 1}/3")
+                    if attempt == 2:
+                        return {"error": "API timeout after 3 attempts"}
+                    backoff = 2 ** attempt
+                    continue
+
+                body = result.get("json")
+                usage = body.get("usage") if isinstance(body, dict) else None
+                scheduler.record_response(
+                    rate_limit_key, result["status_code"], result.get("headers"),
+                    (usage or {}).get("total_tokens"), estimated_tokens)
+
+                if result["status_code"] == 429:
+                    outcome = "rate_limited"
+                    print(f"{label} API rate limited attempt {attempt + 1}/3")
+                    if attempt == 2:
+                        return {"error": "API rate limited after 3 attempts"}
+                    # no blind sleep: the scheduler holds the next attempt until the limit resets
+                    continue
+                if result["status_code"] >= 400:
+                    outcome = "server_error" if result["status_code"] >= 500 else "error"
+                    raise requests.HTTPError(
+                        f"{result['status_code']} error: {result.get('text', '')}")
+
+                outcome = "success"
+                print(f"Response from {label} API:",
+                      json.dumps(body, indent=2))
+                content = body["choices"][0]["message"]["content"]
+                return json.loads(content)
+
+            except (json.JSONDecodeError, KeyError, TypeError) as e:
+                print(f"{label} API parsing error attempt {attempt + 1}/3: {e}")
+                if attempt == 2:
+                    return {"error": f"API parsing error after 3 attempts: {str(e)}"}
+                backoff = 2 ** attempt
+            except Exception as e:
+                print(f"{label} API error attempt {attempt + 1}/3: {e}")
+                if attempt == 2:
+                    return {"error": f"API error after 3 attempts: {str(e)}"}
+                backoff = 2 ** attempt
+            finally:
+                if controller and acquired:
+                    message = controller.release(
+                        outcome, time.perf_counter() - start)
+                    if message:
+                        self._notify("concurrency", message)
+                message = breaker.record(outcome)
+                if message:
+                    self._notify("circuit", message)
+
+
+def _wait_for_cancel(cancel_event, seconds):
+    """Sleep for up to seconds, waking early when cancel_event (Event or _AnyEvent) is set"""
+    deadline = time.perf_counter() + seconds
+    while not cancel_event.is_set() and time.perf_counter() < deadline:
+        time.sleep(min(0.05, max(0.0, deadline - time.perf_counter())))
+
 
 # ======================
 # 3. Concrete Model Client Implementations
@@ -128,8 +751,12 @@ class ModelClient(ABC):
 class OpenAIClient(ModelClient):
     """OpenAI GPT model client"""
 
-    def __init__(self, api_key=None):
+    API_BASE = "https://api.openai.com/v1"
+
+    def __init__(self, api_key=None, pool_size=DEFAULT_HTTP_POOL_SIZE, keep_alive=True):
         self.api_key = api_key
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
         if api_key:
             openai.api_key = api_key
             print(f"OpenAI API key set successfully, length: {len(api_key)}")
@@ -140,57 +767,54 @@ class OpenAIClient(ModelClient):
         """API call function, will be called by multiprocessing"""
         # set API key in subprocess
         openai.api_key = api_key
+        openai.requestssession = get_http_session(
+            self.API_BASE, self.pool_size, self.keep_alive)
         print(
             f"OpenAI API key in subprocess: {api_key[:10]}..." if api_key else "None")
 
-        return openai.ChatCompletion.create(
-            model=params["model"],
-            messages=[{"role": "user", "content": prompt}],
-            response_format={
-                "type": "json_schema",
-                "json_schema": {
-                    "name": "response_schema",
-                    "schema": {
-                        "type": "object",
-                        "properties": properties,
-                        "required": list(properties.keys()),
-                        "additionalProperties": False
-                    }
-                }
-            }
-        )
+        # the requestor rather than ChatCompletion.create, which drops the response headers
+        # (x-ratelimit-* feed the request scheduler)
+        requestor = openai.api_requestor.APIRequestor(
+            key=api_key, api_base=self.API_BASE)
+        try:
+            response, _, _ = requestor.request("post", "/chat/completions", params={
+                "model": params["model"],
+                "messages": [{"role": "user", "content": prompt}],
+                "response_format": build_json_schema_format(properties)
+            })
+        except openai.error.OpenAIError as e:
+            if e.http_status is None:
+                raise
+            return {"status_code": e.http_status, "headers": dict(e.headers or {}),
+                    "json": None, "text": str(e)}
+        return {"status_code": 200, "headers": dict(response._headers or {}),
+                "json": response.data, "text": ""}
 
     def generate_completion(self, prompt, properties, params=None):
         """Generate completion using OpenAI API"""
         if params is None:
             params = self.get_default_params()
 
-        # retry mechanism
-        for attempt in range(3):
-            try:
-                response = call_with_timeout(
-                    self._api_call, (prompt, properties, params, self.api_key), {}, 60)
-
-                if isinstance(response, dict) and "error" in response:
-                    print(f"OpenAI API timeout attempt {attempt + 1}/3")
-                    if attempt == 2:  # last attempt
-                        return {"error": "API timeout after 3 attempts"}
-                    time.sleep(2 ** attempt)  # exponential backoff
-                    continue
-
-                return json.loads(response['choices'][0]['message']['content'])
-            except json.JSONDecodeError as e:
-                print(f"Failed to parse OpenAI JSON response: {e}")
-                return {"error": "Failed to parse response"}
-            except Exception as e:
-                print(f"OpenAI API error attempt {attempt + 1}/3: {e}")
-                if attempt == 2:
-                    return {"error": f"API error after 3 attempts: {str(e)}"}
-                time.sleep(2 ** attempt)
+        estimated_tokens = estimate_request_tokens(
+            [{"content": prompt}], params)
+        return self._send_with_retries(
+            "OpenAI", self._api_call, (prompt,
+                                       properties, params, self.api_key),
+            self.API_BASE, estimated_tokens, request_kind(properties))
 
     def get_default_params(self):
         return {"model": "gpt-4o"}
 
+    def get_model_identity(self):
+        return "openai"
+
+    def get_endpoints(self):
+        return [self.API_BASE]
+
+    def prewarm_connections(self, count=1):
+        return get_timeout_pool().warm_up(
+            _prewarm_http_session, (self.API_BASE, self.pool_size, self.keep_alive), {}, count)
+
 
 # class HuggingFaceClient(ModelClient):
 #     """Hugging Face model client"""
@@ -263,136 +887,246 @@ class OpenAIClient(ModelClient):
 #         }
 
 
+def build_custom_request_data(api_url, model_name, prompt, properties, params=None):
+    """Build the chat-completions request body sent to a custom API"""
+    is_deepseek = api_url.strip().startswith("https://api.deepseek.com")
+
+    if is_deepseek:
+        import time
+        rand_stamp = int(time.time())
+        # Generate field list
+        field_list = ', '.join([f'"{k}"' for k in properties.keys()])
+        # Determine agent type
+        # If starts with "Please verify the following NEW STIMULUS ", then return at the end of prompt, each field can only return boolean value
+        if prompt.strip().startswith("Please verify the following NEW STIMULUS"):
+            prompt = prompt.rstrip() + \
+                f"\nPlease return in strict JSON format, fields must include: {field_list}, requirements for each field are as follows: {properties}, each field can only return boolean values (True/False)"
+        elif prompt.strip().startswith("Please rate the following STIMULUS"):
+            prompt = prompt.rstrip() + \
+                f"\nPlease return in strict JSON format, fields must include: {field_list}, requirements for each field are as follows: {properties}, each field can only return numbers"
+        else:
+            prompt = prompt.rstrip() + \
+                f"\nPlease return in strict JSON format, fields must include: {field_list}, requirements for each field are as follows: {properties}"
+
+        request_data = {
+            "model": model_name,
+            "messages": [
+                {"role": "system", "content": f"RAND:{rand_stamp}"},
+                {"role": "user", "content": prompt}
+            ],
+            "stream": False,
+            "response_format": {"type": "json_object"}
+        }
+    else:
+        # build base request
+        request_data = {
+            "model": model_name,
+            "messages": [{"role": "user", "content": prompt}],
+            "stream": False,
+            "response_format": build_json_schema_format(properties)
+        }
+
+    if params is not None:
+        request_data.update(params)
+
+    return request_data
+
+
 class CustomModelClient(ModelClient):
     """Custom model client for user-defined APIs"""
 
-    def __init__(self, api_url, api_key, model_name):
+    def __init__(self, api_url, api_key, model_name, pool_size=DEFAULT_HTTP_POOL_SIZE, keep_alive=True):
         self.api_url = api_url
         self.api_key = api_key
         self.model_name = model_name
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
 
     def _api_call(self, request_data, headers):
         """API call function, will be called by multiprocessing"""
-        response = requests.post(
+        session = get_http_session(
+            self.api_url, self.pool_size, self.keep_alive)
+        response = session.post(
             self.api_url,
             headers=headers,
             json=request_data,
             timeout=60  # timeout for requests
         )
-        response.raise_for_status()
-        return response.json()
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        return {
+            "status_code": response.status_code,
+            "headers": dict(response.headers),
+            "json": body,
+            "text": response.text[:500] if response.status_code >= 400 else ""
+        }
 
     def generate_completion(self, prompt, properties, params=None):
-
-        is_deepseek = self.api_url.strip().startswith("https://api.deepseek.com")
-
-        if is_deepseek:
-            import time
-            rand_stamp = int(time.time())
-            # Generate field list
-            field_list = ', '.join([f'"{k}"' for k in properties.keys()])
-            # Determine agent type
-            # If starts with "Please verify the following NEW STIMULUS ", then return at the end of prompt, each field can only return boolean value
-            if prompt.strip().startswith("Please verify the following NEW STIMULUS"):
-                prompt = prompt.rstrip() + \
-                    f"\nPlease return in strict JSON format, fields must include: {field_list}, requirements for each field are as follows: {properties}, each field can only return boolean values (True/False)"
-            elif prompt.strip().startswith("Please rate the following STIMULUS"):
-                prompt = prompt.rstrip() + \
-                    f"\nPlease return in strict JSON format, fields must include: {field_list}, requirements for each field are as follows: {properties}, each field can only return numbers"
-            else:
-                prompt = prompt.rstrip() + \
-                    f"\nPlease return in strict JSON format, fields must include: {field_list}, requirements for each field are as follows: {properties}"
-
-            request_data = {
-                "model": self.model_name,
-                "messages": [
-                    {"role": "system", "content": f"RAND:{rand_stamp}"},
-                    {"role": "user", "content": prompt}
-                ],
-                "stream": False,
-                "response_format": {"type": "json_object"}
-            }
-        else:
-            # build base request
-            request_data = {
-                "model": self.model_name,
-                "messages": [{"role": "user", "content": prompt}],
-                "stream": False,
-                "response_format": {
-                    "type": "json_schema",
-                    "json_schema": {
-                        "name": "response_schema",
-                        "schema": {
-                            "type": "object",
-                            "properties": properties,
-                            "required": list(properties.keys()),
-                            "additionalProperties": False
-                        }
-                    }
-                }
-            }
-
-        if params is not None:
-            request_data.update(params)
+        request_data = build_custom_request_data(
+            self.api_url, self.model_name, prompt, properties, params)
 
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
 
-        # retry mechanism
-        for attempt in range(3):
-            try:
-                print("Sending request to Custom API with:",
-                      json.dumps(request_data, indent=2))
+        print("Sending request to Custom API with:",
+              json.dumps(request_data, indent=2))
+        estimated_tokens = estimate_request_tokens(
+            request_data["messages"], request_data)
+        return self._send_with_retries(
+            "Custom", self._api_call, (request_data, headers),
+            self.api_url, estimated_tokens, request_kind(properties))
 
-                result = call_with_timeout(
-                    self._api_call, (request_data, headers), {}, 60)
+    def get_default_params(self):
+        return {
+        }
 
-                if isinstance(result, dict) and "error" in result:
-                    print(f"Custom API timeout attempt {attempt + 1}/3")
-                    if attempt == 2:
-                        return {"error": "API timeout after 3 attempts"}
-                    time.sleep(2 ** attempt)
-                    continue
+    def get_model_identity(self):
+        return f"{self.api_url.strip()}|{self.model_name}"
 
-                print("Response from Custom API:",
-                      json.dumps(result, indent=2))
-                content = result["choices"][0]["message"]["content"]
-                return json.loads(content)
+    def get_endpoints(self):
+        return [self.api_url]
+
+    def prewarm_connections(self, count=1):
+        return get_timeout_pool().warm_up(
+            _prewarm_http_session, (self.api_url, self.pool_size, self.keep_alive), {}, count)
 
-            except (json.JSONDecodeError, KeyError) as e:
-                print(f"Custom API parsing error attempt {attempt + 1}/3: {e}")
-                if attempt == 2:
-                    return {"error": f"API parsing error after 3 attempts: {str(e)}"}
-                time.sleep(2 ** attempt)
-            except Exception as e:
-                print(f"Custom API error attempt {attempt + 1}/3: {e}")
-                if attempt == 2:
-                    return {"error": f"API error after 3 attempts: {str(e)}"}
-                time.sleep(2 ** attempt)
+
+class LoadBalancedModelClient(ModelClient):
+    """Spreads requests over several endpoints / API keys serving the same model"""
+
+    def __init__(self, members, strategy="least_outstanding"):
+        self.balancer = EndpointBalancer(members, strategy)
+        register_balancer(self.balancer)
+
+    def generate_completion(self, prompt, properties, params=None):
+        tried = set()
+        result = {"error": "No endpoint available"}
+        # fail over to another member once if the chosen one fails
+        for _ in range(min(2, len(self.balancer.members))):
+            member = self.balancer.acquire(exclude=tried)
+            if member is None:
+                break
+            tried.add(member.name)
+            start = time.perf_counter()
+            ok = False
+            cancelled = False
+            try:
+                result = member.client.generate_completion(
+                    prompt, properties, params)
+                ok = not (isinstance(result, dict) and "error" in result)
+                # the caller abandoned the request, not the member's fault
+                cancelled = isinstance(result, dict) and result.get(
+                    "error") == CANCELLED_ERROR
+            finally:
+                message = self.balancer.release(
+                    member, time.perf_counter() - start, None if cancelled else ok)
+                if message:
+                    self._notify("load_balancer", message)
+            if ok or cancelled:
+                return result
+            print(f"Request via {member.name} failed, trying another endpoint")
+        return result
 
     def get_default_params(self):
-        return {
-        }
+        return self.balancer.members[0].client.get_default_params()
+
+    def get_model_identity(self):
+        # replicas of the same model may share cached responses
+        model_names = sorted({member.client.model_name for member in self.balancer.members})
+        return f"pool|{','.join(model_names)}"
+
+    def get_endpoints(self):
+        return [member.client.api_url for member in self.balancer.members]
+
+    def prewarm_connections(self, count=1):
+        return sum(member.client.prewarm_connections(count) for member in self.balancer.members)
 
 
 # ======================
 # 4. Model Client Factory
 # ======================
+def _http_pool_options(settings):
+    """Connection pool options for model clients from the generation settings"""
+    settings = settings or {}
+    return {
+        "pool_size": int(settings.get('http_pool_size') or DEFAULT_HTTP_POOL_SIZE),
+        "keep_alive": settings.get('http_keep_alive', True) is not False
+    }
+
+
+def model_api_url(model_choice, settings):
+    """Endpoint URL the client for model_choice talks to"""
+    return settings.get('apiUrl') if model_choice == 'custom' else OpenAIClient.API_BASE
+
+
 def create_model_client(model_choice, settings=None):
     """Factory function to create appropriate model client"""
+    if model_choice == 'custom' and settings and settings.get('endpoints'):
+        client = _create_load_balanced_client(settings)
+        client.session_id = settings.get('session_id')
+        client.websocket_callback = settings.get('websocket_callback')
+        return client
+
+    client = _create_model_client(model_choice, settings)
+    if settings:
+        client.session_id = settings.get('session_id')
+        client.websocket_callback = settings.get('websocket_callback')
+        client.adaptive_concurrency = settings.get(
+            'adaptive_concurrency', True) is not False
+        client.hedge_requests = bool(settings.get('hedge_requests'))
+        if settings.get('hedge_percentile'):
+            client.hedge_percentile = float(settings['hedge_percentile'])
+        if settings.get('hedge_budget') is not None:
+            client.hedge_budget = float(settings['hedge_budget'])
+        if settings.get('concurrency_min') or settings.get('concurrency_max'):
+            configure_concurrency(_endpoint_key(model_api_url(model_choice, settings)), settings.get(
+                'concurrency_min'), settings.get('concurrency_max'))
+        # explicit requests/tokens per minute limits for this endpoint and key
+        if settings.get('rate_limit_rpm') or settings.get('rate_limit_tpm'):
+            get_request_scheduler().configure(
+                limit_key(model_api_url(model_choice, settings),
+                          settings.get('api_key')),
+                rpm=settings.get('rate_limit_rpm'),
+                tpm=settings.get('rate_limit_tpm'))
+    return client
+
+
+def _create_load_balanced_client(settings):
+    """
+    Pooled custom client over settings['endpoints']: a list of dicts with apiUrl, api_key,
+    modelName and weight, where missing values fall back to the top-level settings
+    (any other setting, e.g. rate_limit_rpm, may be overridden per endpoint as well)
+    """
+    members = []
+    for endpoint in settings['endpoints']:
+        member_settings = dict(settings, endpoints=None)
+        member_settings.update(
+            {key: value for key, value in endpoint.items() if key != 'weight' and value})
+        client = create_model_client('custom', member_settings)
+        members.append(BalancerMember(
+            client, f"{limit_key(client.api_url, client.api_key)}|{client.model_name}",
+            _endpoint_key(client.api_url), endpoint.get('weight', 1)))
+    print(f"Load balancing over {len(members)} endpoint(s)")
+    return LoadBalancedModelClient(members, settings.get('load_balancing') or "least_outstanding")
+
+
+def _create_model_client(model_choice, settings=None):
     if model_choice == 'GPT-4o':
         api_key = settings.get('api_key') if settings else None
         print(f"OpenAI API key length: {len(api_key) if api_key else 0}")
-        return OpenAIClient(api_key)
+        return OpenAIClient(api_key, **_http_pool_options(settings))
     elif model_choice == 'custom':
         if not settings:
             raise ValueError("Settings required for custom model")
         return CustomModelClient(
             api_url=settings.get('apiUrl'),
             api_key=settings.get('api_key'),
-            model_name=settings.get('modelName')
+            model_name=settings.get('modelName'),
+            **_http_pool_options(settings)
         )
     # elif model_choice == 'HuggingFace':
     #     api_key = settings.get('api_key')
@@ -401,12 +1135,93 @@ def create_model_client(model_choice, settings=None):
         raise ValueError(f"Unsupported model choice: {model_choice}")
 
 
+def create_response_cache(settings):
+    """Response cache for the validator/scorer calls of a run, or None when disabled"""
+    if settings.get('response_cache', True) is False:
+        return None
+    options = {}
+    if settings.get('response_cache_ttl') is not None:
+        options['ttl_seconds'] = float(settings['response_cache_ttl'])
+    return get_response_cache(settings.get('response_cache_path'), **options)
+
+
+def create_near_duplicate_index(settings):
+    """NearDuplicateIndex configured from settings, or None when near-duplicate detection is off"""
+    threshold = settings.get('near_duplicate_threshold')
+    if not threshold:
+        return None
+    return NearDuplicateIndex(
+        threshold=threshold,
+        ngram=settings.get('near_duplicate_ngram') or DEFAULT_NGRAM,
+        shingles=settings.get('near_duplicate_shingles') or "char",
+        fields=settings.get('near_duplicate_fields'))
+
+
+def create_context_policy(settings, seed_count):
+    """PromptContextPolicy for the context_* settings; the first seed_count stimuli are seeds"""
+    try:
+        return PromptContextPolicy(
+            settings.get('context_policy') or "all",
+            size=settings.get('context_size') or DEFAULT_CONTEXT_SIZE,
+            token_budget=settings.get(
+                'context_token_budget') or DEFAULT_CONTEXT_TOKEN_BUDGET,
+            seed_count=seed_count,
+            max_pinned=settings.get('context_max_pinned'))
+    except TypeError as e:
+        raise ValueError(str(e)) from e
+
+
+def create_local_validator(settings):
+    """LocalRuleValidator for the agent_2_local_rules setting, or None when no rules are declared"""
+    rules = settings.get('agent_2_local_rules')
+    if not rules:
+        return None
+    return LocalRuleValidator(rules)
+
+
+def create_rejection_cache(settings, properties):
+    """Negative cache of the candidates rejected for properties, or None when disabled"""
+    scope = settings.get('rejection_cache', 'run')
+    if not scope or scope == 'off':
+        return None
+    return get_rejection_cache(settings['experiment_design'], properties,
+                               "run" if scope is True else scope,
+                               path=settings.get('rejection_cache_path'))
+
+
+def create_yield_tracker(settings):
+    """YieldTracker with the retry budgets and policy of settings (0 or None disables a budget)"""
+    def budget(name, default=None, convert=int):
+        value = settings.get(name, default)
+        return convert(value) if value else None
+
+    return YieldTracker(
+        policy=settings.get('retry_policy') or "partial",
+        max_iteration_attempts=budget(
+            'max_iteration_attempts', DEFAULT_MAX_ITERATION_ATTEMPTS),
+        max_run_attempts=budget('max_run_attempts'),
+        max_attempts_per_stimulus=budget(
+            'max_attempts_per_stimulus', convert=float),
+        min_attempts=budget('retry_min_attempts', DEFAULT_MIN_ATTEMPTS) or 0)
+
+
+def request_completion(model_client, prompt, properties, params=None, response_cache=None):
+    """Call model_client.generate_completion, going through response_cache when one is given"""
+    if response_cache is None:
+        return model_client.generate_completion(prompt, properties, params)
+    key = make_cache_key(model_client.get_model_identity(),
+                         prompt, properties, params)
+    return response_cache.get_or_compute(
+        key, lambda: model_client.generate_completion(prompt, properties, params))
+
+
 # ======================
 # 5. Unified Agent Functions
 # ======================
 def check_stimulus_repetition(new_stimulus_dict, previous_stimuli_list):
     """
     If the value of any key (dimension) in new_stimulus_dict is exactly the same as the corresponding value in any stimulus in previous_stimuli_list, it is considered a repetition.
+    Scans the whole list; generate_stimuli keeps a RepetitionIndex instead.
     """
     for existing_stimulus in previous_stimuli_list:
         for key, new_value in new_stimulus_dict.items():
@@ -417,6 +1232,79 @@ def check_stimulus_repetition(new_stimulus_dict, previous_stimuli_list):
     return False
 
 
+def _normalize_value(value):
+    return value.lower() if isinstance(value, str) else str(value).lower()
+
+
+class RepetitionIndex:
+    """
+    Set of the lowercased values of every dimension of the stimuli added so far, giving
+    the same answer as check_stimulus_repetition in O(number of dimensions) per check.
+    Non-string values are compared as their lowercased str() (check_stimulus_repetition
+    raises on them).
+    """
+
+    def __init__(self, stimuli=(), near_duplicates=None):
+        self._values = {}
+        # optional NearDuplicateIndex: near-duplicate field values count as repetitions too
+        self.near_duplicates = near_duplicates
+        for stimulus in stimuli:
+            self.add(stimulus)
+
+    def add(self, stimulus):
+        for key, value in stimulus.items():
+            self._values.setdefault(key, set()).add(_normalize_value(value))
+        if self.near_duplicates is not None:
+            self.near_duplicates.add(stimulus)
+
+    def is_repetition(self, stimulus):
+        for key, value in stimulus.items():
+            values = self._values.get(key)
+            if values and _normalize_value(value) in values:
+                return True
+        if self.near_duplicates is not None:
+            match = self.near_duplicates.find_duplicate(stimulus)
+            if match is not None:
+                print(
+                    f"Near-duplicate stimulus: {match[0]} is {match[1]:.0%} similar to an existing one")
+                return True
+        return False
+
+    def __len__(self):
+        return sum(len(values) for values in self._values.values())
+
+
+class AcceptedStimuli:
+    """
+    Thread-safe set of accepted stimuli shared by parallel workers, with a RepetitionIndex
+    so repetition checks do not rescan the list.
+    Accepted stimuli are appended to `stimuli` (the run's previous_stimuli list).
+    """
+
+    def __init__(self, stimuli, near_duplicates=None):
+        self.stimuli = stimuli
+        self._index = RepetitionIndex(stimuli, near_duplicates)
+        self._lock = threading.Lock()
+
+    def is_repetition(self, stimulus):
+        with self._lock:
+            return self._index.is_repetition(stimulus)
+
+    def try_accept(self, stimulus, allow_repetition=False):
+        """Atomically check for repetition and accept; False if another worker got there first"""
+        with self._lock:
+            if not allow_repetition and self._index.is_repetition(stimulus):
+                return False
+            self.stimuli.append(stimulus)
+            self._index.add(stimulus)
+            return True
+
+    def snapshot(self):
+        """Copy of the accepted stimuli, for building prompts while other workers append"""
+        with self._lock:
+            return list(self.stimuli)
+
+
 def agent_1_generate_stimulus(
         model_client,
         experiment_design,
@@ -424,7 +1312,8 @@ def agent_1_generate_stimulus(
         properties,
         prompt_template=AGENT_1_PROMPT_TEMPLATE,
         params=None,
-        stop_event=None):
+        stop_event=None,
+        response_cache=None):
     """
     Agent 1: Generate new stimulus using the provided model client
     """
@@ -442,7 +1331,8 @@ def agent_1_generate_stimulus(
     )
 
     try:
-        result = model_client.generate_completion(prompt, properties, params)
+        result = request_completion(
+            model_client, prompt, properties, params, response_cache)
 
         # Check stop event again
         if stop_event and stop_event.is_set():
@@ -459,13 +1349,88 @@ def agent_1_generate_stimulus(
         return {"stimulus": "ERROR/ERROR"}
 
 
+def build_candidates_properties(properties, candidate_count):
+    """Schema for a list of candidate_count stimuli, each with the given properties"""
+    return {"candidates": {
+        "type": "array",
+        "items": {
+            "type": "object",
+            "properties": properties,
+            "required": list(properties.keys()),
+            "additionalProperties": False
+        },
+        "minItems": candidate_count,
+        "maxItems": candidate_count
+    }}
+
+
+def agent_1_generate_candidates(
+        model_client,
+        experiment_design,
+        previous_stimuli,
+        properties,
+        candidate_count,
+        prompt_template=AGENT_1_MULTI_PROMPT_TEMPLATE,
+        params=None,
+        stop_event=None,
+        response_cache=None):
+    """
+    Agent 1: Generate up to candidate_count new stimuli in one call. Malformed candidates
+    and duplicates within the batch are dropped; errors and stops are reported the same
+    way as agent_1_generate_stimulus, as a single-item list.
+    """
+    if stop_event and stop_event.is_set():
+        print("Generation stopped by user in agent_1_generate_candidates.")
+        return [{"stimulus": "STOPPED"}]
+
+    # Use fixed generation_requirements
+    generation_requirements = "Please generate new stimuli in the same format as the existing stimuli, and ensure that the new stimuli are different from those in the existing stimuli."
+
+    prompt = prompt_template.format(
+        candidate_count=candidate_count,
+        experiment_design=experiment_design,
+        previous_stimuli=previous_stimuli,
+        generation_requirements=generation_requirements
+    )
+
+    try:
+        result = request_completion(
+            model_client, prompt, build_candidates_properties(properties, candidate_count), params, response_cache)
+
+        if stop_event and stop_event.is_set():
+            print(
+                "Generation stopped by user after API call in agent_1_generate_candidates.")
+            return [{"stimulus": "STOPPED"}]
+
+        if "error" in result or not isinstance(result.get("candidates"), list):
+            return [{"stimulus": "ERROR/ERROR"}]
+
+        candidates = []
+        seen = set()
+        for candidate in result["candidates"]:
+            if not isinstance(candidate, dict) or any(key not in candidate for key in properties):
+                continue
+            # the same value in any dimension counts as a repetition, as in check_stimulus_repetition
+            values = {(key, str(value).lower())
+                      for key, value in candidate.items()}
+            if values & seen:
+                continue
+            seen |= values
+            candidates.append(candidate)
+        return candidates or [{"stimulus": "ERROR/ERROR"}]
+    except Exception as e:
+        print(f"Error in agent_1_generate_candidates: {e}")
+        return [{"stimulus": "ERROR/ERROR"}]
+
+
 def agent_2_validate_stimulus(
         model_client,
         new_stimulus,
         experiment_design,
         properties,
         prompt_template=AGENT_2_PROMPT_TEMPLATE,
-        stop_event=None):
+        stop_event=None,
+        response_cache=None):
     """
     Agent 2: Validate experimental stimulus using the provided model client
     """
@@ -482,8 +1447,8 @@ def agent_2_validate_stimulus(
         # use temperature=0 parameter, get model-specific default params and override temperature
         fixed_params = model_client.get_default_params()
         fixed_params["temperature"] = 0
-        result = model_client.generate_completion(
-            prompt, properties, fixed_params)
+        result = request_completion(
+            model_client, prompt, properties, fixed_params, response_cache)
 
         print("Agent 2 Output:", result)
 
@@ -503,6 +1468,90 @@ def agent_2_validate_stimulus(
         return {"error": "Failed to validate stimulus"}
 
 
+def agent_2_validate_stimuli_batch(
+        model_client,
+        new_stimuli,
+        experiment_design,
+        properties,
+        prompt_template=AGENT_2_BATCH_PROMPT_TEMPLATE,
+        stop_event=None,
+        websocket_callback=None,
+        response_cache=None):
+    """
+    Agent 2: Validate several stimuli in one request. Returns one result per stimulus, in
+    the same form as agent_2_validate_stimulus. Stimuli the batch response has no
+    usable verdict for are validated one by one instead.
+    """
+    if stop_event and stop_event.is_set():
+        print("Generation stopped by user in agent_2_validate_stimuli_batch.")
+        return [{"error": "Stopped by user"} for _ in new_stimuli]
+
+    stimulus_count = len(new_stimuli)
+    verdict_properties = {name: schema if isinstance(schema, dict) else {"type": "boolean", "description": str(schema)}
+                          for name, schema in properties.items()}
+    batch_properties = {"results": {
+        "type": "array",
+        "items": {
+            "type": "object",
+            "properties": verdict_properties,
+            "required": list(verdict_properties.keys()),
+            "additionalProperties": False
+        },
+        "minItems": stimulus_count,
+        "maxItems": stimulus_count
+    }}
+    prompt = prompt_template.format(
+        stimulus_count=stimulus_count,
+        new_stimuli="\n".join(
+            f"{number}. {stimulus}" for number, stimulus in enumerate(new_stimuli, 1)),
+        experiment_design=experiment_design
+    )
+
+    results = [None] * stimulus_count
+    try:
+        fixed_params = model_client.get_default_params()
+        fixed_params["temperature"] = 0
+        result = request_completion(
+            model_client, prompt, batch_properties, fixed_params, response_cache)
+
+        print("Agent 2 Batch Output:", result)
+
+        if stop_event and stop_event.is_set():
+            print(
+                "Generation stopped by user after API call in agent_2_validate_stimuli_batch.")
+            return [{"error": "Stopped by user"} for _ in new_stimuli]
+
+        verdicts = result.get("results") if "error" not in result else None
+        if isinstance(verdicts, list) and len(verdicts) == stimulus_count:
+            for index, verdict in enumerate(verdicts):
+                if isinstance(verdict, dict) and all(isinstance(verdict.get(name), bool) for name in properties):
+                    results[index] = {name: verdict[name]
+                                      for name in properties}
+        else:
+            print(f"Agent 2 batch response unusable: {result}")
+    except Exception as e:
+        print(f"Error in agent_2_validate_stimuli_batch: {e}")
+
+    missing = [index for index, verdict in enumerate(results) if verdict is None]
+    if websocket_callback:
+        websocket_callback(
+            "validator", f"Validated {stimulus_count - len(missing)}/{stimulus_count} candidates in one request")
+    if missing and websocket_callback:
+        websocket_callback(
+            "validator", f"Malformed batch verdicts for {len(missing)} candidate(s), validating them one by one...")
+    for index in missing:
+        results[index] = agent_2_validate_stimulus(
+            model_client=model_client,
+            new_stimulus=new_stimuli[index],
+            experiment_design=experiment_design,
+            properties=properties,
+            prompt_template=AGENT_2_PROMPT_TEMPLATE,
+            stop_event=stop_event,
+            response_cache=response_cache
+        )
+    return results
+
+
 def agent_2_validate_stimulus_individual(
         model_client,
         new_stimulus,
@@ -510,36 +1559,58 @@ def agent_2_validate_stimulus_individual(
         properties,
         prompt_template=AGENT_2_PROMPT_TEMPLATE,
         stop_event=None,
-        websocket_callback=None):
+        websocket_callback=None,
+        response_cache=None,
+        concurrent=False,
+        group_size=1,
+        planner=None):
     """
-    Agent 2: Validate experimental stimulus by checking each criterion individually
+    Agent 2: Validate experimental stimulus by checking each criterion individually.
+    With concurrent=True all criteria are checked at once, see _validate_criteria_concurrently.
+    With group_size > 1 (or "auto", chosen by the planner) several criteria share a
+    request, see _validate_criteria_grouped.
     """
     if stop_event and stop_event.is_set():
         print("Generation stopped by user in agent_2_validate_stimulus_individual.")
         return {"error": "Stopped by user"}
 
-    validation_results = {}
-
-    # Create individual prompt template for each criterion
-    individual_prompt_template = """\
-Please verify the following NEW STIMULUS with utmost precision for the specific criterion mentioned below.
-
-NEW STIMULUS: {new_stimulus}
-
-Experimental stimuli design: {experiment_design}
+    if group_size != 1 and len(properties) > 1:
+        try:
+            groups = (planner or ValidationPlanner()).plan_groups(
+                properties.keys(), group_size)
+            return _validate_criteria_grouped(
+                model_client, new_stimulus, experiment_design, properties, groups,
+                stop_event, websocket_callback, response_cache, planner)
+        except Exception as e:
+            print(f"Error in agent_2_validate_stimulus_individual: {e}")
+            return {"error": "Failed to validate stimulus individually"}
 
-SPECIFIC CRITERION TO VALIDATE:
-Property: {property_name}
-Description: {property_description}
+    if concurrent and len(properties) > 1:
+        try:
+            return _validate_criteria_concurrently(
+                model_client, new_stimulus, experiment_design, properties,
+                stop_event, websocket_callback, response_cache, planner)
+        except Exception as e:
+            print(f"Error in agent_2_validate_stimulus_individual: {e}")
+            return {"error": "Failed to validate stimulus individually"}
 
-Please return in JSON format with only one field: "{property_name}" (boolean: true if criterion is met, false otherwise).
-"""
+    validation_results = {}
 
     try:
         total_criteria = len(properties)
         current_criterion = 0
 
-        for property_name, property_description in properties.items():
+        criteria_order = list(properties.keys())
+        if planner is not None:
+            criteria_order = planner.order(properties.keys())
+            if planner.adaptive_order and planner.note_order(criteria_order):
+                order_msg = f"Criteria order: {planner.describe_order(criteria_order)}"
+                print(order_msg)
+                if websocket_callback:
+                    websocket_callback("validator", order_msg)
+
+        for property_name in criteria_order:
+            property_description = properties[property_name]
             current_criterion += 1
 
             if stop_event and stop_event.is_set():
@@ -552,7 +1623,7 @@ Please return in JSON format with only one field: "{property_name}" (boolean: tr
                     "validator", f"Validating criterion {current_criterion}/{total_criteria}: {property_name}")
 
             # Create prompt for individual criterion
-            prompt = individual_prompt_template.format(
+            prompt = AGENT_2_INDIVIDUAL_PROMPT_TEMPLATE.format(
                 new_stimulus=new_stimulus,
                 experiment_design=experiment_design,
                 property_name=property_name,
@@ -566,8 +1637,10 @@ Please return in JSON format with only one field: "{property_name}" (boolean: tr
             fixed_params = model_client.get_default_params()
             fixed_params["temperature"] = 0
 
-            result = model_client.generate_completion(
-                prompt, single_property, fixed_params)
+            started = time.perf_counter()
+            result = request_completion(
+                model_client, prompt, single_property, fixed_params, response_cache)
+            latency = time.perf_counter() - started
 
             print(f"Agent 2 Individual Validation - {property_name}: {result}")
 
@@ -579,6 +1652,10 @@ Please return in JSON format with only one field: "{property_name}" (boolean: tr
                         "validator", f"Error validating criterion {property_name}: {result.get('error', 'Unknown error')}")
                 return {"error": f"Failed to validate criterion {property_name}: {result.get('error', 'Unknown error')}"}
 
+            if planner is not None:
+                planner.record(property_name, result.get(
+                    property_name, False), latency)
+
             # Extract the validation result for this criterion
             if property_name in result:
                 validation_results[property_name] = result[property_name]
@@ -589,6 +1666,8 @@ Please return in JSON format with only one field: "{property_name}" (boolean: tr
 
                 # Early stop: if any criterion fails, immediately reject
                 if not result[property_name]:
+                    if planner is not None:
+                        planner.record_rejection(current_criterion)
                     if websocket_callback:
                         websocket_callback(
                             "validator", f"Early rejection: Criterion {property_name} failed. Stopping validation.")
@@ -599,6 +1678,8 @@ Please return in JSON format with only one field: "{property_name}" (boolean: tr
                 print(
                     f"Warning: {property_name} not found in result, assuming False")
                 validation_results[property_name] = False
+                if planner is not None:
+                    planner.record_rejection(current_criterion)
                 if websocket_callback:
                     websocket_callback(
                         "validator", f"Criterion {property_name}: FAILED (parsing error)")
@@ -619,6 +1700,202 @@ Please return in JSON format with only one field: "{property_name}" (boolean: tr
         return {"error": "Failed to validate stimulus individually"}
 
 
+def _validate_criteria_grouped(
+        model_client,
+        new_stimulus,
+        experiment_design,
+        properties,
+        groups,
+        stop_event=None,
+        websocket_callback=None,
+        response_cache=None,
+        planner=None):
+    """
+    Validate the criteria one group (list of names) per request, in order. The first
+    failed criterion rejects the stimulus without checking the remaining groups.
+    """
+    validation_results = {}
+    if websocket_callback and (planner is None or planner.note_order(groups)):
+        websocket_callback(
+            "validator", "Criteria groups: " + " | ".join(", ".join(group) for group in groups))
+
+    for group_number, group in enumerate(groups, 1):
+        if stop_event and stop_event.is_set():
+            print(
+                f"Generation stopped by user while validating {', '.join(group)}.")
+            return {"error": "Stopped by user"}
+
+        if websocket_callback:
+            websocket_callback(
+                "validator", f"Validating criteria group {group_number}/{len(groups)}: {', '.join(group)}")
+
+        if len(group) == 1:
+            # same prompt as individual validation, so both modes share cached responses
+            prompt = AGENT_2_INDIVIDUAL_PROMPT_TEMPLATE.format(
+                new_stimulus=new_stimulus,
+                experiment_design=experiment_design,
+                property_name=group[0],
+                property_description=properties[group[0]]
+            )
+        else:
+            prompt = AGENT_2_GROUP_PROMPT_TEMPLATE.format(
+                new_stimulus=new_stimulus,
+                experiment_design=experiment_design,
+                criteria="\n".join(
+                    f"- {name}: {properties[name]}" for name in group),
+                criteria_names=", ".join(f'"{name}"' for name in group)
+            )
+        group_properties = {name: properties[name] for name in group}
+
+        fixed_params = model_client.get_default_params()
+        fixed_params["temperature"] = 0
+
+        result = request_completion(
+            model_client, prompt, group_properties, fixed_params, response_cache)
+
+        print(
+            f"Agent 2 Grouped Validation - {', '.join(group)}: {result}")
+
+        if "error" in result:
+            print(
+                f"Agent 2 Grouped API error for {', '.join(group)}: {result}")
+            if websocket_callback:
+                websocket_callback(
+                    "validator", f"Error validating criteria {', '.join(group)}: {result.get('error', 'Unknown error')}")
+            return {"error": f"Failed to validate criteria {', '.join(group)}: {result.get('error', 'Unknown error')}"}
+
+        failed = None
+        for name in group:
+            if name in result:
+                validation_results[name] = result[name]
+                status = "PASSED" if result[name] else "FAILED"
+            else:
+                print(f"Warning: {name} not found in result, assuming False")
+                validation_results[name] = False
+                status = "FAILED (parsing error)"
+            if planner is not None:
+                planner.record(name, validation_results[name])
+            if websocket_callback:
+                websocket_callback(
+                    "validator", f"Criterion {name}: {status}")
+            if not validation_results[name] and failed is None:
+                failed = name
+
+        # Early stop: if any criterion fails, skip the remaining groups
+        if failed is not None:
+            if planner is not None:
+                planner.record_rejection(group_number)
+            if websocket_callback:
+                websocket_callback(
+                    "validator", f"Early rejection: Criterion {failed} failed. Stopping validation.")
+            print(
+                f"Agent 2 Grouped Validation - Early stop: {failed} failed")
+            return validation_results
+
+    print("Agent 2 Grouped Validation - All Results:", validation_results)
+    if websocket_callback:
+        websocket_callback(
+            "validator", "All criteria passed successfully!")
+    return validation_results
+
+
+def _validate_criteria_concurrently(
+        model_client,
+        new_stimulus,
+        experiment_design,
+        properties,
+        stop_event=None,
+        websocket_callback=None,
+        response_cache=None,
+        planner=None):
+    """
+    Dispatch every criterion check at once and report results in completion order.
+    The first failed (or errored) criterion rejects the stimulus and cancels the
+    checks still outstanding.
+    """
+    total_criteria = len(properties)
+    cancel_event = threading.Event()
+    validation_results = {}
+
+    def check_criterion(property_name, property_description):
+        prompt = AGENT_2_INDIVIDUAL_PROMPT_TEMPLATE.format(
+            new_stimulus=new_stimulus,
+            experiment_design=experiment_design,
+            property_name=property_name,
+            property_description=property_description
+        )
+        fixed_params = model_client.get_default_params()
+        fixed_params["temperature"] = 0
+        started = time.perf_counter()
+        with cancellable_requests(_any_event(cancel_event, stop_event)):
+            result = request_completion(
+                model_client, prompt, {property_name: property_description}, fixed_params, response_cache)
+        if planner is not None and "error" not in result:
+            planner.record(property_name, result.get(property_name, False),
+                           time.perf_counter() - started)
+        return result
+
+    if websocket_callback:
+        websocket_callback(
+            "validator", f"Validating {total_criteria} criteria concurrently: {', '.join(properties)}")
+    executor = get_fanout_executor()
+    futures = {executor.submit(check_criterion, property_name, property_description): property_name
+               for property_name, property_description in properties.items()}
+    pending = set(futures)
+
+    def reject():
+        cancel_event.set()
+        for future in pending:
+            future.cancel()
+
+    try:
+        while pending:
+            done, pending = wait_futures(
+                pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            if stop_event and stop_event.is_set():
+                print("Generation stopped by user during concurrent validation.")
+                return {"error": "Stopped by user"}
+
+            for future in done:
+                property_name = futures[future]
+                result = future.result()
+                print(f"Agent 2 Individual Validation - {property_name}: {result}")
+
+                if "error" in result:
+                    print(
+                        f"Agent 2 Individual API error for {property_name}: {result}")
+                    if websocket_callback:
+                        websocket_callback(
+                            "validator", f"Error validating criterion {property_name}: {result.get('error', 'Unknown error')}")
+                    return {"error": f"Failed to validate criterion {property_name}: {result.get('error', 'Unknown error')}"}
+
+                passed = result.get(property_name, False)
+                validation_results[property_name] = passed
+                if websocket_callback:
+                    status = "PASSED" if passed else (
+                        "FAILED" if property_name in result else "FAILED (parsing error)")
+                    websocket_callback(
+                        "validator", f"Criterion {property_name}: {status} ({len(validation_results)}/{total_criteria} done)")
+
+                # Early stop: if any criterion fails, immediately reject
+                if not passed:
+                    if websocket_callback:
+                        websocket_callback(
+                            "validator", f"Early rejection: Criterion {property_name} failed. Cancelling {len(pending)} outstanding check(s).")
+                    print(
+                        f"Agent 2 Individual Validation - Early stop: {property_name} failed")
+                    return validation_results
+    finally:
+        # no-op when everything completed
+        reject()
+
+    print("Agent 2 Individual Validation - All Results:", validation_results)
+    if websocket_callback:
+        websocket_callback(
+            "validator", "All criteria passed successfully!")
+    return validation_results
+
+
 def generate_scoring_requirements(properties):
     """
     Generate scoring requirements text from properties dictionary
@@ -638,13 +1915,21 @@ def generate_scoring_requirements(properties):
     return "\n".join(requirements)
 
 
+def clamp_score(score, aspect_details):
+    """Clamp a score to the aspect's minimum/maximum (booleans count as 0/1); None if it is not a number"""
+    if not isinstance(score, (int, float)):
+        return None
+    return max(aspect_details.get('minimum', 0), min(aspect_details.get('maximum', 10), int(score)))
+
+
 def agent_3_score_stimulus(
         model_client,
         valid_stimulus,
         experiment_design,
         properties,
         prompt_template=AGENT_3_PROMPT_TEMPLATE,
-        stop_event=None):
+        stop_event=None,
+        response_cache=None):
     """
     Agent 3: Score experimental stimulus using the provided model client
     """
@@ -665,8 +1950,8 @@ def agent_3_score_stimulus(
         # use temperature=0 parameter, get model-specific default params and override temperature
         fixed_params = model_client.get_default_params()
         fixed_params["temperature"] = 0
-        result = model_client.generate_completion(
-            prompt, properties, fixed_params)
+        result = request_completion(
+            model_client, prompt, properties, fixed_params, response_cache)
 
         if stop_event and stop_event.is_set():
             print("Generation stopped by user after API call in agent_3_score_stimulus.")
@@ -682,124 +1967,137 @@ def agent_3_score_stimulus(
         return {field: 0 for field in properties.keys()}
 
 
-def agent_3_score_stimulus_individual(
-        model_client,
-        valid_stimulus,
-        experiment_design,
-        properties,
-        prompt_template=AGENT_3_PROMPT_TEMPLATE,
-        stop_event=None,
-        websocket_callback=None):
-    """
-    Agent 3: Score experimental stimulus by evaluating each aspect individually
-    """
-    if stop_event and stop_event.is_set():
-        print("Generation stopped by user in agent_3_score_stimulus_individual.")
-        return {field: 0 for field in properties.keys()} if properties else {}
-
-    scoring_results = {}
-
-    # Create individual prompt template for each aspect
-    individual_prompt_template = """\
-Please rate the following STIMULUS based on the specific aspect mentioned below for a psychological experiment:
-
-STIMULUS: {valid_stimulus}
-Experimental stimuli design: {experiment_design}
-
-SPECIFIC ASPECT TO SCORE:
-- Aspect Name: {aspect_name}
-- Description: {aspect_description}
-- Minimum Score: {min_score}
-- Maximum Score: {max_score}
-- Score Range: You must provide an integer score between {min_score} and {max_score} (inclusive)
-
-SCORING INSTRUCTIONS:
-Rate this stimulus on the "{aspect_name}" dimension based on the provided description. Your score should reflect how well the stimulus meets this criterion, with {min_score} being the lowest possible score and {max_score} being the highest possible score.
-
-Please return in JSON format with only one field: "{aspect_name}" (integer score within the specified range {min_score}-{max_score}).
-"""
-
-    try:
-        total_aspects = len(properties)
-        current_aspect = 0
-
-        for aspect_name, aspect_details in properties.items():
-            current_aspect += 1
-
-            if stop_event and stop_event.is_set():
-                print(
-                    f"Generation stopped by user while scoring {aspect_name}.")
-                return {field: 0 for field in properties.keys()}
+def agent_3_score_stimulus_individual(
+        model_client,
+        valid_stimulus,
+        experiment_design,
+        properties,
+        prompt_template=AGENT_3_PROMPT_TEMPLATE,
+        stop_event=None,
+        websocket_callback=None,
+        response_cache=None,
+        max_concurrency=DEFAULT_SCORING_CONCURRENCY):
+    """
+    Agent 3: Score experimental stimulus by evaluating each aspect individually.
+    Up to max_concurrency aspects are scored at the same time (1 scores them one by one).
+    """
+    if stop_event and stop_event.is_set():
+        print("Generation stopped by user in agent_3_score_stimulus_individual.")
+        return {field: 0 for field in properties.keys()} if properties else {}
 
-            if websocket_callback:
-                websocket_callback(
-                    "scorer", f"Evaluating aspect {current_aspect}/{total_aspects}: {aspect_name}")
+    scoring_results = {}
 
-            # Extract min and max scores from aspect details
-            min_score = aspect_details.get('minimum', 0)
-            max_score = aspect_details.get('maximum', 10)
-            description = aspect_details.get('description', aspect_name)
+    def score_aspect(aspect_name, aspect_details):
+        # Extract min and max scores from aspect details
+        min_score = aspect_details.get('minimum', 0)
+        max_score = aspect_details.get('maximum', 10)
+        description = aspect_details.get('description', aspect_name)
 
-            # Create prompt for individual aspect
-            prompt = individual_prompt_template.format(
-                valid_stimulus=valid_stimulus,
-                experiment_design=experiment_design,
-                aspect_name=aspect_name,
-                aspect_description=description,
-                min_score=min_score,
-                max_score=max_score
-            )
+        # Create prompt for individual aspect
+        prompt = AGENT_3_INDIVIDUAL_PROMPT_TEMPLATE.format(
+            valid_stimulus=valid_stimulus,
+            experiment_design=experiment_design,
+            aspect_name=aspect_name,
+            aspect_description=description,
+            min_score=min_score,
+            max_score=max_score
+        )
 
-            # Create properties dict with single aspect (include all details for JSON schema)
-            single_aspect = {aspect_name: {
-                'type': 'integer',
-                'description': description,
-                'minimum': min_score,
-                'maximum': max_score
-            }}
+        # Create properties dict with single aspect (include all details for JSON schema)
+        single_aspect = {aspect_name: {
+            'type': 'integer',
+            'description': description,
+            'minimum': min_score,
+            'maximum': max_score
+        }}
 
-            # Get model-specific default params and override temperature
-            fixed_params = model_client.get_default_params()
-            fixed_params["temperature"] = 0
+        # Get model-specific default params and override temperature
+        fixed_params = model_client.get_default_params()
+        fixed_params["temperature"] = 0
 
-            result = model_client.generate_completion(
-                prompt, single_aspect, fixed_params)
+        with cancellable_requests(stop_event):
+            result = request_completion(
+                model_client, prompt, single_aspect, fixed_params, response_cache)
 
-            print(f"Agent 3 Individual Scoring - {aspect_name}: {result}")
+        print(f"Agent 3 Individual Scoring - {aspect_name}: {result}")
 
-            if "error" in result:
-                print(
-                    f"Agent 3 Individual API error for {aspect_name}: {result}")
+        if "error" in result:
+            print(
+                f"Agent 3 Individual API error for {aspect_name}: {result}")
+            if websocket_callback:
+                websocket_callback(
+                    "scorer", f"Error scoring aspect {aspect_name}: {result.get('error', 'Unknown error')}")
+            return 0
+
+        # Extract the scoring result for this aspect
+        if aspect_name in result:
+            # Ensure score is within valid range
+            score = clamp_score(result[aspect_name], aspect_details)
+            if score is not None:
                 if websocket_callback:
                     websocket_callback(
-                        "scorer", f"Error scoring aspect {aspect_name}: {result.get('error', 'Unknown error')}")
-                scoring_results[aspect_name] = 0
-                continue
+                        "scorer", f"Aspect {aspect_name}: {score}/{max_score}")
+                return score
+            print(
+                f"Warning: Invalid score for {aspect_name}, assuming 0")
+            if websocket_callback:
+                websocket_callback(
+                    "scorer", f"Aspect {aspect_name}: 0/{max_score} (invalid response)")
+            return 0
+
+        print(
+            f"Warning: {aspect_name} not found in result, assuming 0")
+        if websocket_callback:
+            websocket_callback(
+                "scorer", f"Aspect {aspect_name}: 0/{max_score} (parsing error)")
+        return 0
 
-            # Extract the scoring result for this aspect
-            if aspect_name in result:
-                score = result[aspect_name]
-                # Ensure score is within valid range
-                if isinstance(score, (int, float)):
-                    score = max(min_score, min(max_score, int(score)))
-                    scoring_results[aspect_name] = score
+    try:
+        total_aspects = len(properties)
+        aspects = list(properties.items())
+
+        if max_concurrency > 1 and total_aspects > 1:
+            # keep at most max_concurrency aspects in flight, refilling as they land
+            executor = get_fanout_executor()
+            futures = {}
+            pending = set()
+            next_aspect = 0
+            while next_aspect < total_aspects or pending:
+                while next_aspect < total_aspects and len(pending) < max_concurrency:
+                    aspect_name, aspect_details = aspects[next_aspect]
+                    next_aspect += 1
                     if websocket_callback:
                         websocket_callback(
-                            "scorer", f"Aspect {aspect_name}: {score}/{max_score}")
-                else:
+                            "scorer", f"Evaluating aspect {next_aspect}/{total_aspects}: {aspect_name}")
+                    future = executor.submit(
+                        score_aspect, aspect_name, aspect_details)
+                    futures[future] = aspect_name
+                    pending.add(future)
+
+                done, pending = wait_futures(
+                    pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                if stop_event and stop_event.is_set():
+                    print("Generation stopped by user during concurrent scoring.")
+                    for future in pending:
+                        future.cancel()
+                    return {field: 0 for field in properties.keys()}
+                for future in done:
+                    scoring_results[futures[future]] = future.result()
+            # report in the declared aspect order, not completion order
+            scoring_results = {aspect_name: scoring_results[aspect_name]
+                               for aspect_name in properties}
+        else:
+            for current_aspect, (aspect_name, aspect_details) in enumerate(aspects, 1):
+                if stop_event and stop_event.is_set():
                     print(
-                        f"Warning: Invalid score for {aspect_name}, assuming 0")
-                    scoring_results[aspect_name] = 0
-                    if websocket_callback:
-                        websocket_callback(
-                            "scorer", f"Aspect {aspect_name}: 0/{max_score} (invalid response)")
-            else:
-                print(
-                    f"Warning: {aspect_name} not found in result, assuming 0")
-                scoring_results[aspect_name] = 0
+                        f"Generation stopped by user while scoring {aspect_name}.")
+                    return {field: 0 for field in properties.keys()}
+
                 if websocket_callback:
                     websocket_callback(
-                        "scorer", f"Aspect {aspect_name}: 0/{max_score} (parsing error)")
+                        "scorer", f"Evaluating aspect {current_aspect}/{total_aspects}: {aspect_name}")
+                scoring_results[aspect_name] = score_aspect(
+                    aspect_name, aspect_details)
 
         print("Agent 3 Individual Scoring - All Results:", scoring_results)
         if websocket_callback:
@@ -809,12 +2107,96 @@ Please return in JSON format with only one field: "{aspect_name}" (integer score
             websocket_callback(
                 "scorer", f"Individual scoring completed! Total: {total_score}/{max_possible}")
         return scoring_results
-
     except Exception as e:
         print(f"Error in agent_3_score_stimulus_individual: {e}")
         return {field: 0 for field in properties.keys()}
 
 
+def agent_3_score_stimuli_batch(
+        model_client,
+        valid_stimuli,
+        experiment_design,
+        properties,
+        prompt_template=AGENT_3_BATCH_PROMPT_TEMPLATE,
+        stop_event=None,
+        response_cache=None):
+    """
+    Agent 3: Score several stimuli ({stimulus_id: stimulus}) in one request. Returns
+    {stimulus_id: scores} with every score clamped to its aspect's range. Stimuli the
+    batch response has no usable scores for are scored one by one instead.
+    """
+    zero_scores = {field: 0 for field in properties.keys()}
+    if stop_event and stop_event.is_set():
+        print("Generation stopped by user in agent_3_score_stimuli_batch.")
+        return {stimulus_id: dict(zero_scores) for stimulus_id in valid_stimuli}
+
+    stimulus_ids = list(valid_stimuli.keys())
+    item_properties = {"stimulus_id": {"type": "integer", "enum": stimulus_ids}}
+    item_properties.update(properties)
+    batch_properties = {"scores": {
+        "type": "array",
+        "items": {
+            "type": "object",
+            "properties": item_properties,
+            "required": list(item_properties.keys()),
+            "additionalProperties": False
+        },
+        "minItems": len(stimulus_ids),
+        "maxItems": len(stimulus_ids)
+    }}
+    prompt = prompt_template.format(
+        valid_stimuli="\n".join(
+            f"- stimulus_id {stimulus_id}: {stimulus}" for stimulus_id, stimulus in valid_stimuli.items()),
+        experiment_design=experiment_design,
+        scoring_requirements=generate_scoring_requirements(properties)
+    )
+
+    scored = {}
+    try:
+        fixed_params = model_client.get_default_params()
+        fixed_params["temperature"] = 0
+        result = request_completion(
+            model_client, prompt, batch_properties, fixed_params, response_cache)
+
+        print("Agent 3 Batch Output:", result)
+
+        if stop_event and stop_event.is_set():
+            print("Generation stopped by user after API call in agent_3_score_stimuli_batch.")
+            return {stimulus_id: dict(zero_scores) for stimulus_id in valid_stimuli}
+
+        entries = result.get("scores") if "error" not in result else None
+        if isinstance(entries, list):
+            entries = [entry for entry in entries if isinstance(entry, dict)]
+            ids = [entry.get("stimulus_id") for entry in entries]
+            if sorted(ids, key=str) != sorted(stimulus_ids, key=str) and len(entries) == len(stimulus_ids):
+                # unusable IDs, fall back to the order of the stimuli in the prompt
+                ids = stimulus_ids
+            for stimulus_id, entry in zip(ids, entries):
+                if stimulus_id not in valid_stimuli or stimulus_id in scored:
+                    continue
+                scores = {aspect_name: clamp_score(entry.get(aspect_name), aspect_details)
+                          for aspect_name, aspect_details in properties.items()}
+                if all(score is not None for score in scores.values()):
+                    scored[stimulus_id] = scores
+        else:
+            print(f"Agent 3 batch response unusable: {result}")
+    except Exception as e:
+        print(f"Error in agent_3_score_stimuli_batch: {e}")
+
+    for stimulus_id in stimulus_ids:
+        if stimulus_id not in scored:
+            scored[stimulus_id] = agent_3_score_stimulus(
+                model_client=model_client,
+                valid_stimulus=valid_stimuli[stimulus_id],
+                experiment_design=experiment_design,
+                properties=properties,
+                prompt_template=AGENT_3_PROMPT_TEMPLATE,
+                stop_event=stop_event,
+                response_cache=response_cache
+            )
+    return scored
+
+
 # ======================
 # 6. Main Flow Function
 # ======================
@@ -826,6 +2208,7 @@ def generate_stimuli(settings):
     experiment_design = settings['experiment_design']
     previous_stimuli = settings['previous_stimuli'] if settings['previous_stimuli'] else [
     ]
+    seed_count = len(previous_stimuli)
     model_choice = settings.get('model_choice', 'GPT-4o')
 
     ablation = settings.get('ablation', {
@@ -835,6 +2218,27 @@ def generate_stimuli(settings):
 
     repetition_count = 0
     validation_fails = 0
+    # check individual validation criteria concurrently instead of one after another
+    concurrent_validation = settings.get('agent_2_concurrent_validation', False)
+    # how many aspects individual scoring evaluates at the same time
+    scoring_concurrency = max(1, int(settings.get(
+        'agent_3_scoring_concurrency') or DEFAULT_SCORING_CONCURRENCY))
+    # candidates the generator returns per call (1 = one stimulus per call)
+    candidates_per_call = max(
+        1, int(settings.get('agent_1_candidates_per_call', 1) or 1))
+    # criteria per validation request in individual validation mode (a number or "auto")
+    criteria_group_size = settings.get('agent_2_criteria_group_size') or 1
+    if criteria_group_size != "auto":
+        criteria_group_size = max(1, int(criteria_group_size))
+    # criterion statistics are shared by all runs of the same design
+    validation_planner = ValidationPlanner(
+        get_criteria_stats(experiment_design, settings.get('agent_2_properties', {})),
+        adaptive_order=settings.get('agent_2_adaptive_order', False))
+    # validate the candidates of one generator call together (batch validation mode only)
+    batch_validation = settings.get('agent_2_batch_validation', False) and not settings.get(
+        'agent_2_individual_validation', False)
+    validation_batch_size = max(
+        1, int(settings.get('agent_2_batch_size', 8) or 8))
 
     # Get custom parameters for custom model
     custom_params = settings.get('params', None)
@@ -883,6 +2287,42 @@ def generate_stimuli(settings):
     if check_stop():
         return None, None
 
+    # Mechanical criteria are checked by local rules, the model only sees the rest
+    try:
+        local_validator = create_local_validator(settings)
+    except ValueError as e:
+        error_msg = f"Invalid local validation rules: {str(e)}"
+        print(error_msg)
+        if websocket_callback:
+            websocket_callback("setup", error_msg)
+        return None, None
+    model_properties = agent_2_properties
+    if local_validator is not None:
+        model_properties = local_validator.model_properties(agent_2_properties)
+        rules_msg = f"Local validation rules: {', '.join(local_validator.rules)} ({len(model_properties)} criteria left to the model validator)"
+        print(rules_msg)
+        if websocket_callback:
+            websocket_callback("setup", rules_msg)
+
+    # Candidates the validator already rejected are rejected again without a request
+    try:
+        rejection_cache = create_rejection_cache(settings, model_properties)
+    except Exception as e:
+        print(f"Rejection cache unavailable, continuing without it: {e}")
+        rejection_cache = None
+    # the cache may be shared with earlier runs, report this run's share only
+    rejection_baseline = rejection_cache.get_stats() if rejection_cache is not None else None
+
+    # Attempt budgets of the regeneration loop, and the yield streamed while it runs
+    try:
+        yield_tracker = create_yield_tracker(settings)
+    except ValueError as e:
+        error_msg = f"Invalid retry settings: {str(e)}"
+        print(error_msg)
+        if websocket_callback:
+            websocket_callback("setup", error_msg)
+        return None, None
+
     agent_3_properties = settings.get('agent_3_properties', {})
     print("Agent 3 Properties:", agent_3_properties)
     if websocket_callback:
@@ -905,9 +2345,300 @@ def generate_stimuli(settings):
             websocket_callback("setup", error_msg)
         return None, None
 
+    # Deterministic (temperature=0) validator and scorer calls go through the response cache,
+    # generator calls only when explicitly enabled
+    try:
+        response_cache = create_response_cache(settings)
+    except Exception as e:
+        print(f"Response cache unavailable, continuing without it: {e}")
+        response_cache = None
+    generator_cache = response_cache if settings.get(
+        'cache_generator', False) else None
+
+    # Optionally open connections ahead of the first request
+    prewarm_count = int(settings.get('prewarm_connections') or 0)
+    if prewarm_count > 0:
+        warmed = model_client.prewarm_connections(prewarm_count)
+        print(f"Pre-warmed {warmed} connection(s) to the model endpoint")
+        if websocket_callback:
+            websocket_callback(
+                "setup", f"Pre-warmed {warmed} connection(s) to the model endpoint")
+
     if check_stop():
         return None, None
 
+    # Pause while every endpoint's circuit is open instead of failing every iteration
+    endpoints = sorted({_endpoint_key(api_url)
+                        for api_url in model_client.get_endpoints()})
+    circuit_breakers = [get_circuit_breaker(endpoint) for endpoint in endpoints]
+    circuit_max_wait = float(settings.get('circuit_max_wait', 300))
+
+    def wait_for_endpoint():
+        if not circuit_breakers or any(breaker.is_available() for breaker in circuit_breakers):
+            return
+        wait_msg = f"Model endpoint {', '.join(endpoints)} is unavailable (circuit open), next probe in {min(b.retry_in() for b in circuit_breakers):.0f}s..."
+        print(wait_msg)
+        if websocket_callback:
+            websocket_callback("circuit", wait_msg)
+        if not wait_until_available(circuit_breakers, stop_event, circuit_max_wait) and not stop_event.is_set():
+            raise CircuitOpenError(
+                f"Model endpoint {', '.join(endpoints)} still unavailable after {circuit_max_wait:.0f}s")
+
+    def generate_candidates(previous):
+        """One generator call; returns a list of candidates (several in multi-candidate mode)"""
+        previous = context_policy.select(previous)
+        if candidates_per_call > 1:
+            candidates = agent_1_generate_candidates(
+                model_client=model_client,
+                experiment_design=experiment_design,
+                previous_stimuli=previous,
+                properties=agent_1_properties,
+                candidate_count=candidates_per_call,
+                prompt_template=AGENT_1_MULTI_PROMPT_TEMPLATE,
+                params=custom_params,
+                stop_event=stop_event,
+                response_cache=generator_cache
+            )
+            if len(candidates) > 1 and websocket_callback:
+                websocket_callback(
+                    "generator", f"Generated {len(candidates)} candidates in one call")
+            return candidates
+        return [agent_1_generate_stimulus(
+            model_client=model_client,
+            experiment_design=experiment_design,
+            previous_stimuli=previous,
+            properties=agent_1_properties,
+            prompt_template=AGENT_1_PROMPT_TEMPLATE,
+            params=custom_params,
+            stop_event=stop_event,
+            response_cache=generator_cache
+        )]
+
+    def track_attempt(outcome, failed_criteria=(), slot=0):
+        """
+        Record the outcome of one attempt and stream the yield. Returns True when a retry
+        budget ends the run with the stimuli accepted so far, raises RetryBudgetExceeded
+        when it aborts the run.
+        """
+        action, reason = yield_tracker.record(outcome, failed_criteria, slot)
+        if outcome == "accepted" or yield_tracker.attempts % REPORT_INTERVAL == 0:
+            yield_msg = yield_tracker.describe()
+            print(yield_msg)
+            if websocket_callback:
+                websocket_callback("yield", yield_msg)
+        if action is None:
+            return False
+        if reason is None:
+            return True  # the run is already ending, and was reported
+        budget_msg = f"Retry budget exceeded: {reason}"
+        if action == "partial":
+            budget_msg += ", returning the stimuli accepted so far"
+        print(budget_msg)
+        if websocket_callback:
+            websocket_callback("all", budget_msg)
+        if action == "abort":
+            raise RetryBudgetExceeded(budget_msg)
+        return action == "partial"
+
+    def check_local_rules(stimuli):
+        """
+        Local rule verdicts for stimuli ({} without rules) and whether all of them passed.
+        Failing rules are reported right away.
+        """
+        if local_validator is None:
+            return {}, True
+        local_result, reasons = local_validator.check(stimuli)
+        if reasons:
+            local_msg = "Rejected by local rules: " + "; ".join(
+                f"{name} ({reason})" for name, reason in reasons.items())
+            print(local_msg)
+            if websocket_callback:
+                websocket_callback("validator", local_msg)
+        return local_result, not reasons
+
+    def known_rejection(stimuli):
+        """Verdict for a candidate the validator rejected before (None if it did not)"""
+        if rejection_cache is None:
+            return None
+        failed = rejection_cache.lookup(stimuli)
+        if failed is None:
+            return None
+        known_msg = f"Candidate was already rejected ({', '.join(failed)}), skipping validation"
+        print(known_msg)
+        if websocket_callback:
+            websocket_callback("validator", known_msg)
+        return {name: False for name in failed}
+
+    def remember_rejection(stimuli, validation_result):
+        if rejection_cache is not None and 'error' not in validation_result:
+            rejection_cache.add(stimuli, [name for name, value in validation_result.items()
+                                          if not value])
+
+    def validate_candidate(stimuli, individual_validation):
+        """
+        Validate one candidate: local rules first, then the model validator for the criteria
+        the rules do not cover. The verdicts of both are merged.
+        """
+        local_result, passed = check_local_rules(stimuli)
+        if not passed or (local_validator is not None and not model_properties):
+            return local_result
+        known = known_rejection(stimuli)
+        if known is not None:
+            return {**local_result, **known}
+        if individual_validation:
+            validation_result = agent_2_validate_stimulus_individual(
+                model_client=model_client,
+                new_stimulus=stimuli,
+                experiment_design=experiment_design,
+                properties=model_properties,
+                stop_event=stop_event,
+                websocket_callback=websocket_callback,
+                response_cache=response_cache,
+                concurrent=concurrent_validation,
+                group_size=criteria_group_size,
+                planner=validation_planner
+            )
+        else:
+            validation_result = agent_2_validate_stimulus(
+                model_client=model_client,
+                new_stimulus=stimuli,
+                experiment_design=experiment_design,
+                properties=model_properties,
+                prompt_template=AGENT_2_PROMPT_TEMPLATE,
+                stop_event=stop_event,
+                response_cache=response_cache
+            )
+        if 'error' in validation_result:
+            return validation_result
+        remember_rejection(stimuli, validation_result)
+        return {**local_result, **validation_result}
+
+    def next_candidates(previous, is_repetition):
+        """
+        Generate the next candidates as (stimulus, validation_result) pairs. validation_result
+        is None unless the candidates were validated in batches (repeated ones never are).
+        """
+        candidates = generate_candidates(previous)
+        verdicts = [None] * len(candidates)
+        if batch_validation and ablation["use_agent_2"] and len(candidates) > 1:
+            fresh = [index for index, stimulus in enumerate(candidates)
+                     if not is_repetition(stimulus)]
+            local_results = {}
+            if local_validator is not None:
+                # candidates failing a local rule never reach the batch request
+                for index in fresh:
+                    local_result, passed = check_local_rules(candidates[index])
+                    if passed and model_properties:
+                        local_results[index] = local_result
+                    else:
+                        verdicts[index] = local_result
+                fresh = list(local_results)
+            for index in fresh:
+                known = known_rejection(candidates[index])
+                if known is not None:
+                    verdicts[index] = {**local_results.get(index, {}), **known}
+            fresh = [index for index in fresh if verdicts[index] is None]
+            for start in range(0, len(fresh), validation_batch_size):
+                chunk = fresh[start:start + validation_batch_size]
+                if len(chunk) < 2:
+                    break
+                results = agent_2_validate_stimuli_batch(
+                    model_client=model_client,
+                    new_stimuli=[candidates[index] for index in chunk],
+                    experiment_design=experiment_design,
+                    properties=model_properties,
+                    stop_event=stop_event,
+                    websocket_callback=websocket_callback,
+                    response_cache=response_cache
+                )
+                for index, validation_result in zip(chunk, results):
+                    remember_rejection(candidates[index], validation_result)
+                    if 'error' not in validation_result:
+                        validation_result = {
+                            **local_results.get(index, {}), **validation_result}
+                    verdicts[index] = validation_result
+        return list(zip(candidates, verdicts))
+
+    # Optional local near-duplicate filter, consulted with every repetition check
+    try:
+        near_duplicate_index = create_near_duplicate_index(settings)
+    except ValueError as e:
+        error_msg = f"Invalid near-duplicate settings: {str(e)}"
+        print(error_msg)
+        if websocket_callback:
+            websocket_callback("setup", error_msg)
+        return None, None
+
+    # Which existing stimuli the generator sees (the seed stimuli the run started with stay pinned)
+    try:
+        context_policy = create_context_policy(settings, seed_count)
+    except ValueError as e:
+        error_msg = f"Invalid prompt context settings: {str(e)}"
+        print(error_msg)
+        if websocket_callback:
+            websocket_callback("setup", error_msg)
+        return None, None
+
+    # Score accepted stimuli in batches, trailing generation (batch scoring mode only)
+    batch_scorer = None
+    batch_scored_records = {}
+    batch_scoring_lock = threading.Lock()
+
+    def score_batch(valid_stimuli):
+        if websocket_callback:
+            websocket_callback(
+                "scorer", f"Scoring {len(valid_stimuli)} stimuli in one request...")
+        return agent_3_score_stimuli_batch(
+            model_client=model_client,
+            valid_stimuli=valid_stimuli,
+            experiment_design=experiment_design,
+            properties=agent_3_properties,
+            prompt_template=AGENT_3_BATCH_PROMPT_TEMPLATE,
+            stop_event=stop_event,
+            response_cache=response_cache
+        )
+
+    def on_scored(stimulus_id, scores):
+        with batch_scoring_lock:
+            record = batch_scored_records.pop(stimulus_id, None)
+            if record is not None:
+                record.update(scores)
+        print(f"Agent 3 Output (stimulus {stimulus_id}):", scores)
+        if websocket_callback:
+            websocket_callback(
+                "scorer", f"Scorer's Output (stimulus {stimulus_id}): {json.dumps(scores, indent=2)}")
+
+    if (settings.get('agent_3_batch_scoring', False) and ablation["use_agent_3"]
+            and not settings.get('agent_3_individual_scoring', False)):
+        batch_scorer = BatchCollector(
+            score_batch, on_scored,
+            batch_size=settings.get('agent_3_batch_size') or 5,
+            flush_interval=settings.get('agent_3_flush_interval') or 5.0,
+            default_result=lambda stimulus: {
+                field: 0 for field in agent_3_properties.keys()},
+            name=f"batch-scorer-{settings.get('session_id', 'default')}")
+
+    def queue_for_scoring(record):
+        """Hand an accepted record to the batch scorer; its scores are filled in when the batch lands"""
+        with batch_scoring_lock:
+            batch_scored_records[record["stimulus_id"]] = record
+        batch_scorer.submit(record["stimulus_id"], record["stimulus_content"])
+        if websocket_callback:
+            websocket_callback(
+                "scorer", f"Stimulus {record['stimulus_id']} queued for batch scoring")
+
+    def finish_batch_scoring():
+        """Score whatever is still queued before results are built"""
+        if batch_scorer is None:
+            return
+        batch_scorer.flush()
+        # records whose scores never arrived still get every score column
+        with batch_scoring_lock:
+            for record in batch_scored_records.values():
+                record.update({field: 0 for field in agent_3_properties.keys()
+                               if field not in record})
+            batch_scored_records.clear()
+
     # Create a function specifically for updating progress
     def update_progress(completed_iterations):
         if check_stop():
@@ -920,8 +2651,455 @@ def generate_stimuli(settings):
                 if session_update_callback:
                     session_update_callback()
 
+    def report_run_stats():
+        yield_msg = yield_tracker.describe()
+        print(yield_msg)
+        if websocket_callback:
+            websocket_callback("yield", yield_msg)
+        for endpoint in endpoints if settings.get('adaptive_concurrency', True) is not False else []:
+            concurrency_stats = get_concurrency_controller(
+                endpoint).get_stats()
+            limits = " -> ".join(str(entry["limit"])
+                                 for entry in concurrency_stats["history"])
+            concurrency_msg = f"Concurrency limit for {endpoint}: {concurrency_stats['limit']} (history: {limits})"
+            print(concurrency_msg)
+            if websocket_callback:
+                websocket_callback("all", concurrency_msg)
+        criteria_stats = validation_planner.get_stats()
+        if criteria_stats:
+            criteria_msg = "Validation criteria failure rates: " + ", ".join(
+                f"{name} {entry['failures']}/{entry['checks']}" for name, entry in criteria_stats.items())
+            calls_per_rejection = validation_planner.calls_per_rejection()
+            if calls_per_rejection is not None:
+                criteria_msg += f" (validator calls per rejected candidate: {calls_per_rejection:.2f})"
+            print(criteria_msg)
+            if websocket_callback:
+                websocket_callback("all", criteria_msg)
+        if local_validator is not None:
+            local_stats = local_validator.get_stats()
+            local_msg = f"Local rules: {local_stats['rejections']} candidates rejected without a validator request (" + ", ".join(
+                f"{name} {failures}" for name, failures in local_stats["failures"].items()) + ")"
+            print(local_msg)
+            if websocket_callback:
+                websocket_callback("all", local_msg)
+        if rejection_cache is not None:
+            rejection_stats = rejection_cache.get_stats()
+            lookups = rejection_stats["lookups"] - rejection_baseline["lookups"]
+            hits = rejection_stats["hits"] - rejection_baseline["hits"]
+            rejection_msg = f"Rejection cache: {hits} of {lookups} candidates were rejected before and skipped validation ({hits / lookups if lookups else 0.0:.0%} hit rate, {rejection_stats['entries']} entries)"
+            print(rejection_msg)
+            if websocket_callback:
+                websocket_callback("all", rejection_msg)
+        if near_duplicate_index is not None:
+            near_duplicate_stats = near_duplicate_index.get_stats()
+            near_duplicate_msg = f"Near-duplicate filter: {near_duplicate_stats['near_duplicates']} of {near_duplicate_stats['checks']} checked candidates rejected"
+            print(near_duplicate_msg)
+            if websocket_callback:
+                websocket_callback("all", near_duplicate_msg)
+        if response_cache is not None:
+            cache_stats = response_cache.get_stats()
+            cache_msg = f"Response cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, {cache_stats['coalesced']} coalesced"
+            print(cache_msg)
+            if websocket_callback:
+                websocket_callback("all", cache_msg)
+
+    def run_parallel_workers(worker_count):
+        """
+        Parallel mode: worker_count threads each run the generate -> validate -> score loop,
+        sharing the accepted stimuli (and their repetition index) and the progress counter
+        """
+        total = total_iterations.value
+        accepted = AcceptedStimuli(previous_stimuli, near_duplicate_index)
+        individual_validation = settings.get(
+            'agent_2_individual_validation', False)
+        individual_scoring = settings.get('agent_3_individual_scoring', False)
+        lock = threading.Lock()
+        state = {"claimed": 0, "repetition_count": 0,
+                 "validation_fails": 0, "error": None}
+        records = []
+
+        def send(message_type, message):
+            print(message)
+            if websocket_callback:
+                websocket_callback(message_type, message)
+
+        def produce_one(worker_id, candidate_queue):
+            """
+            Regenerate until one stimulus passes validation, or return None when stopped
+            (or a retry budget ended the run)
+            """
+            while not stop_event.is_set() and not yield_tracker.exhausted:
+                wait_for_endpoint()
+                if not candidate_queue:
+                    candidate_queue.extend(next_candidates(
+                        accepted.snapshot(), accepted.is_repetition))
+                stimuli, validation_result = candidate_queue.popleft()
+                if stop_event.is_set():
+                    return None
+                send("generator",
+                     f"[Worker {worker_id}] Generator's Output: {json.dumps(stimuli, indent=2)}")
+
+                if accepted.is_repetition(stimuli):
+                    with lock:
+                        state["repetition_count"] += 1
+                    if ablation["use_agent_2"]:
+                        send("generator",
+                             f"[Worker {worker_id}] Detected repeated stimulus, regenerating...")
+                        if track_attempt("repetition", slot=worker_id):
+                            return None
+                        continue
+
+                if validation_result is None:  # not validated with the rest of its batch
+                    validation_result = validate_candidate(
+                        stimuli, individual_validation)
+                if stop_event.is_set():
+                    return None
+                send("validator",
+                     f"[Worker {worker_id}] Validator's Output: {json.dumps(validation_result, indent=2)}")
+
+                if 'error' in validation_result:
+                    send("validator",
+                         f"[Worker {worker_id}] Validation error: {validation_result['error']}")
+                    if track_attempt("error", slot=worker_id):
+                        return None
+                    continue
+
+                failed_fields = yield_tracker.enforced(
+                    [key for key, value in validation_result.items() if not value])
+                if failed_fields:
+                    with lock:
+                        state["validation_fails"] += 1
+                    send("validator",
+                         f"[Worker {worker_id}] Failed validation for fields: {failed_fields}, regenerating...")
+                    if ablation["use_agent_2"]:
+                        if track_attempt("validation_fail", failed_fields, worker_id):
+                            return None
+                        continue
+
+                # another worker may have accepted the same stimulus in the meantime
+                if not accepted.try_accept(stimuli, allow_repetition=not ablation["use_agent_2"]):
+                    with lock:
+                        state["repetition_count"] += 1
+                    send("generator",
+                         f"[Worker {worker_id}] Stimulus was accepted by another worker, regenerating...")
+                    if track_attempt("repetition", slot=worker_id):
+                        return None
+                    continue
+                track_attempt("accepted", slot=worker_id)
+                return stimuli, validation_result
+            return None
+
+        def worker(worker_id):
+            # candidates of the last multi-candidate call not yet validated
+            candidate_queue = deque()
+            try:
+                while not stop_event.is_set():
+                    with lock:
+                        if state["error"] is not None or state["claimed"] >= total or yield_tracker.exhausted:
+                            return
+                        state["claimed"] += 1
+
+                    produced = produce_one(worker_id, candidate_queue)
+                    if produced is None:
+                        return
+                    stimuli, validation_result = produced
+
+                    scores = {}
+                    if ablation["use_agent_3"] and batch_scorer is None:
+                        if individual_scoring:
+                            scores = agent_3_score_stimulus_individual(
+                                model_client=model_client,
+                                valid_stimulus=stimuli,
+                                experiment_design=experiment_design,
+                                properties=agent_3_properties,
+                                stop_event=stop_event,
+                                websocket_callback=websocket_callback,
+                                response_cache=response_cache,
+                                max_concurrency=scoring_concurrency
+                            )
+                        else:
+                            scores = agent_3_score_stimulus(
+                                model_client=model_client,
+                                valid_stimulus=stimuli,
+                                experiment_design=experiment_design,
+                                properties=agent_3_properties,
+                                prompt_template=AGENT_3_PROMPT_TEMPLATE,
+                                stop_event=stop_event,
+                                response_cache=response_cache
+                            )
+                        send("scorer",
+                             f"[Worker {worker_id}] Scorer's Output: {json.dumps(scores, indent=2)}")
+                    if stop_event.is_set():
+                        return
+
+                    with lock:
+                        record = {
+                            "stimulus_id": len(records) + 1,
+                            "stimulus_content": stimuli,
+                            "repetition_count": state["repetition_count"],
+                            "validation_fails": state["validation_fails"],
+                            "validation_failure_reasons": validation_result
+                        }
+                        if ablation["use_agent_3"]:
+                            record.update(scores or {})
+                        records.append(record)
+                        completed = len(records)
+                    if batch_scorer is not None:
+                        queue_for_scoring(record)
+                    send("all",
+                         f"=== [Worker {worker_id}] Accepted stimulus {completed}/{total} ===")
+                    update_progress(completed)
+            except RetryBudgetExceeded as e:
+                # already reported by track_attempt
+                with lock:
+                    if state["error"] is None:
+                        state["error"] = e
+            except Exception as e:
+                error_msg = f"[Worker {worker_id}] Error in generation: {str(e)}"
+                send("all", error_msg)
+                with lock:
+                    if state["error"] is None:
+                        state["error"] = e
+
+        send("all",
+             f"Starting parallel generation with {worker_count} workers...")
+        threads = [threading.Thread(target=worker, args=(i + 1,), daemon=True,
+                                    name=f"generation-worker-{i + 1}")
+                   for i in range(worker_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return finish_concurrent_run(records, total, state["error"])
+
+    def finish_concurrent_run(records, total, error):
+        """Build the results of a parallel or pipelined run"""
+        finish_batch_scoring()
+        if check_stop("Generation stopped by user."):
+            return None, None
+        if not records:
+            if error is not None:
+                raise error
+            print("No records generated.")
+            if websocket_callback:
+                websocket_callback("all", "No records generated.")
+            return None, None
+
+        update_progress(len(records))
+        df = pd.DataFrame(records)
+        session_id = settings.get('session_id', 'default')
+        timestamp = int(time.time())
+        unique_id = ''.join(random.choice('0123456789abcdef')
+                            for _ in range(6))
+        suggested_filename = f"experiment_stimuli_results_{session_id}_{timestamp}_{unique_id}.csv"
+
+        df['generation_timestamp'] = timestamp
+        df['batch_id'] = unique_id
+        df['total_iterations'] = total
+        df['error_occurred'] = error is not None
+        df['error_message'] = str(error) if error is not None else ""
+
+        completion_msg = f"Data generation completed for session {session_id}"
+        print(completion_msg)
+        if websocket_callback:
+            websocket_callback("all", completion_msg)
+        report_run_stats()
+        return df, suggested_filename
+
+    def run_pipeline():
+        """
+        Pipelined mode: generator, validator and scorer stages run concurrently, connected
+        by bounded queues, so e.g. scoring of one stimulus overlaps generation of the next
+        """
+        total = total_iterations.value
+        accepted = AcceptedStimuli(previous_stimuli, near_duplicate_index)
+        individual_validation = settings.get(
+            'agent_2_individual_validation', False)
+        individual_scoring = settings.get('agent_3_individual_scoring', False)
+        lock = threading.Lock()
+        state = {"accepted": 0, "repetition_count": 0, "validation_fails": 0}
+        records = []
+
+        def generate(_):
+            if yield_tracker.exhausted:
+                return []
+            wait_for_endpoint()
+            candidates = next_candidates(
+                accepted.snapshot(), accepted.is_repetition)
+            if stop_event.is_set():
+                return []
+            outputs = []
+            for stimuli, validation_result in candidates:
+                print("Agent 1 Output:", stimuli)
+                if websocket_callback:
+                    websocket_callback(
+                        "generator", f"Generator's Output: {json.dumps(stimuli, indent=2)}")
+                if accepted.is_repetition(stimuli):
+                    with lock:
+                        state["repetition_count"] += 1
+                    if ablation["use_agent_2"]:
+                        if websocket_callback:
+                            websocket_callback(
+                                "generator", "Detected repeated stimulus, regenerating...")
+                        if track_attempt("repetition"):
+                            break
+                        continue
+                outputs.append((stimuli, validation_result))
+            return outputs
+
+        def validate(item):
+            stimuli, validation_result = item
+            with lock:
+                if state["accepted"] >= total or yield_tracker.exhausted:
+                    return []
+            if validation_result is None:  # not validated with the rest of its batch
+                validation_result = validate_candidate(
+                    stimuli, individual_validation)
+            if stop_event.is_set():
+                return []
+            print("Agent 2 Output:", validation_result)
+            if websocket_callback:
+                websocket_callback(
+                    "validator", f"Validator's Output: {json.dumps(validation_result, indent=2)}")
+            if 'error' in validation_result:
+                track_attempt("error")
+                return []
+
+            failed_fields = yield_tracker.enforced(
+                [key for key, value in validation_result.items() if not value])
+            if failed_fields:
+                with lock:
+                    state["validation_fails"] += 1
+                if websocket_callback:
+                    websocket_callback(
+                        "validator", f"Failed validation for fields: {failed_fields}, regenerating...")
+                if ablation["use_agent_2"]:
+                    track_attempt("validation_fail", failed_fields)
+                    return []
+
+            with lock:
+                if state["accepted"] >= total:
+                    return []
+                if not accepted.try_accept(stimuli, allow_repetition=not ablation["use_agent_2"]):
+                    state["repetition_count"] += 1
+                    repeated = True
+                else:
+                    state["accepted"] += 1
+                    repeated = False
+            track_attempt("repetition" if repeated else "accepted")
+            if repeated:
+                return []
+            return [(stimuli, validation_result)]
+
+        def score(item):
+            stimuli, validation_result = item
+            scores = {}
+            if ablation["use_agent_3"] and batch_scorer is None:
+                if individual_scoring:
+                    scores = agent_3_score_stimulus_individual(
+                        model_client=model_client,
+                        valid_stimulus=stimuli,
+                        experiment_design=experiment_design,
+                        properties=agent_3_properties,
+                        stop_event=stop_event,
+                        websocket_callback=websocket_callback,
+                        response_cache=response_cache,
+                        max_concurrency=scoring_concurrency
+                    )
+                else:
+                    scores = agent_3_score_stimulus(
+                        model_client=model_client,
+                        valid_stimulus=stimuli,
+                        experiment_design=experiment_design,
+                        properties=agent_3_properties,
+                        prompt_template=AGENT_3_PROMPT_TEMPLATE,
+                        stop_event=stop_event,
+                        response_cache=response_cache
+                    )
+                print("Agent 3 Output:", scores)
+                if websocket_callback:
+                    websocket_callback(
+                        "scorer", f"Scorer's Output: {json.dumps(scores, indent=2)}")
+            if stop_event.is_set():
+                return []
+
+            with lock:
+                record = {
+                    "stimulus_id": len(records) + 1,
+                    "stimulus_content": stimuli,
+                    "repetition_count": state["repetition_count"],
+                    "validation_fails": state["validation_fails"],
+                    "validation_failure_reasons": validation_result
+                }
+                if ablation["use_agent_3"]:
+                    record.update(scores or {})
+                records.append(record)
+                completed = len(records)
+            if batch_scorer is not None:
+                queue_for_scoring(record)
+            accepted_msg = f"=== Accepted stimulus {completed}/{total} ==="
+            print(accepted_msg)
+            if websocket_callback:
+                websocket_callback("all", accepted_msg)
+            update_progress(completed)
+            return []
+
+        def report_utilization(pipeline):
+            utilization_msg = f"Pipeline utilization: {pipeline.format_stats()}"
+            print(utilization_msg)
+            if websocket_callback:
+                websocket_callback("pipeline", utilization_msg)
+
+        pipeline = StagePipeline([
+            PipelineStage("generator", generate, settings.get(
+                'pipeline_generators') or 1),
+            PipelineStage("validator", validate, settings.get(
+                'pipeline_validators') or 1),
+            PipelineStage("scorer", score, settings.get(
+                'pipeline_scorers') or 1),
+        ], settings.get('pipeline_queue_size') or DEFAULT_QUEUE_SIZE, stop_event)
+
+        pipeline_msg = "Starting pipelined generation (" + ", ".join(
+            f"{stage.name}: {stage.workers} worker(s)" for stage in pipeline.stages) + ")..."
+        print(pipeline_msg)
+        if websocket_callback:
+            websocket_callback("all", pipeline_msg)
+
+        error = None
+        try:
+            # after a retry budget ran out, finish the stimuli already accepted
+            pipeline.run(lambda: len(records) >= total or (
+                yield_tracker.exhausted and len(records) >= state["accepted"]),
+                         report_utilization, float(settings.get('pipeline_report_interval') or 10))
+        except RetryBudgetExceeded as e:
+            error = e  # already reported by track_attempt
+        except Exception as e:
+            error = e
+            error_msg = f"Error in pipelined generation: {str(e)}"
+            print(error_msg)
+            if websocket_callback:
+                websocket_callback("all", error_msg)
+        report_utilization(pipeline)
+        return finish_concurrent_run(records, total, error)
+
+    if settings.get('pipeline'):
+        return run_pipeline()
+
+    parallel_workers = max(1, min(int(settings.get(
+        'parallel_workers') or 1), total_iterations.value))
+    if parallel_workers > 1:
+        return run_parallel_workers(parallel_workers)
+
     # Get actual total iterations
     total_iter_value = total_iterations.value
+    # candidates of the last multi-candidate call not yet validated
+    candidate_queue = deque()
+    repetition_index = RepetitionIndex(previous_stimuli, near_duplicate_index)
+    # set when a retry budget ends the run with the stimuli accepted so far
+    budget_exhausted = False
+    # set when a retry budget aborts the run
+    budget_error = None
     for iteration_num in range(total_iter_value):
         if check_stop():
             return None, None
@@ -937,15 +3115,14 @@ def generate_stimuli(settings):
                 return None, None
 
             try:
-                stimuli = agent_1_generate_stimulus(
-                    model_client=model_client,
-                    experiment_design=experiment_design,
-                    previous_stimuli=previous_stimuli,
-                    properties=agent_1_properties,
-                    prompt_template=AGENT_1_PROMPT_TEMPLATE,
-                    params=custom_params,
-                    stop_event=stop_event
-                )
+                wait_for_endpoint()
+                if check_stop():
+                    return None, None
+
+                if not candidate_queue:
+                    candidate_queue.extend(next_candidates(
+                        previous_stimuli, repetition_index.is_repetition))
+                stimuli, validation_result = candidate_queue.popleft()
 
                 if isinstance(stimuli, dict) and stimuli.get('stimulus') == 'STOPPED':
                     if check_stop("Generation stopped after 'Generator'."):
@@ -961,7 +3138,7 @@ def generate_stimuli(settings):
 
                 # Step 1.5: Check if stimulus already exists
 
-                if check_stimulus_repetition(stimuli, previous_stimuli):
+                if repetition_index.is_repetition(stimuli):
                     repetition_count += 1
                     if ablation["use_agent_2"]:
                         print("Detected repeated stimulus, regenerating...")
@@ -969,6 +3146,9 @@ def generate_stimuli(settings):
                         if websocket_callback:
                             websocket_callback(
                                 "generator", "Detected repeated stimulus, regenerating...")
+                        if track_attempt("repetition"):
+                            budget_exhausted = True
+                            break
                         continue
                     else:
                         print(
@@ -985,30 +3165,20 @@ def generate_stimuli(settings):
                 individual_validation = settings.get(
                     'agent_2_individual_validation', False)
 
-                if individual_validation:
+                if validation_result is not None:
                     if websocket_callback:
                         websocket_callback(
-                            "validator", f"Using individual validation mode - checking {len(agent_2_properties)} criteria...")
-                    validation_result = agent_2_validate_stimulus_individual(
-                        model_client=model_client,
-                        new_stimulus=stimuli,
-                        experiment_design=experiment_design,
-                        properties=agent_2_properties,
-                        stop_event=stop_event,
-                        websocket_callback=websocket_callback
-                    )
+                            "validator", "Using the verdict from batch validation...")
+                elif individual_validation:
+                    if websocket_callback:
+                        websocket_callback(
+                            "validator", f"Using individual validation mode - checking {len(model_properties)} criteria...")
+                    validation_result = validate_candidate(stimuli, True)
                 else:
                     if websocket_callback:
                         websocket_callback(
                             "validator", "Using batch validation mode...")
-                    validation_result = agent_2_validate_stimulus(
-                        model_client=model_client,
-                        new_stimulus=stimuli,
-                        experiment_design=experiment_design,
-                        properties=agent_2_properties,
-                        prompt_template=AGENT_2_PROMPT_TEMPLATE,
-                        stop_event=stop_event
-                    )
+                    validation_result = validate_candidate(stimuli, False)
 
                 if isinstance(validation_result, dict) and validation_result.get('error') == 'Stopped by user':
                     if check_stop("Generation stopped after 'Validator'."):
@@ -1028,11 +3198,14 @@ def generate_stimuli(settings):
                     if websocket_callback:
                         websocket_callback(
                             "validator", f"Validation error: {validation_result['error']}")
+                    if track_attempt("error"):
+                        budget_exhausted = True
+                        break
                     continue  # Skip to next iteration
 
-                # Check validation fields
-                failed_fields = [
-                    key for key, value in validation_result.items() if not value]
+                # Check validation fields (criteria relaxed by the retry policy no longer count)
+                failed_fields = yield_tracker.enforced(
+                    [key for key, value in validation_result.items() if not value])
 
                 if failed_fields:
                     # Some fields failed validation
@@ -1044,12 +3217,16 @@ def generate_stimuli(settings):
                             "validator", f"Failed validation for fields: {failed_fields}, regenerating...")
 
                     if ablation["use_agent_2"]:
+                        if track_attempt("validation_fail", failed_fields):
+                            budget_exhausted = True
+                            break
                         continue  # Regenerate
                     else:
                         print("Ablation: Skipping Agent 2 (Validation)")
                         if websocket_callback:
                             websocket_callback(
                                 "validator", "Ablation: Skipping Agent 2 (Validation)")
+                        track_attempt("accepted")
                         update_progress(iteration_num + 1)
                         break
                 else:
@@ -1058,15 +3235,22 @@ def generate_stimuli(settings):
                     if websocket_callback:
                         websocket_callback(
                             "validator", "All validations passed, proceeding to next step...")
+                    track_attempt("accepted")
                     update_progress(iteration_num + 1)
                     break
 
+            except RetryBudgetExceeded as e:
+                # already reported by track_attempt; finish with the stimuli accepted so far
+                budget_error = e
+                budget_exhausted = True
+                break
             except Exception as e:
                 error_msg = f"Error in generation/validation step: {str(e)}"
                 print(error_msg)
                 if websocket_callback:
                     websocket_callback("all", error_msg)
                 if len(record_list) > 0:
+                    finish_batch_scoring()
                     df = pd.DataFrame(record_list)
                     session_id = settings.get('session_id', 'default')
                     timestamp = int(time.time())
@@ -1090,6 +3274,9 @@ def generate_stimuli(settings):
                 else:
                     raise e
 
+        if budget_exhausted:
+            break
+
         if check_stop("Generation stopped after 'Validator'."):
             return None, None
 
@@ -1098,7 +3285,10 @@ def generate_stimuli(settings):
                 return None, None
 
             # Step 3: Score
-            if ablation["use_agent_3"]:
+            if ablation["use_agent_3"] and batch_scorer is not None:
+                # scored in the background once the record is saved below
+                scores = {}
+            elif ablation["use_agent_3"]:
                 # Check if individual scoring is enabled
                 individual_scoring = settings.get(
                     'agent_3_individual_scoring', False)
@@ -1113,7 +3303,9 @@ def generate_stimuli(settings):
                         experiment_design=experiment_design,
                         properties=agent_3_properties,
                         stop_event=stop_event,
-                        websocket_callback=websocket_callback
+                        websocket_callback=websocket_callback,
+                        response_cache=response_cache,
+                        max_concurrency=scoring_concurrency
                     )
                 else:
                     if websocket_callback:
@@ -1125,7 +3317,8 @@ def generate_stimuli(settings):
                         experiment_design=experiment_design,
                         properties=agent_3_properties,
                         prompt_template=AGENT_3_PROMPT_TEMPLATE,
-                        stop_event=stop_event
+                        stop_event=stop_event,
+                        response_cache=response_cache
                     )
 
                 if isinstance(scores, dict) and all(v == 0 for v in scores.values()):
@@ -1156,12 +3349,18 @@ def generate_stimuli(settings):
             if ablation["use_agent_3"]:
                 record.update(scores or {})
             record_list.append(record)
+            if batch_scorer is not None:
+                queue_for_scoring(record)
 
             # Update previous_stimuli
             previous_stimuli.append(stimuli)
+            repetition_index.add(stimuli)
 
             # If some records have been generated, create intermediate results
             if (iteration_num + 1) % 5 == 0 or iteration_num + 1 == total_iter_value:
+                stopping = check_stop()
+                if stopping or iteration_num + 1 == total_iter_value:
+                    finish_batch_scoring()
                 temp_df = pd.DataFrame(record_list)
                 session_id = settings.get('session_id', 'default')
                 timestamp = int(time.time())
@@ -1173,11 +3372,12 @@ def generate_stimuli(settings):
                 temp_df['batch_id'] = unique_id
                 temp_df['total_iterations'] = total_iter_value
 
-                if check_stop():
+                if stopping:
                     return temp_df, suggested_filename
 
                 if iteration_num + 1 == total_iter_value:
                     update_progress(total_iter_value)
+                    report_run_stats()
                     return temp_df, suggested_filename
 
         except Exception as e:
@@ -1186,6 +3386,7 @@ def generate_stimuli(settings):
             if websocket_callback:
                 websocket_callback("all", error_msg)
             if len(record_list) > 0:
+                finish_batch_scoring()
                 df = pd.DataFrame(record_list)
                 session_id = settings.get('session_id', 'default')
                 timestamp = int(time.time())
@@ -1206,6 +3407,7 @@ def generate_stimuli(settings):
     # Check again if stopped at final step
     if check_stop("Generation stopped at final step."):
         if len(record_list) > 0:
+            finish_batch_scoring()
             df = pd.DataFrame(record_list)
             session_id = settings.get('session_id', 'default')
             timestamp = int(time.time())
@@ -1226,10 +3428,13 @@ def generate_stimuli(settings):
             return df, suggested_filename
         return None, None
 
-    # Only generate DataFrame and return results after all iterations
+    # Only generate DataFrame and return results after all iterations (or a retry budget ran out)
+    if budget_error is not None and not record_list:
+        raise budget_error
     if len(record_list) > 0:
-        update_progress(total_iter_value)
+        update_progress(len(record_list))
 
+        finish_batch_scoring()
         df = pd.DataFrame(record_list)
         session_id = settings.get('session_id', 'default')
         timestamp = int(time.time())
@@ -1240,13 +3445,14 @@ def generate_stimuli(settings):
         df['generation_timestamp'] = timestamp
         df['batch_id'] = unique_id
         df['total_iterations'] = total_iter_value
-        df['error_occurred'] = False
-        df['error_message'] = ""
+        df['error_occurred'] = budget_error is not None
+        df['error_message'] = str(budget_error) if budget_error is not None else ""
 
         completion_msg = f"Data generation completed for session {session_id}"
         print(completion_msg)
         if websocket_callback:
             websocket_callback("all", completion_msg)
+        report_run_stats()
         return df, suggested_filename
     else:
         print("No records generated.")
@@ -1262,6 +3468,7 @@ def custom_model_inference_handler(session_id, prompt, model, api_url, api_key,
     """Legacy function for backward compatibility"""
     try:
         client = CustomModelClient(api_url, api_key, model)
+        client.session_id = session_id
         result = client.generate_completion(prompt, {}, params)
 
         if "error" in result:
@@ -0,0 +1,114 @@
+"""
+Background batching of work items
+
+A collector accumulates submitted items and hands them to process_batch in groups of
+up to batch_size, from its own thread. A group is flushed as soon as it is full, or
+flush_interval seconds after its oldest item arrived, so the producer never waits for
+a batch to be processed. The thread exits whenever nothing is pending, so a collector
+that is dropped without being flushed does not leak it.
+"""
+
+import threading
+import time
+
+
+class BatchCollector:
+    """
+    Calls process_batch({key: item}) -> {key: result} for groups of submitted items and
+    reports every result through on_result(key, result). Items process_batch returns no
+    result for (or all items of a batch that raised) get default_result(item).
+    """
+
+    def __init__(self, process_batch, on_result, batch_size=5, flush_interval=5.0,
+                 default_result=None, name="batch-collector"):
+        self.process_batch = process_batch
+        self.on_result = on_result
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = max(0.0, float(flush_interval))
+        self.default_result = default_result or (lambda item: None)
+        self.name = name
+        self._pending = []
+        self._oldest = None
+        self._flushing = False
+        self._thread = None
+        self._condition = threading.Condition()
+        self._stats = {"items": 0, "batches": 0, "errors": 0}
+
+    def submit(self, key, item):
+        with self._condition:
+            if not self._pending:
+                self._oldest = time.monotonic()
+            self._pending.append((key, item))
+            self._stats["items"] += 1
+            # the worker thread only runs while there is something to process
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, daemon=True, name=self.name)
+                self._thread.start()
+            self._condition.notify()
+
+    def _next_batch(self):
+        """Wait until a batch is due; returns None (and retires the thread) when nothing is pending"""
+        with self._condition:
+            while True:
+                if not self._pending:
+                    self._thread = None
+                    self._condition.notify_all()
+                    return None
+                if len(self._pending) >= self.batch_size or self._flushing:
+                    break
+                wait = self._oldest + self.flush_interval - time.monotonic()
+                if wait <= 0:
+                    break
+                self._condition.wait(wait)
+            batch = self._pending[:self.batch_size]
+            del self._pending[:self.batch_size]
+            # the rest waits at most flush_interval from now
+            self._oldest = time.monotonic() if self._pending else None
+            self._stats["batches"] += 1
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            items = dict(batch)
+            try:
+                results = self.process_batch(items) or {}
+            except Exception as e:
+                print(f"Error processing batch of {len(items)} item(s): {e}")
+                with self._condition:
+                    self._stats["errors"] += 1
+                results = {}
+            for key, item in items.items():
+                result = results.get(key)
+                try:
+                    self.on_result(key, result if result is not None else self.default_result(item))
+                except Exception as e:
+                    print(f"Error handling batch result for {key}: {e}")
+
+    def flush(self, timeout=None):
+        """
+        Process everything pending right away (without waiting for full batches) and wait
+        until it is done. Returns False if that took longer than timeout seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            self._flushing = True
+            self._condition.notify_all()
+            try:
+                while self._thread is not None:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._condition.wait(remaining)
+                return True
+            finally:
+                self._flushing = False
+
+    def get_stats(self):
+        with self._condition:
+            stats = dict(self._stats)
+            stats["pending"] = len(self._pending)
+        return stats
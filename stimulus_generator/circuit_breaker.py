@@ -0,0 +1,179 @@
+"""
+Circuit breaker and health tracking per model endpoint
+
+A breaker watches the outcome of every request to one endpoint. After a run of
+consecutive failures, or a high failure rate over the recent window, it opens and
+requests fail immediately instead of burning retries and backoff. Once the reset
+timeout has passed it lets a single half-open probe through: success closes the
+circuit, failure re-opens it with a longer timeout.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# outcomes that mean the endpoint itself is unhealthy (429s and 4xx mean it is up)
+FAILURE_OUTCOMES = ("timeout", "server_error", "connection_error")
+
+
+class CircuitOpenError(Exception):
+    """Raised when a run gives up waiting for an endpoint whose circuit stays open"""
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker for one endpoint"""
+
+    def __init__(self, name, failure_threshold=5, failure_rate=0.5, window=20, min_calls=10,
+                 reset_timeout=15.0, max_reset_timeout=120.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.base_reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.consecutive_failures = 0
+        self._results = deque(maxlen=window)
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self._stats = {"successes": 0, "failures": 0,
+                       "rejected": 0, "opened": 0}
+
+    def _transition(self, state, reason):
+        old_state = self.state
+        self.state = state
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+            self._stats["opened"] += 1
+        return f"Circuit for {self.name}: {old_state} -> {state} ({reason})"
+
+    def allow_request(self):
+        """True if a request may be sent now (in half-open state, only one probe at a time)"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self._stats["rejected"] += 1
+            return False
+
+    def retry_in(self):
+        """Seconds until the next probe may be sent (0 when closed)"""
+        with self._lock:
+            if self.state == CLOSED:
+                return 0.0
+            return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def record(self, outcome):
+        """Feed back a request outcome. Returns a log message when the state changed, else None."""
+        failed = outcome in FAILURE_OUTCOMES
+        with self._lock:
+            if outcome == "cancelled":
+                # abandoned by the caller, says nothing about the endpoint
+                self._probe_in_flight = False
+                return None
+            self._results.append(failed)
+            self._stats["failures" if failed else "successes"] += 1
+
+            if self.state == HALF_OPEN:
+                self._probe_in_flight = False
+                if failed:
+                    # still down, wait longer before the next probe
+                    self.reset_timeout = min(
+                        self.max_reset_timeout, self.reset_timeout * 2)
+                    return self._transition(OPEN, f"probe failed: {outcome}, next probe in {self.reset_timeout:.0f}s")
+                self.reset_timeout = self.base_reset_timeout
+                self.consecutive_failures = 0
+                self._results.clear()
+                return self._transition(CLOSED, "probe succeeded")
+
+            if not failed:
+                self.consecutive_failures = 0
+                return None
+            self.consecutive_failures += 1
+            if self.state != CLOSED:
+                return None
+
+            rate = sum(self._results) / len(self._results)
+            if self.consecutive_failures >= self.failure_threshold:
+                reason = f"{self.consecutive_failures} consecutive failures"
+            elif len(self._results) >= self.min_calls and rate >= self.failure_rate:
+                reason = f"failure rate {rate:.0%}"
+            else:
+                return None
+            return self._transition(OPEN, f"{reason}, next probe in {self.reset_timeout:.0f}s")
+
+    def is_available(self):
+        """True if the circuit is closed or the next probe may be sent now"""
+        wait = self.retry_in()
+        with self._lock:
+            return self.state == CLOSED or (wait == 0 and not self._probe_in_flight)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["state"] = self.state
+            stats["consecutive_failures"] = self.consecutive_failures
+            stats["recent_failure_rate"] = round(
+                sum(self._results) / len(self._results), 3) if self._results else 0.0
+            stats["reset_timeout_seconds"] = self.reset_timeout
+        return stats
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(endpoint, **options):
+    """Get the process-wide breaker for an endpoint (options only apply on creation)"""
+    with _breakers_lock:
+        breaker = _breakers.get(endpoint)
+        if breaker is None:
+            breaker = _breakers[endpoint] = CircuitBreaker(endpoint, **options)
+        return breaker
+
+
+def get_all_circuit_stats():
+    with _breakers_lock:
+        breakers = dict(_breakers)
+    return {endpoint: breaker.get_stats() for endpoint, breaker in breakers.items()}
+
+
+def wait_until_available(breakers, stop_event=None, max_wait=None):
+    """
+    Block until any of the breakers lets a request through. Returns False if stop_event
+    was set or they all stayed open for more than max_wait seconds.
+    """
+    started = time.monotonic()
+    while True:
+        if any(breaker.is_available() for breaker in breakers):
+            return True
+        if stop_event is not None and stop_event.is_set():
+            return False
+        if max_wait is not None and time.monotonic() - started >= max_wait:
+            return False
+        wait = min(breaker.retry_in() for breaker in breakers)
+        time.sleep(min(max(wait, 0.1), 1.0))
+
+
+async def wait_until_available_async(breakers, stop_event=None, max_wait=None):
+    started = time.monotonic()
+    while True:
+        if any(breaker.is_available() for breaker in breakers):
+            return True
+        if stop_event is not None and stop_event.is_set():
+            return False
+        if max_wait is not None and time.monotonic() - started >= max_wait:
+            return False
+        wait = min(breaker.retry_in() for breaker in breakers)
+        await asyncio.sleep(min(max(wait, 0.1), 1.0))
@@ -5,6 +5,7 @@ import argparse
 import os
 import sys
 from .app import app, socketio
+from .mock_server import MockServerProfile, run_mock_server
 
 
 def main():
@@ -26,6 +27,43 @@ def main():
     webui_parser.add_argument(
         "--share", action="store_true", help="create public link")
 
+    # mock-server command
+    mock_parser = subparsers.add_parser(
+        "mock-server", help="start a local OpenAI-compatible mock model server")
+    mock_parser.add_argument(
+        "--host", type=str, default="127.0.0.1", help="host address")
+    mock_parser.add_argument(
+        "--port", type=int, default=8000, help="port number")
+    mock_parser.add_argument(
+        "--profile", type=str, help="JSON file with latency/failure profile")
+    mock_parser.add_argument(
+        "--latency-distribution", type=str,
+        choices=["fixed", "uniform", "normal", "lognormal", "exponential"])
+    mock_parser.add_argument(
+        "--latency-mean", type=float, help="mean latency in seconds")
+    mock_parser.add_argument(
+        "--latency-std", type=float, help="latency standard deviation")
+    mock_parser.add_argument(
+        "--latency-min", type=float, help="minimum latency in seconds")
+    mock_parser.add_argument(
+        "--latency-max", type=float, help="maximum latency in seconds")
+    mock_parser.add_argument(
+        "--rate-limit-rate", type=float, help="fraction of requests answered with 429")
+    mock_parser.add_argument(
+        "--server-error-rate", type=float, help="fraction of requests answered with 5xx")
+    mock_parser.add_argument(
+        "--timeout-rate", type=float, help="fraction of requests that hang")
+    mock_parser.add_argument(
+        "--timeout-seconds", type=float, help="how long hung requests hang")
+    mock_parser.add_argument(
+        "--malformed-json-rate", type=float, help="fraction of responses with broken JSON")
+    mock_parser.add_argument(
+        "--boolean-true-rate", type=float, help="probability that a validation criterion passes")
+    mock_parser.add_argument(
+        "--duplicate-rate", type=float, help="probability that a generated string repeats")
+    mock_parser.add_argument(
+        "--seed", type=int, help="random seed for reproducible runs")
+
     # Parse arguments
     args = parser.parse_args()
 
@@ -43,6 +81,15 @@ def main():
             allow_unsafe_werkzeug=True,
             log_output=args.debug
         )
+    elif args.command == "mock-server":
+        options = {}
+        if args.profile:
+            options.update(MockServerProfile.from_file(args.profile).to_dict())
+        for name in MockServerProfile.DEFAULTS:
+            value = getattr(args, name, None)
+            if value is not None:
+                options[name] = value
+        run_mock_server(args.host, args.port, MockServerProfile(**options))
     else:
         parser.print_help()
         return 1
@@ -0,0 +1,171 @@
+"""
+Adaptive (AIMD) concurrency control for in-flight LLM requests
+
+One controller per model endpoint limits how many requests are in flight at once.
+While responses are healthy the limit grows additively (about +1 per round trip at
+full utilization); on 429s, timeouts, server errors or a p95 latency well above the
+observed baseline it is cut multiplicatively.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+
+DEFAULT_INITIAL_CONCURRENCY = 8
+DEFAULT_MIN_CONCURRENCY = 1
+DEFAULT_MAX_CONCURRENCY = 64
+
+# outcomes that signal an overloaded endpoint
+OVERLOAD_OUTCOMES = ("rate_limited", "timeout", "server_error")
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class AIMDConcurrencyController:
+    """Additive-increase / multiplicative-decrease limit on concurrent requests to one endpoint"""
+
+    def __init__(self, name, initial=DEFAULT_INITIAL_CONCURRENCY, minimum=DEFAULT_MIN_CONCURRENCY,
+                 maximum=DEFAULT_MAX_CONCURRENCY, increase=1.0, decrease=0.5,
+                 latency_tolerance=2.0, latency_window=50, cooldown_seconds=1.0):
+        self.name = name
+        self.minimum = max(1, int(minimum))
+        self.maximum = max(self.minimum, int(maximum))
+        self.limit = float(min(self.maximum, max(self.minimum, initial)))
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.cooldown_seconds = cooldown_seconds
+        self.in_flight = 0
+        self._latencies = deque(maxlen=latency_window)
+        self._outcomes = deque(maxlen=latency_window)
+        self._baseline_p95 = None
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+        self.history = deque(maxlen=200)
+        self._record_history("initial")
+
+    @property
+    def current_limit(self):
+        return max(self.minimum, int(self.limit))
+
+    def _record_history(self, reason):
+        self.history.append(
+            {"time": time.time(), "limit": self.current_limit, "reason": reason})
+
+    def acquire(self, stop_event=None):
+        """Block until a request slot is free. Returns False if stop_event was set while waiting."""
+        with self._condition:
+            while self.in_flight >= self.current_limit:
+                if stop_event is not None and stop_event.is_set():
+                    return False
+                self._condition.wait(0.5)
+            self.in_flight += 1
+            return True
+
+    async def acquire_async(self, stop_event=None):
+        while True:
+            with self._condition:
+                if self.in_flight < self.current_limit:
+                    self.in_flight += 1
+                    return True
+            if stop_event is not None and stop_event.is_set():
+                return False
+            await asyncio.sleep(0.05)
+
+    def release(self, outcome, latency=None):
+        """
+        Give back a slot and adjust the limit. outcome is one of "success", "rate_limited",
+        "timeout", "server_error" or "error" (other failures, which do not change the limit).
+        Returns a log message when the limit changed, else None.
+        """
+        now = time.monotonic()
+        with self._condition:
+            saturated = self.in_flight >= self.current_limit
+            self.in_flight = max(0, self.in_flight - 1)
+            old_limit = self.current_limit
+            reason = None
+
+            self._outcomes.append(outcome in OVERLOAD_OUTCOMES)
+            if outcome in OVERLOAD_OUTCOMES:
+                if now - self._last_decrease >= self.cooldown_seconds:
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    self._last_decrease = now
+                    reason = outcome
+            elif outcome == "success" and latency is not None:
+                self._latencies.append(latency)
+                p95 = _percentile(self._latencies, 0.95) if len(
+                    self._latencies) >= 20 else None
+                if p95 is not None and self._baseline_p95 is None:
+                    self._baseline_p95 = p95
+                elif (p95 is not None and p95 > self.latency_tolerance * self._baseline_p95
+                        and now - self._last_decrease >= self.cooldown_seconds):
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    self._last_decrease = now
+                    self._latencies.clear()
+                    reason = f"p95 latency {p95:.2f}s > {self.latency_tolerance:g}x baseline {self._baseline_p95:.2f}s"
+                else:
+                    if p95 is not None:
+                        self._baseline_p95 = 0.9 * self._baseline_p95 + 0.1 * p95
+                    error_rate = sum(self._outcomes) / len(self._outcomes)
+                    # only grow when the current limit is actually the bottleneck
+                    if saturated and error_rate < 0.05:
+                        self.limit = min(
+                            self.maximum, self.limit + self.increase / max(1.0, self.limit))
+                        if self.current_limit > old_limit:
+                            reason = "healthy"
+
+            self._condition.notify_all()
+            if self.current_limit == old_limit:
+                return None
+            self._record_history(reason)
+            return f"Concurrency limit for {self.name}: {old_limit} -> {self.current_limit} ({reason})"
+
+    def get_stats(self):
+        with self._condition:
+            return {
+                "limit": self.current_limit,
+                "in_flight": self.in_flight,
+                "min": self.minimum,
+                "max": self.maximum,
+                "baseline_p95_seconds": round(self._baseline_p95, 3) if self._baseline_p95 else None,
+                "history": list(self.history)[-20:],
+            }
+
+
+_controllers = {}
+_controllers_lock = threading.Lock()
+
+
+def get_concurrency_controller(endpoint, **options):
+    """Get the process-wide controller for an endpoint (options only apply on creation)"""
+    with _controllers_lock:
+        controller = _controllers.get(endpoint)
+        if controller is None:
+            controller = AIMDConcurrencyController(endpoint, **options)
+            _controllers[endpoint] = controller
+        return controller
+
+
+def configure_concurrency(endpoint, minimum=None, maximum=None):
+    """Change the bounds of an endpoint's controller"""
+    controller = get_concurrency_controller(endpoint)
+    with controller._condition:
+        if minimum:
+            controller.minimum = max(1, int(minimum))
+        if maximum:
+            controller.maximum = max(controller.minimum, int(maximum))
+        controller.limit = float(
+            min(controller.maximum, max(controller.minimum, controller.limit)))
+        controller._condition.notify_all()
+    return controller
+
+
+def get_all_concurrency_stats():
+    with _controllers_lock:
+        controllers = dict(_controllers)
+    return {endpoint: controller.get_stats() for endpoint, controller in controllers.items()}
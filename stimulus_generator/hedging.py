@@ -0,0 +1,235 @@
+"""
+Hedged requests for slow LLM calls
+
+When a request has been running longer than a chosen percentile of the latencies
+observed for the same kind of request on the same endpoint, an identical duplicate is
+sent; whichever answers first wins and the other is cancelled. A budget caps the
+fraction of requests that may be hedged so the extra cost stays bounded. A hedge
+takes its own slot from the endpoint's concurrency controller.
+
+Every call that completes with a usable response, the losing one included, adds its
+latency to the tracker, so slow answers are not dropped from the percentile.
+"""
+
+import asyncio
+import queue
+import threading
+import time
+from collections import deque
+
+DEFAULT_HEDGE_PERCENTILE = 95
+DEFAULT_HEDGE_BUDGET = 0.1
+DEFAULT_HEDGE_MIN_SAMPLES = 20
+# never hedge earlier than this, however fast the endpoint usually is
+MIN_HEDGE_DELAY = 0.05
+TIMEOUT_ERROR = "API call timed out"
+
+
+def request_kind(properties):
+    """Classify a request by its response schema: generator, validator or scorer"""
+    types = {schema.get("type") if isinstance(schema, dict) else None
+             for schema in (properties or {}).values()}
+    if types and types <= {"boolean"}:
+        return "validator"
+    if types and types <= {"integer", "number"}:
+        return "scorer"
+    return "generator"
+
+
+def is_usable_result(result):
+    """True for a response that should end a hedge race (not an error, 429 or 5xx)"""
+    if not isinstance(result, dict) or "error" in result:
+        return False
+    return result.get("status_code", 500) < 400
+
+
+def response_outcome(result):
+    """Concurrency controller outcome of a raw response (see AIMDConcurrencyController.release)"""
+    if is_usable_result(result):
+        return "success"
+    if not isinstance(result, dict):
+        return "error"
+    if "error" in result:
+        return "timeout" if "timed out" in str(result["error"]) else "error"
+    if result.get("status_code") == 429:
+        return "rate_limited"
+    return "server_error" if result.get("status_code", 500) >= 500 else "error"
+
+
+class LatencyTracker:
+    """Recent latencies and hedging budget of one (endpoint, request kind)"""
+
+    def __init__(self, name, window=200):
+        self.name = name
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "hedged": 0,
+                       "hedge_wins": 0, "budget_denied": 0}
+
+    def record(self, latency):
+        with self._lock:
+            self._latencies.append(latency)
+
+    def hedge_delay(self, percentile=DEFAULT_HEDGE_PERCENTILE, min_samples=DEFAULT_HEDGE_MIN_SAMPLES):
+        """Seconds after which to hedge, or None while there are too few samples"""
+        with self._lock:
+            if len(self._latencies) < min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1,
+                    int(round(percentile / 100.0 * (len(ordered) - 1))))
+        return max(MIN_HEDGE_DELAY, ordered[index])
+
+    def count_request(self):
+        with self._lock:
+            self._stats["requests"] += 1
+
+    def try_hedge(self, budget=DEFAULT_HEDGE_BUDGET):
+        """Take a hedge from the budget (a fraction of all requests seen so far)"""
+        with self._lock:
+            if self._stats["hedged"] + 1 > budget * self._stats["requests"]:
+                self._stats["budget_denied"] += 1
+                return False
+            self._stats["hedged"] += 1
+            return True
+
+    def count_hedge_win(self):
+        with self._lock:
+            self._stats["hedge_wins"] += 1
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            samples = len(self._latencies)
+        stats["samples"] = samples
+        stats["p95_seconds"] = round(self.hedge_delay(95, 1), 3) if samples else None
+        return stats
+
+
+_trackers = {}
+_trackers_lock = threading.Lock()
+
+
+def get_latency_tracker(name):
+    """Get the process-wide latency tracker for name (endpoint|request kind)"""
+    with _trackers_lock:
+        tracker = _trackers.get(name)
+        if tracker is None:
+            tracker = _trackers[name] = LatencyTracker(name)
+        return tracker
+
+
+def get_all_hedging_stats():
+    with _trackers_lock:
+        trackers = dict(_trackers)
+    return {name: tracker.get_stats() for name, tracker in trackers.items()}
+
+
+def run_hedged(call, tracker, percentile=DEFAULT_HEDGE_PERCENTILE, budget=DEFAULT_HEDGE_BUDGET,
+               min_samples=DEFAULT_HEDGE_MIN_SAMPLES):
+    """
+    Run call(cancel_event, hedged) and, if it is slower than the tracker's percentile
+    latency and the budget allows, a duplicate call(cancel_event, True) alongside it.
+    Returns the first usable result (or the last result if none is usable); the
+    other call is told to stop through its cancel_event. call(cancel_event, True) has
+    to take its own rate-limit grant and concurrency slot.
+    """
+    tracker.count_request()
+    delay = tracker.hedge_delay(percentile, min_samples)
+    results = queue.Queue()
+    cancel_events = []
+
+    def launch(hedged):
+        cancel_event = threading.Event()
+        cancel_events.append(cancel_event)
+
+        def target():
+            start = time.perf_counter()
+            try:
+                result = call(cancel_event, hedged)
+            except Exception as e:
+                result = {"error": f"{type(e).__name__}: {str(e)}"}
+            latency = time.perf_counter() - start
+            if is_usable_result(result):
+                tracker.record(latency)
+            results.put((hedged, result, latency))
+
+        threading.Thread(target=target, daemon=True,
+                         name="hedged-request" if hedged else "request").start()
+
+    launch(False)
+    pending = 1
+    if delay is not None:
+        try:
+            hedged, result, _ = results.get(timeout=delay)
+            pending -= 1
+        except queue.Empty:
+            if tracker.try_hedge(budget):
+                print(
+                    f"Request to {tracker.name} still running after {delay:.2f}s, sending hedged duplicate")
+                launch(True)
+                pending += 1
+            hedged, result, _ = results.get()
+            pending -= 1
+    else:
+        hedged, result, _ = results.get()
+        pending -= 1
+
+    # a fast failure of one call should not beat the other call still in flight
+    while not is_usable_result(result) and pending:
+        hedged, result, _ = results.get()
+        pending -= 1
+
+    for cancel_event in cancel_events:
+        cancel_event.set()
+    if is_usable_result(result) and hedged:
+        tracker.count_hedge_win()
+    return result
+
+
+async def run_hedged_async(make_call, tracker, percentile=DEFAULT_HEDGE_PERCENTILE,
+                           budget=DEFAULT_HEDGE_BUDGET, min_samples=DEFAULT_HEDGE_MIN_SAMPLES):
+    """Coroutine version of run_hedged: make_call(hedged) returns the request coroutine"""
+    tracker.count_request()
+    delay = tracker.hedge_delay(percentile, min_samples)
+
+    async def timed(hedged):
+        start = time.perf_counter()
+        try:
+            result = await make_call(hedged)
+        except asyncio.TimeoutError:
+            result = {"error": TIMEOUT_ERROR}
+        except Exception as e:
+            result = {"error": f"{type(e).__name__}: {str(e)}"}
+        latency = time.perf_counter() - start
+        if is_usable_result(result):
+            tracker.record(latency)
+        return hedged, result, latency
+
+    pending = {asyncio.ensure_future(timed(False))}
+    try:
+        done = set()
+        if delay is not None:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if not done and tracker.try_hedge(budget):
+                print(
+                    f"Request to {tracker.name} still running after {delay:.2f}s, sending hedged duplicate")
+                pending.add(asyncio.ensure_future(timed(True)))
+
+        while True:
+            if not done:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            task = done.pop()
+            hedged, result, _ = task.result()
+            if is_usable_result(result) or (not done and not pending):
+                break
+
+        if is_usable_result(result):
+            if hedged:
+                tracker.count_hedge_win()
+        elif result.get("error") == TIMEOUT_ERROR:
+            raise asyncio.TimeoutError()
+        return result
+    finally:
+        for task in pending:
+            task.cancel()
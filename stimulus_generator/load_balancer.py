@@ -0,0 +1,132 @@
+"""
+Load balancing over several model endpoints / API keys
+
+A balancer holds the member clients of one pooled client (replicas of the same model,
+or the same endpoint with different keys) and picks a member for every request:
+either the one with the fewest outstanding requests relative to its weight, or the one
+with the lowest expected latency. Members whose endpoint circuit is open, or that keep
+failing, are skipped until they recover.
+"""
+
+import threading
+import time
+
+from .circuit_breaker import get_circuit_breaker
+
+# a member is taken out of rotation for MEMBER_COOLDOWN seconds after this many failed requests in a row
+MEMBER_FAILURE_THRESHOLD = 3
+MEMBER_COOLDOWN = 30.0
+LATENCY_EWMA_ALPHA = 0.2
+
+STRATEGIES = ("least_outstanding", "latency")
+
+
+class BalancerMember:
+    """One member client of a pooled client, with its load and health"""
+
+    def __init__(self, client, name, endpoint, weight=1.0):
+        self.client = client
+        self.name = name
+        self.endpoint = endpoint
+        self.weight = max(float(weight or 1.0), 0.01)
+        self.outstanding = 0
+        self.latency = None
+        self.consecutive_failures = 0
+        self.down_until = 0.0
+        self.requests = 0
+        self.failures = 0
+
+    def is_healthy(self, now):
+        if now < self.down_until:
+            return False
+        return get_circuit_breaker(self.endpoint).is_available()
+
+
+class EndpointBalancer:
+    """Chooses the member client for each request of a pooled client"""
+
+    def __init__(self, members, strategy="least_outstanding"):
+        if not members:
+            raise ValueError("A load-balanced client needs at least one endpoint")
+        if strategy not in STRATEGIES:
+            raise ValueError(
+                f"Unknown load balancing strategy: {strategy} (expected one of {', '.join(STRATEGIES)})")
+        self.members = members
+        self.strategy = strategy
+        self._lock = threading.Lock()
+
+    def _cost(self, member):
+        # ties (e.g. sequential requests, nothing outstanding) go to the member that
+        # has served the fewest requests for its weight, i.e. weighted round-robin
+        share = member.requests / member.weight
+        if self.strategy == "latency":
+            # expected time to get an answer if the member works through its queue
+            # (members without samples yet cost nothing, so they get explored)
+            return ((member.latency or 0.0) * (member.outstanding + 1) / member.weight, share)
+        return (member.outstanding / member.weight, share)
+
+    def acquire(self, exclude=()):
+        """Pick a member for a request and count it as outstanding. Returns None if all are excluded."""
+        now = time.monotonic()
+        with self._lock:
+            candidates = [m for m in self.members if m.name not in exclude]
+            if not candidates:
+                return None
+            healthy = [m for m in candidates if m.is_healthy(now)]
+            # when everything is down, still send to the member that recovers first
+            pool = healthy or sorted(
+                candidates, key=lambda m: m.down_until)[:1]
+            member = min(pool, key=self._cost)
+            member.outstanding += 1
+            member.requests += 1
+            return member
+
+    def release(self, member, latency, ok):
+        """ok is None for requests abandoned by the caller: neither success nor failure"""
+        with self._lock:
+            member.outstanding = max(0, member.outstanding - 1)
+            if ok is None:
+                return None
+            if ok:
+                member.consecutive_failures = 0
+                member.latency = latency if member.latency is None else \
+                    (1 - LATENCY_EWMA_ALPHA) * member.latency + \
+                    LATENCY_EWMA_ALPHA * latency
+                return None
+            member.failures += 1
+            member.consecutive_failures += 1
+            if member.consecutive_failures >= MEMBER_FAILURE_THRESHOLD:
+                member.down_until = time.monotonic() + MEMBER_COOLDOWN
+                member.consecutive_failures = 0
+                return f"Endpoint {member.name} failed {MEMBER_FAILURE_THRESHOLD} requests in a row, taking it out of rotation for {MEMBER_COOLDOWN:.0f}s"
+            return None
+
+    def get_stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return {member.name: {
+                "weight": member.weight,
+                "outstanding": member.outstanding,
+                "requests": member.requests,
+                "failures": member.failures,
+                "latency_seconds": round(member.latency, 3) if member.latency is not None else None,
+                "healthy": member.is_healthy(now),
+            } for member in self.members}
+
+
+_balancers = []
+_balancers_lock = threading.Lock()
+
+
+def register_balancer(balancer):
+    """Keep track of a balancer so its member statistics can be reported"""
+    with _balancers_lock:
+        _balancers.append(balancer)
+        # only keep the most recent pools (one per active session, roughly)
+        del _balancers[:-20]
+
+
+def get_all_balancer_stats():
+    with _balancers_lock:
+        balancers = list(_balancers)
+    return [balancer.get_stats() for balancer in balancers]
@@ -0,0 +1,170 @@
+"""
+Rule-based local validation ahead of the model validator
+
+Many validation criteria are mechanical (a word count, a key being present, a target
+word appearing in the sentence) and do not need a model round trip. Such criteria can
+be declared as rules, keyed by criterion name like agent_2_properties:
+
+    {
+        "sentence_length": {"field": "sentence", "min_words": 5, "max_words": 20},
+        "has_target": {"field": "sentence", "contains_field": "target_word"},
+        "complete": {"required_keys": ["sentence", "target_word"]},
+        "letters_only": {"field": "target_word", "pattern": "^[A-Za-z]+$"},
+    }
+
+Supported constraints:
+    field               key (or list of keys) the constraints below apply to;
+                        every non-empty text field of the stimulus when omitted
+    required_keys       keys that must be present with a non-empty value
+    non_empty           the fields must not be empty
+    min_length          minimum / maximum number of characters
+    max_length
+    min_words           minimum / maximum number of words
+    max_words
+    pattern             regular expression that must match (re.search)
+    forbidden_pattern   regular expression that must not match
+    contains_field      key whose value must appear in the field
+    equals_field        key whose value the field must equal
+    differs_from_field  key whose value the field must differ from
+    case_sensitive      compare text case-sensitively (default False)
+
+Rules are checked before any model request and a failing rule rejects the candidate
+right away. A rule named after one of agent_2_properties replaces that criterion, so
+the model validator is only asked about the remaining (semantic) ones.
+"""
+
+import re
+import threading
+
+FIELD_CONSTRAINTS = ("non_empty", "min_length", "max_length", "min_words", "max_words",
+                     "pattern", "forbidden_pattern", "contains_field", "equals_field",
+                     "differs_from_field")
+RULE_KEYS = ("field", "required_keys", "case_sensitive") + FIELD_CONSTRAINTS
+
+
+def _is_empty(value):
+    if isinstance(value, str):
+        return not value.strip()
+    return value is None or value == [] or value == {}
+
+
+class LocalRuleValidator:
+    """Checks stimuli against declarative rules, see the module docstring for the format"""
+
+    def __init__(self, rules):
+        self.rules = {}
+        for name, rule in (rules or {}).items():
+            if not isinstance(rule, dict):
+                raise ValueError(
+                    f"Local rule {name} must be an object of constraints, got {rule!r}")
+            unknown = set(rule) - set(RULE_KEYS)
+            if unknown:
+                raise ValueError(
+                    f"Unknown constraint(s) in local rule {name}: {', '.join(sorted(unknown))} "
+                    f"(expected any of {', '.join(RULE_KEYS)})")
+            if not set(rule) & (set(FIELD_CONSTRAINTS) | {"required_keys"}):
+                raise ValueError(f"Local rule {name} has no constraints")
+            compiled = dict(rule)
+            flags = 0 if rule.get("case_sensitive") else re.IGNORECASE
+            for key in ("pattern", "forbidden_pattern"):
+                if key in rule:
+                    try:
+                        compiled[key] = re.compile(rule[key], flags)
+                    except re.error as e:
+                        raise ValueError(
+                            f"Invalid {key} in local rule {name}: {e}") from e
+            self.rules[name] = compiled
+        self.checks = 0
+        self.rejections = 0
+        self.failures = {name: 0 for name in self.rules}
+        self._lock = threading.Lock()
+
+    def model_properties(self, properties):
+        """The criteria of properties that are left to the model validator"""
+        return {name: description for name, description in properties.items()
+                if name not in self.rules}
+
+    def _fields(self, rule, stimulus):
+        field = rule.get("field")
+        if field is None:
+            return [key for key, value in stimulus.items()
+                    if isinstance(value, str) and value.strip()]
+        return [field] if isinstance(field, str) else list(field)
+
+    def _check_rule(self, rule, stimulus):
+        """None if stimulus satisfies rule, else the reason it does not"""
+        for key in rule.get("required_keys", ()):
+            if _is_empty(stimulus.get(key)):
+                return f"{key} is missing or empty"
+        if not set(rule) & set(FIELD_CONSTRAINTS):
+            return None
+
+        def fold(text):
+            return text if rule.get("case_sensitive") else text.lower()
+
+        for field in self._fields(rule, stimulus):
+            if field not in stimulus:
+                return f"{field} is missing"
+            value = stimulus[field]
+            text = "" if value is None else str(value)
+            if rule.get("non_empty") and not text.strip():
+                return f"{field} is empty"
+            if "min_length" in rule and len(text) < rule["min_length"]:
+                return f"{field} has {len(text)} characters (minimum {rule['min_length']})"
+            if "max_length" in rule and len(text) > rule["max_length"]:
+                return f"{field} has {len(text)} characters (maximum {rule['max_length']})"
+            if "min_words" in rule or "max_words" in rule:
+                words = len(text.split())
+                if "min_words" in rule and words < rule["min_words"]:
+                    return f"{field} has {words} words (minimum {rule['min_words']})"
+                if "max_words" in rule and words > rule["max_words"]:
+                    return f"{field} has {words} words (maximum {rule['max_words']})"
+            if "pattern" in rule and not rule["pattern"].search(text):
+                return f"{field} does not match {rule['pattern'].pattern}"
+            if "forbidden_pattern" in rule and rule["forbidden_pattern"].search(text):
+                return f"{field} matches {rule['forbidden_pattern'].pattern}"
+            for key in ("contains_field", "equals_field", "differs_from_field"):
+                if key not in rule:
+                    continue
+                other_field = rule[key]
+                if other_field not in stimulus:
+                    return f"{other_field} is missing"
+                other = fold(str(stimulus[other_field]).strip())
+                if key == "contains_field" and other not in fold(text):
+                    return f"{field} does not contain {other_field}"
+                if key == "equals_field" and fold(text.strip()) != other:
+                    return f"{field} differs from {other_field}"
+                if key == "differs_from_field" and fold(text.strip()) == other:
+                    return f"{field} equals {other_field}"
+        return None
+
+    def check(self, stimulus):
+        """
+        ({rule: passed}, {rule: reason}) for all rules. Non-dict stimuli (e.g. an
+        unparseable generator output) fail every rule.
+        """
+        results = {}
+        reasons = {}
+        for name, rule in self.rules.items():
+            if isinstance(stimulus, dict):
+                reason = self._check_rule(rule, stimulus)
+            else:
+                reason = "stimulus is not an object"
+            results[name] = reason is None
+            if reason is not None:
+                reasons[name] = reason
+        with self._lock:
+            self.checks += 1
+            if reasons:
+                self.rejections += 1
+            for name in reasons:
+                self.failures[name] += 1
+        return results, reasons
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "checks": self.checks,
+                "rejections": self.rejections,
+                "failures": dict(self.failures),
+            }
@@ -0,0 +1,361 @@
+"""
+Local OpenAI-compatible mock model server
+
+Speaks the chat-completions dialect sent by CustomModelClient (json_schema response
+formats, and the DeepSeek json_object variant) and answers with synthesized JSON that
+conforms to the requested schema. Latency, rate limiting (429), server errors (5xx),
+hung requests and malformed JSON are injected according to a profile, so throughput
+changes can be benchmarked offline and reproducibly.
+"""
+
+import ast
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+
+from flask import Flask, request, jsonify, Response
+from werkzeug.serving import WSGIRequestHandler
+
+
+# Words used to synthesize string fields
+WORDS = [
+    "apple", "river", "teacher", "window", "garden", "music", "doctor", "letter",
+    "mountain", "coffee", "student", "forest", "bridge", "yellow", "quiet", "winter",
+    "market", "candle", "engine", "silver", "ocean", "pencil", "village", "thunder",
+    "basket", "mirror", "ladder", "harbor", "planet", "meadow", "lantern", "violin",
+]
+
+
+class MockServerProfile:
+    """Latency and failure profile of the mock server"""
+
+    DEFAULTS = {
+        # latency distribution: fixed, uniform, normal, lognormal or exponential
+        "latency_distribution": "fixed",
+        "latency_mean": 0.0,
+        "latency_std": 0.0,
+        "latency_min": 0.0,
+        "latency_max": 30.0,
+        # failure injection rates (probability per request)
+        "rate_limit_rate": 0.0,
+        "server_error_rate": 0.0,
+        "timeout_rate": 0.0,
+        "malformed_json_rate": 0.0,
+        # how long a "timed out" request hangs before the server gives up
+        "timeout_seconds": 120.0,
+        # Retry-After header sent with 429 responses (seconds)
+        "retry_after": 1,
+        # probability that a boolean field is true (i.e. a validation criterion passes)
+        "boolean_true_rate": 0.9,
+        # probability that a string field repeats a previously generated value
+        "duplicate_rate": 0.0,
+        # probability that a generator response (all-string object) repeats an earlier
+        # one, upper-cased, like a model re-proposing a candidate
+        "candidate_repeat_rate": 0.0,
+        # answer top-level boolean responses (validator verdicts) as a function of the
+        # case-folded prompt, like a temperature-0 model, instead of drawing them anew
+        "deterministic_verdicts": False,
+        "seed": None,
+    }
+
+    def __init__(self, **options):
+        unknown = set(options) - set(self.DEFAULTS)
+        if unknown:
+            raise ValueError(
+                f"Unknown mock server options: {', '.join(sorted(unknown))}")
+        for name, default in self.DEFAULTS.items():
+            setattr(self, name, options.get(name, default))
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(**json.load(f))
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.DEFAULTS}
+
+
+class MockModelServer:
+    """Schema-aware chat-completions stand-in"""
+
+    def __init__(self, profile=None):
+        self.profile = profile or MockServerProfile()
+        self._rng = random.Random(self.profile.seed)
+        self._rng_lock = threading.Lock()
+        self._counter = 0
+        self._generated_strings = {}
+        self._generated_candidates = {}
+        self._stats_lock = threading.Lock()
+        self._stats = {"requests": 0, "ok": 0, "rate_limited": 0,
+                       "server_errors": 0, "timeouts": 0, "malformed": 0}
+        self.app = self._create_app()
+
+    # ---- randomness (shared RNG, so a seeded profile is reproducible) ----
+    def _random(self):
+        with self._rng_lock:
+            return self._rng.random()
+
+    def _latency(self):
+        p = self.profile
+        with self._rng_lock:
+            if p.latency_distribution == "uniform":
+                value = self._rng.uniform(p.latency_min, p.latency_max)
+            elif p.latency_distribution == "normal":
+                value = self._rng.gauss(p.latency_mean, p.latency_std)
+            elif p.latency_distribution == "lognormal":
+                value = p.latency_mean * \
+                    self._rng.lognormvariate(0, p.latency_std or 0.5)
+            elif p.latency_distribution == "exponential":
+                value = self._rng.expovariate(
+                    1 / p.latency_mean) if p.latency_mean > 0 else 0
+            else:
+                value = p.latency_mean
+        return min(p.latency_max, max(p.latency_min, value))
+
+    def _count(self, key):
+        with self._stats_lock:
+            self._stats[key] += 1
+
+    def get_stats(self):
+        with self._stats_lock:
+            return dict(self._stats)
+
+    # ---- JSON synthesis ----
+    def _synthesize_string(self, name):
+        with self._rng_lock:
+            previous = self._generated_strings.setdefault(name, [])
+            if previous and self._rng.random() < self.profile.duplicate_rate:
+                return self._rng.choice(previous)
+            self._counter += 1
+            value = " ".join(self._rng.choice(WORDS)
+                             for _ in range(3)) + f" {self._counter}"
+            previous.append(value)
+            return value
+
+    def _synthesize(self, name, schema):
+        if not isinstance(schema, dict):
+            schema = {}
+        if "enum" in schema and schema["enum"]:
+            with self._rng_lock:
+                return self._rng.choice(schema["enum"])
+
+        schema_type = schema.get("type", "string")
+        if isinstance(schema_type, list):
+            schema_type = next(
+                (t for t in schema_type if t != "null"), "string")
+
+        if schema_type == "boolean":
+            return self._random() < self.profile.boolean_true_rate
+        if schema_type == "integer":
+            low = int(schema.get("minimum", 0))
+            high = int(schema.get("maximum", max(low, 10)))
+            with self._rng_lock:
+                return self._rng.randint(low, max(low, high))
+        if schema_type == "number":
+            low = float(schema.get("minimum", 0))
+            high = float(schema.get("maximum", max(low, 10)))
+            return round(low + self._random() * (high - low), 3)
+        if schema_type == "array":
+            count = max(1, int(schema.get("minItems", 1)))
+            return [self._synthesize(name, schema.get("items", {})) for _ in range(count)]
+        if schema_type == "object":
+            return self._synthesize_object(schema.get("properties", {}))
+        return self._synthesize_string(name)
+
+    def _synthesize_object(self, properties):
+        return {name: self._synthesize(name, schema) for name, schema in properties.items()}
+
+    def _synthesize_response(self, properties, prompt):
+        if properties and self.profile.deterministic_verdicts and all(
+                schema.get("type") == "boolean" for schema in properties.values()):
+            verdicts = {}
+            for name in properties:
+                digest = hashlib.sha256(
+                    f"{' '.join(prompt.lower().split())}\n{name}".encode("utf-8")).digest()
+                verdicts[name] = random.Random(
+                    digest).random() < self.profile.boolean_true_rate
+            return verdicts
+        if not properties or any(schema.get("type", "string") != "string"
+                                 for schema in properties.values()):
+            return self._synthesize_object(properties)
+        with self._rng_lock:
+            previous = self._generated_candidates.setdefault(
+                tuple(sorted(properties)), [])
+            if previous and self._rng.random() < self.profile.candidate_repeat_rate:
+                return {name: value.upper() for name, value in self._rng.choice(previous).items()}
+        candidate = self._synthesize_object(properties)
+        with self._rng_lock:
+            previous.append(candidate)
+        return candidate
+
+    @staticmethod
+    def _json_object_properties(prompt):
+        """
+        Recover the requested fields from a DeepSeek-style json_object prompt, which ends with
+        'fields must include: "a", "b", requirements for each field are as follows: {...}'
+        """
+        properties = {}
+        match = re.search(
+            r"requirements for each field are as follows: (\{.*\})", prompt, re.S)
+        if match:
+            try:
+                parsed = ast.literal_eval(match.group(1))
+                if isinstance(parsed, dict):
+                    properties = parsed
+            except (ValueError, SyntaxError):
+                pass
+        if not properties:
+            fields = re.search(
+                r"fields must include: (.*?), requirements", prompt, re.S)
+            names = re.findall(r'"([^"]+)"', fields.group(1)) if fields else []
+            properties = {name: {} for name in names}
+
+        # plain-text type hints appended for validator and scorer prompts
+        if "can only return boolean" in prompt:
+            default_type = "boolean"
+        elif "can only return numbers" in prompt:
+            default_type = "integer"
+        else:
+            default_type = "string"
+        return {name: schema if isinstance(schema, dict) and "type" in schema else {"type": default_type}
+                for name, schema in properties.items()}
+
+    def _response_properties(self, body):
+        response_format = body.get("response_format") or {}
+        if response_format.get("type") == "json_schema":
+            schema = response_format.get("json_schema", {}).get("schema", {})
+            return schema.get("properties", {})
+        prompt = "\n".join(str(message.get("content", ""))
+                           for message in body.get("messages", []))
+        return self._json_object_properties(prompt)
+
+    # ---- request handling ----
+    def handle_chat_completion(self, body):
+        self._count("requests")
+        p = self.profile
+
+        delay = self._latency()
+        if delay > 0:
+            time.sleep(delay)
+
+        roll = self._random()
+        if roll < p.rate_limit_rate:
+            self._count("rate_limited")
+            response = jsonify(
+                {"error": {"message": "Rate limit exceeded (mock)", "type": "rate_limit_error"}})
+            response.status_code = 429
+            response.headers["Retry-After"] = str(p.retry_after)
+            return response
+        roll -= p.rate_limit_rate
+        if roll < p.server_error_rate:
+            self._count("server_errors")
+            with self._rng_lock:
+                status = self._rng.choice([500, 502, 503])
+            response = jsonify(
+                {"error": {"message": "Internal server error (mock)", "type": "server_error"}})
+            response.status_code = status
+            return response
+        roll -= p.server_error_rate
+        if roll < p.timeout_rate:
+            self._count("timeouts")
+            time.sleep(p.timeout_seconds)
+            response = jsonify(
+                {"error": {"message": "Gateway timeout (mock)", "type": "timeout"}})
+            response.status_code = 504
+            return response
+
+        prompt = "\n".join(str(message.get("content", ""))
+                           for message in body.get("messages", []))
+        content = json.dumps(self._synthesize_response(
+            self._response_properties(body), prompt))
+        if self._random() < p.malformed_json_rate:
+            self._count("malformed")
+            # cut the JSON short so it fails to parse
+            content = content[:max(1, len(content) // 2)]
+        else:
+            self._count("ok")
+
+        prompt_tokens = sum(len(str(message.get("content", ""))) for message in body.get(
+            "messages", [])) // 4
+        completion_tokens = len(content) // 4
+        return jsonify({
+            "id": f"chatcmpl-mock-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock-model"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        })
+
+    def _create_app(self):
+        app = Flask(__name__)
+
+        @app.route("/v1/chat/completions", methods=["POST"])
+        @app.route("/chat/completions", methods=["POST"])
+        def chat_completions():
+            body = request.get_json(silent=True)
+            if not isinstance(body, dict):
+                return jsonify({"error": {"message": "Invalid JSON body"}}), 400
+            return self.handle_chat_completion(body)
+
+        @app.route("/stats", methods=["GET"])
+        def stats():
+            return jsonify({"stats": self.get_stats(), "profile": self.profile.to_dict()})
+
+        @app.route("/health", methods=["GET"])
+        def health():
+            return Response("ok", mimetype="text/plain")
+
+        return app
+
+
+class _KeepAliveRequestHandler(WSGIRequestHandler):
+    # HTTP/1.1 so clients can reuse connections, like a real provider
+    protocol_version = "HTTP/1.1"
+
+
+class _QuietRequestHandler(_KeepAliveRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def run_mock_server(host="127.0.0.1", port=8000, profile=None):
+    """Run the mock server in the foreground"""
+    from werkzeug.serving import run_simple
+
+    server = MockModelServer(profile)
+    print(
+        f"Mock model server listening on http://{host}:{port}/v1/chat/completions")
+    print(f"Profile: {json.dumps(server.profile.to_dict())}")
+    run_simple(host, port, server.app, threaded=True,
+               request_handler=_KeepAliveRequestHandler)
+
+
+def start_mock_server_in_thread(host="127.0.0.1", port=0, profile=None, log_requests=False):
+    """
+    Start the mock server on a background thread (for benchmarks).
+    Returns (server, base_url, shutdown) where base_url ends in /v1/chat/completions.
+    """
+    from werkzeug.serving import make_server
+
+    server = MockModelServer(profile)
+    handler = _KeepAliveRequestHandler if log_requests else _QuietRequestHandler
+    http_server = make_server(host, port, server.app, threaded=True,
+                              request_handler=handler)
+    thread = threading.Thread(
+        target=http_server.serve_forever, name="mock-model-server", daemon=True)
+    thread.start()
+    base_url = f"http://{host}:{http_server.server_port}/v1/chat/completions"
+    return server, base_url, http_server.shutdown
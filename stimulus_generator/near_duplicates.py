@@ -0,0 +1,147 @@
+"""
+Local near-duplicate detection with MinHash LSH
+
+Exact repetition checks miss trivial rewordings ("The cat sat on the mat." vs "the cat
+sat on the mats!"), which then cost a full round of validation and scoring. This index
+shingles every field value into character (or word) n-grams, compresses the shingle
+set into a MinHash signature and files it in LSH buckets. A candidate is only compared
+with the values sharing a bucket, so a lookup costs about the same for 100 or 100k
+stimuli. Bucket matches are confirmed with the exact Jaccard similarity of the shingle
+sets before a candidate is rejected.
+
+As with the exact check, values are only compared within the same field.
+"""
+
+import re
+import zlib
+
+import numpy as np
+
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_NGRAM = 3
+DEFAULT_NUM_PERM = 128
+SHINGLE_MODES = ("char", "word")
+
+# largest prime below 2^32: a * x + b stays below 2^64 for 32-bit shingle hashes x
+_PRIME = 4294967291
+_NON_WORD = re.compile(r"[^\w\s]+")
+_SPACES = re.compile(r"\s+")
+
+
+def _lsh_parameters(threshold, num_perm):
+    """
+    (bands, rows) with bands * rows == num_perm whose S-curve midpoint (1/bands)^(1/rows)
+    lies a bit below threshold, trading extra candidates (filtered by the exact check)
+    for fewer missed near-duplicates
+    """
+    target = threshold * 0.85
+    options = [(num_perm // rows, rows)
+               for rows in range(1, num_perm + 1) if num_perm % rows == 0]
+    return min(options, key=lambda option: abs((1 / option[0]) ** (1 / option[1]) - target))
+
+
+class NearDuplicateIndex:
+    """MinHash LSH index of the field values of the stimuli added so far"""
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, ngram=DEFAULT_NGRAM, shingles="char",
+                 num_perm=DEFAULT_NUM_PERM, fields=None, seed=1):
+        if shingles not in SHINGLE_MODES:
+            raise ValueError(
+                f"Unknown shingle mode: {shingles} (expected one of {', '.join(SHINGLE_MODES)})")
+        try:
+            self.threshold = float(threshold)
+            self.ngram = int(ngram)
+        except (TypeError, ValueError):
+            raise ValueError(
+                f"Invalid threshold {threshold!r} or n-gram size {ngram!r}") from None
+        if not 0 < self.threshold <= 1:
+            raise ValueError(
+                f"Near-duplicate threshold must be in (0, 1], got {threshold}")
+        if self.ngram < 1:
+            raise ValueError(f"N-gram size must be at least 1, got {ngram}")
+        self.shingles = shingles
+        self.fields = set(fields) if fields else None
+        self.bands, self.rows = _lsh_parameters(self.threshold, num_perm)
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, _PRIME, size=num_perm, dtype=np.uint64)
+        # field -> list of shingle sets, field -> one bucket dict per band
+        self._shingle_sets = {}
+        self._buckets = {}
+        self.checks = 0
+        self.matches = 0
+
+    def _shingle(self, value):
+        text = _SPACES.sub(" ", _NON_WORD.sub(
+            " ", str(value).lower())).strip()
+        if self.shingles == "word":
+            tokens = text.split(" ")
+        else:
+            tokens = text
+        if len(tokens) <= self.ngram:
+            return {" ".join(tokens) if self.shingles == "word" else tokens}
+        if self.shingles == "word":
+            return {" ".join(tokens[start:start + self.ngram])
+                    for start in range(len(tokens) - self.ngram + 1)}
+        return {text[start:start + self.ngram] for start in range(len(text) - self.ngram + 1)}
+
+    def _band_keys(self, shingle_set):
+        hashes = np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in shingle_set),
+                             dtype=np.uint64, count=len(shingle_set))
+        # universal hashing a * x + b mod p, one row per permutation
+        signature = ((np.outer(self._a, hashes) + self._b[:, None])
+                     % _PRIME).min(axis=1)
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes()
+                for band in range(self.bands)]
+
+    def _values(self, stimulus):
+        for field, value in stimulus.items():
+            if self.fields is not None and field not in self.fields:
+                continue
+            if value is None or isinstance(value, (bool, int, float)):
+                continue
+            yield field, value
+
+    def add(self, stimulus):
+        for field, value in self._values(stimulus):
+            shingle_set = self._shingle(value)
+            if not shingle_set or shingle_set == {""}:
+                continue
+            sets = self._shingle_sets.setdefault(field, [])
+            buckets = self._buckets.setdefault(
+                field, [{} for _ in range(self.bands)])
+            for band, key in enumerate(self._band_keys(shingle_set)):
+                buckets[band].setdefault(key, []).append(len(sets))
+            sets.append(shingle_set)
+
+    def find_duplicate(self, stimulus):
+        """(field, similarity) of the first near-duplicate field value found, else None"""
+        self.checks += 1
+        for field, value in self._values(stimulus):
+            buckets = self._buckets.get(field)
+            if not buckets:
+                continue
+            shingle_set = self._shingle(value)
+            if not shingle_set or shingle_set == {""}:
+                continue
+            candidates = set()
+            for band, key in enumerate(self._band_keys(shingle_set)):
+                candidates.update(buckets[band].get(key, ()))
+            sets = self._shingle_sets[field]
+            for candidate in candidates:
+                other = sets[candidate]
+                similarity = len(shingle_set & other) / \
+                    len(shingle_set | other)
+                if similarity >= self.threshold:
+                    self.matches += 1
+                    return field, similarity
+        return None
+
+    def get_stats(self):
+        return {
+            "values": sum(len(sets) for sets in self._shingle_sets.values()),
+            "checks": self.checks,
+            "near_duplicates": self.matches,
+            "bands": self.bands,
+            "rows": self.rows,
+        }
@@ -0,0 +1,153 @@
+"""
+Staged pipeline with bounded queues
+
+Stages run in their own worker threads and hand items to the next stage through
+bounded queues, so a slow stage blocks the stages before it (backpressure) instead of
+letting work pile up. Per-stage busy, idle and blocked time is tracked so the
+bottleneck stage shows up as the one with the highest utilization.
+"""
+
+import queue
+import threading
+import time
+
+DEFAULT_QUEUE_SIZE = 2
+# how often workers re-check for completion while waiting on a queue
+POLL_INTERVAL = 0.2
+
+
+class PipelineStage:
+    """
+    One stage: process(item) returns a list of items for the next stage (the first
+    stage is called with None and acts as the source)
+    """
+
+    def __init__(self, name, process, workers=1):
+        self.name = name
+        self.process = process
+        self.workers = max(1, int(workers))
+        self._lock = threading.Lock()
+        self.processed = 0
+        self.emitted = 0
+        self.busy_seconds = 0.0
+        self.idle_seconds = 0.0
+        self.blocked_seconds = 0.0
+
+    def _add(self, **amounts):
+        with self._lock:
+            for name, amount in amounts.items():
+                setattr(self, name, getattr(self, name) + amount)
+
+    def get_stats(self, elapsed):
+        with self._lock:
+            capacity = self.workers * elapsed
+            return {
+                "workers": self.workers,
+                "processed": self.processed,
+                "emitted": self.emitted,
+                "utilization": round(self.busy_seconds / capacity, 3) if capacity else 0.0,
+                "idle_seconds": round(self.idle_seconds, 3),
+                "blocked_seconds": round(self.blocked_seconds, 3),
+            }
+
+
+class StagePipeline:
+    """Runs stages connected by bounded queues until done() is true, stop_event is set or a stage fails"""
+
+    def __init__(self, stages, queue_size=DEFAULT_QUEUE_SIZE, stop_event=None):
+        self.stages = stages
+        self.queues = [queue.Queue(maxsize=max(1, int(queue_size)))
+                       for _ in stages[1:]]
+        self.stop_event = stop_event
+        self._finished = threading.Event()
+        self._error = None
+        self._started = None
+
+    def _should_finish(self, done):
+        if self._finished.is_set():
+            return True
+        if (self.stop_event is not None and self.stop_event.is_set()) or done():
+            self._finished.set()
+            return True
+        return False
+
+    def _put(self, stage, target, item, done):
+        """Hand an item to the next stage, blocking while its queue is full (backpressure)"""
+        start = time.perf_counter()
+        try:
+            while not self._should_finish(done):
+                try:
+                    target.put(item, timeout=POLL_INTERVAL)
+                    return
+                except queue.Full:
+                    continue
+        finally:
+            stage._add(blocked_seconds=time.perf_counter() - start)
+
+    def _worker(self, index, done):
+        stage = self.stages[index]
+        source = self.queues[index - 1] if index > 0 else None
+        target = self.queues[index] if index < len(self.queues) else None
+        try:
+            while not self._should_finish(done):
+                item = None
+                if source is not None:
+                    wait_start = time.perf_counter()
+                    try:
+                        item = source.get(timeout=POLL_INTERVAL)
+                    except queue.Empty:
+                        continue
+                    finally:
+                        stage._add(idle_seconds=time.perf_counter() - wait_start)
+
+                busy_start = time.perf_counter()
+                outputs = stage.process(item) or []
+                stage._add(processed=1, emitted=len(outputs),
+                           busy_seconds=time.perf_counter() - busy_start)
+                if target is not None:
+                    for output in outputs:
+                        self._put(stage, target, output, done)
+        except Exception as e:
+            if self._error is None:
+                self._error = e
+            self._finished.set()
+
+    def get_stats(self):
+        elapsed = time.perf_counter() - self._started if self._started else 0.0
+        stats = {stage.name: stage.get_stats(elapsed) for stage in self.stages}
+        for stage, stage_queue in zip(self.stages[1:], self.queues):
+            stats[stage.name]["queue_depth"] = stage_queue.qsize()
+        return stats
+
+    def format_stats(self):
+        """One-line utilization summary, bottleneck first"""
+        stats = self.get_stats()
+        ordered = sorted(stats.items(), key=lambda entry: -
+                         entry[1]["utilization"])
+        return ", ".join(f"{name} {entry['utilization']:.0%} busy ({entry['workers']} worker(s), {entry['processed']} items)"
+                         for name, entry in ordered)
+
+    def run(self, done, report=None, report_interval=10.0):
+        """
+        Run until done() returns True. report(pipeline) is called every report_interval
+        seconds while running. Re-raises the first exception raised by a stage.
+        """
+        self._started = time.perf_counter()
+        threads = [threading.Thread(target=self._worker, args=(index, done), daemon=True,
+                                    name=f"pipeline-{stage.name}-{worker}")
+                   for index, stage in enumerate(self.stages)
+                   for worker in range(stage.workers)]
+        for thread in threads:
+            thread.start()
+
+        last_report = time.perf_counter()
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(POLL_INTERVAL)
+                if report and time.perf_counter() - last_report >= report_interval:
+                    last_report = time.perf_counter()
+                    report(self)
+
+        if self._error is not None:
+            raise self._error
+        return self.get_stats()
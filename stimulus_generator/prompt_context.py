@@ -0,0 +1,83 @@
+"""
+Bounded prompt context for the generator
+
+Every generator prompt lists existing stimuli as examples. Listing all of them makes
+prompts grow with every accepted stimulus, so a context policy picks a bounded
+subset instead. Seed examples (the stimuli the run started with) stay pinned at the
+front. Uniqueness does not depend on the model seeing every stimulus: repetitions
+are still rejected locally by the repetition check.
+"""
+
+import random
+
+# "all" keeps the original behaviour of listing every stimulus
+CONTEXT_POLICIES = ("all", "last", "random", "stratified", "token_budget")
+DEFAULT_CONTEXT_SIZE = 50
+DEFAULT_CONTEXT_TOKEN_BUDGET = 4000
+
+
+def estimate_stimulus_tokens(stimulus):
+    """Rough token count of a stimulus as it appears in the prompt (~4 characters per token)"""
+    return len(str(stimulus)) // 4 + 1
+
+
+class PromptContextPolicy:
+    """
+    Selects the stimuli shown to the generator. The first seed_count stimuli are seeds:
+    up to max_pinned of them are always included (all by default), the accepted stimuli
+    after them are subsampled according to policy.
+    """
+
+    def __init__(self, policy="all", size=DEFAULT_CONTEXT_SIZE, token_budget=DEFAULT_CONTEXT_TOKEN_BUDGET,
+                 seed_count=0, max_pinned=None, rng=None):
+        if policy not in CONTEXT_POLICIES:
+            raise ValueError(
+                f"Unknown context policy: {policy} (expected one of {', '.join(CONTEXT_POLICIES)})")
+        self.policy = policy
+        self.size = max(0, int(size))
+        self.token_budget = max(0, int(token_budget))
+        self.seed_count = seed_count
+        self.max_pinned = seed_count if max_pinned is None else min(
+            seed_count, int(max_pinned))
+        self.rng = rng or random.Random()
+
+    def select(self, stimuli):
+        if self.policy == "all":
+            return stimuli
+        pinned = list(stimuli[:self.max_pinned])
+        accepted = stimuli[self.seed_count:]
+
+        if self.policy == "last":
+            chosen = list(accepted[-self.size:]) if self.size else []
+        elif self.policy == "random":
+            chosen = [accepted[index] for index in sorted(
+                self.rng.sample(range(len(accepted)), min(self.size, len(accepted))))]
+        elif self.policy == "stratified":
+            chosen = self._stratified(accepted)
+        else:
+            chosen = self._within_budget(
+                accepted, self.token_budget - sum(estimate_stimulus_tokens(s) for s in pinned))
+        return pinned + chosen
+
+    def _stratified(self, accepted):
+        """One random stimulus from each of size equal slices of the history, oldest first"""
+        if len(accepted) <= self.size:
+            return list(accepted)
+        chosen = []
+        for stratum in range(self.size):
+            start = stratum * len(accepted) // self.size
+            end = (stratum + 1) * len(accepted) // self.size
+            chosen.append(accepted[self.rng.randrange(start, end)])
+        return chosen
+
+    @staticmethod
+    def _within_budget(accepted, budget):
+        """The most recent stimuli that fit in budget tokens, in their original order"""
+        chosen = []
+        for stimulus in reversed(accepted):
+            budget -= estimate_stimulus_tokens(stimulus)
+            if budget < 0:
+                break
+            chosen.append(stimulus)
+        chosen.reverse()
+        return chosen
@@ -0,0 +1,328 @@
+"""
+Rate-limit-aware request scheduler
+
+Every model client asks the process-wide scheduler for permission before sending a
+request. Limits are token buckets for requests-per-minute and tokens-per-minute, kept
+per (endpoint, API key), so concurrent sessions sharing a key share its budget. Waiting
+requests are served round-robin across sessions. Rate-limit headers and 429 responses
+(Retry-After) from the provider pause or resize the buckets.
+"""
+
+import asyncio
+import hashlib
+import re
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+
+# backoff when a 429 arrives without any Retry-After / reset hint
+DEFAULT_RATE_LIMIT_BACKOFF = 1.0
+MAX_RATE_LIMIT_BACKOFF = 60.0
+
+
+def limit_key(api_url, api_key):
+    """Scheduler key for an endpoint + API key (the key itself is never stored)"""
+    parts = urlsplit((api_url or "").strip())
+    endpoint = f"{parts.scheme}://{parts.netloc}".lower()
+    key_hash = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+    return f"{endpoint}#{key_hash}"
+
+
+def estimate_request_tokens(messages, params=None):
+    """Rough token estimate of a request: ~4 characters per token plus the completion budget"""
+    characters = sum(len(str(message.get("content", "")))
+                     for message in messages)
+    return characters // 4 + int((params or {}).get("max_tokens") or 0)
+
+
+def parse_reset_duration(value):
+    """Parse rate-limit reset values such as '1s', '6m0s', '20ms' or '0.5' into seconds"""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    total = 0.0
+    matched = False
+    for amount, unit in re.findall(r"([\d.]+)(ms|h|m|s)", value):
+        matched = True
+        amount = float(amount)
+        total += {"ms": amount / 1000, "s": amount,
+                  "m": amount * 60, "h": amount * 3600}[unit]
+    return total if matched else None
+
+
+def parse_retry_after(headers):
+    """Seconds to wait according to Retry-After / retry-after-ms headers, or None"""
+    if not headers:
+        return None
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `per_minute` units per minute"""
+
+    def __init__(self, per_minute):
+        self.per_minute = float(per_minute)
+        self.capacity = float(per_minute)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens +
+                              elapsed * self.per_minute / 60.0)
+            self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until `amount` units are available (requests bigger than the bucket wait for a full bucket)"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) * 60.0 / self.per_minute
+
+    def consume(self, amount, now):
+        self._refill(now)
+        # may go negative (debt) when the actual usage exceeds the estimate
+        self.tokens -= amount
+
+    def resize(self, per_minute):
+        self.per_minute = float(per_minute)
+        self.capacity = float(per_minute)
+        self.tokens = min(self.tokens, self.capacity)
+
+
+class _Ticket:
+    __slots__ = ("session_id", "tokens")
+
+    def __init__(self, session_id, tokens):
+        self.session_id = session_id
+        self.tokens = tokens
+
+
+class _KeyLimiter:
+    """Limits and waiting queue of one (endpoint, API key)"""
+
+    def __init__(self, rpm=None, tpm=None):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.configured = bool(rpm or tpm)
+        self.blocked_until = 0.0
+        self.consecutive_rate_limits = 0
+        # session_id -> deque of waiting tickets; order = round-robin of sessions with waiters
+        self.queues = {}
+        self.order = deque()
+        self.stats = {"granted": 0, "rate_limited": 0, "total_wait": 0.0}
+
+    def enqueue(self, ticket):
+        queue = self.queues.get(ticket.session_id)
+        if queue is None:
+            queue = self.queues[ticket.session_id] = deque()
+            self.order.append(ticket.session_id)
+        queue.append(ticket)
+
+    def remove(self, ticket):
+        queue = self.queues.get(ticket.session_id)
+        if queue is None or ticket not in queue:
+            return
+        queue.remove(ticket)
+        if not queue:
+            del self.queues[ticket.session_id]
+            self.order.remove(ticket.session_id)
+
+    def try_grant(self, ticket, now):
+        """0 if the ticket may be sent now (and is dequeued), else seconds to wait before retrying"""
+        if not self.order or self.queues[self.order[0]][0] is not ticket:
+            # not this ticket's turn yet
+            return 0.05
+        wait = max(0.0, self.blocked_until - now)
+        if self.requests:
+            wait = max(wait, self.requests.wait_time(1, now))
+        if self.tokens and ticket.tokens:
+            wait = max(wait, self.tokens.wait_time(ticket.tokens, now))
+        if wait > 0:
+            return wait
+
+        if self.requests:
+            self.requests.consume(1, now)
+        if self.tokens and ticket.tokens:
+            self.tokens.consume(ticket.tokens, now)
+        session_id = self.order.popleft()
+        queue = self.queues[session_id]
+        queue.popleft()
+        if queue:
+            # the session goes to the back of the line
+            self.order.append(session_id)
+        else:
+            del self.queues[session_id]
+        self.stats["granted"] += 1
+        return 0.0
+
+
+class RequestScheduler:
+    """Process-wide scheduler shared by all model clients"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._limiters = {}
+
+    def _limiter(self, key):
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            limiter = self._limiters[key] = _KeyLimiter()
+        return limiter
+
+    def configure(self, key, rpm=None, tpm=None):
+        """Set explicit requests/tokens per minute limits for a key"""
+        with self._condition:
+            limiter = self._limiter(key)
+            if rpm:
+                if limiter.requests:
+                    limiter.requests.resize(rpm)
+                else:
+                    limiter.requests = TokenBucket(rpm)
+            if tpm:
+                if limiter.tokens:
+                    limiter.tokens.resize(tpm)
+                else:
+                    limiter.tokens = TokenBucket(tpm)
+            limiter.configured = limiter.configured or bool(rpm or tpm)
+            self._condition.notify_all()
+
+    def acquire(self, key, tokens=0, session_id=None, stop_event=None):
+        """Block until a request for `key` may be sent. Returns False if stop_event was set while waiting."""
+        ticket = _Ticket(session_id, tokens)
+        started = time.monotonic()
+        with self._condition:
+            limiter = self._limiter(key)
+            limiter.enqueue(ticket)
+            try:
+                while True:
+                    wait = limiter.try_grant(ticket, time.monotonic())
+                    if wait == 0:
+                        limiter.stats["total_wait"] += time.monotonic() - started
+                        self._condition.notify_all()
+                        return True
+                    if stop_event is not None and stop_event.is_set():
+                        return False
+                    self._condition.wait(min(wait, 1.0))
+            finally:
+                limiter.remove(ticket)
+
+    async def acquire_async(self, key, tokens=0, session_id=None, stop_event=None):
+        """Coroutine version of acquire for the async engine"""
+        ticket = _Ticket(session_id, tokens)
+        started = time.monotonic()
+        with self._condition:
+            limiter = self._limiter(key)
+            limiter.enqueue(ticket)
+        try:
+            while True:
+                with self._condition:
+                    wait = limiter.try_grant(ticket, time.monotonic())
+                    if wait == 0:
+                        limiter.stats["total_wait"] += time.monotonic() - started
+                        self._condition.notify_all()
+                        return True
+                if stop_event is not None and stop_event.is_set():
+                    return False
+                await asyncio.sleep(min(wait, 0.1))
+        finally:
+            with self._condition:
+                limiter.remove(ticket)
+
+    def record_response(self, key, status_code, headers=None, tokens_used=None, tokens_estimated=0):
+        """Feed a response back: honor 429/Retry-After and adopt the provider's advertised limits"""
+        headers = {k.lower(): v for k, v in (headers or {}).items()}
+        now = time.monotonic()
+        with self._condition:
+            limiter = self._limiter(key)
+
+            # correct the token bucket with the real usage
+            if limiter.tokens and tokens_used is not None:
+                limiter.tokens.consume(tokens_used - tokens_estimated, now)
+
+            # adopt advertised limits unless the user configured them explicitly
+            if not limiter.configured:
+                for header, bucket_name in (("x-ratelimit-limit-requests", "requests"),
+                                            ("x-ratelimit-limit-tokens", "tokens")):
+                    try:
+                        advertised = float(headers[header])
+                    except (KeyError, ValueError):
+                        continue
+                    bucket = getattr(limiter, bucket_name)
+                    if bucket is None:
+                        setattr(limiter, bucket_name, TokenBucket(advertised))
+                    elif bucket.per_minute != advertised:
+                        bucket.resize(advertised)
+
+            # provider says the budget is exhausted until the reset
+            for remaining_header, reset_header in (("x-ratelimit-remaining-requests", "x-ratelimit-reset-requests"),
+                                                   ("x-ratelimit-remaining-tokens", "x-ratelimit-reset-tokens")):
+                remaining = headers.get(remaining_header)
+                reset = parse_reset_duration(headers.get(reset_header))
+                if remaining is not None and reset is not None:
+                    try:
+                        if float(remaining) <= 0:
+                            limiter.blocked_until = max(
+                                limiter.blocked_until, now + reset)
+                    except ValueError:
+                        pass
+
+            if status_code == 429:
+                limiter.stats["rate_limited"] += 1
+                limiter.consecutive_rate_limits += 1
+                retry_after = parse_retry_after(headers)
+                if retry_after is None:
+                    retry_after = min(MAX_RATE_LIMIT_BACKOFF, DEFAULT_RATE_LIMIT_BACKOFF *
+                                      2 ** (limiter.consecutive_rate_limits - 1))
+                limiter.blocked_until = max(
+                    limiter.blocked_until, now + retry_after)
+                print(
+                    f"Rate limited by {key.split('#')[0]}, pausing requests for {retry_after:.1f}s")
+            elif status_code is not None and status_code < 400:
+                limiter.consecutive_rate_limits = 0
+
+            self._condition.notify_all()
+
+    def get_stats(self):
+        now = time.monotonic()
+        with self._condition:
+            return {key: {
+                "rpm": limiter.requests.per_minute if limiter.requests else None,
+                "tpm": limiter.tokens.per_minute if limiter.tokens else None,
+                "granted": limiter.stats["granted"],
+                "rate_limited": limiter.stats["rate_limited"],
+                "waiting": sum(len(q) for q in limiter.queues.values()),
+                "total_wait_seconds": round(limiter.stats["total_wait"], 3),
+                "paused_for_seconds": round(max(0.0, limiter.blocked_until - now), 3),
+            } for key, limiter in self._limiters.items()}
+
+
+_scheduler = RequestScheduler()
+
+
+def get_request_scheduler():
+    """Get the process-wide request scheduler"""
+    return _scheduler
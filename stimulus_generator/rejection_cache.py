@@ -0,0 +1,147 @@
+"""
+Negative cache of rejected candidates
+
+The generator regularly re-proposes a candidate the validator has already rejected,
+often differing only in case or spacing. Rejected candidates are remembered in
+normalized form together with the criteria they failed, so a re-proposal is rejected
+without another validator request.
+
+Entries belong to one experiment design and the criteria the model validated. A run
+either starts with an empty cache ("run" scope) or shares it with the earlier runs of
+the same design in this process ("design" scope). Given a path, a design's entries
+are also kept in SQLite, so they survive restarts.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+SCOPES = ("run", "design")
+DEFAULT_MAX_ENTRIES = 100000
+
+# prune the SQLite table every N writes rather than on every write
+PRUNE_INTERVAL = 100
+
+
+def normalize_candidate(stimulus):
+    """Key of a candidate, ignoring case and whitespace differences (None for non-dict output)"""
+    if not isinstance(stimulus, dict):
+        return None
+    canonical = {str(key): " ".join(str(value).lower().split())
+                 for key, value in stimulus.items()}
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True, ensure_ascii=False)
+                          .encode("utf-8")).hexdigest()
+
+
+def design_key(experiment_design, properties):
+    return hashlib.sha256(json.dumps([experiment_design, properties], sort_keys=True,
+                                     default=str).encode("utf-8")).hexdigest()
+
+
+class RejectionCache:
+    """Thread-safe map of normalized rejected candidates to the criteria they failed"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, path=None, design=None):
+        self.max_entries = max(1, int(max_entries))
+        self.path = path
+        self.design = design
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._stats = {"lookups": 0, "hits": 0, "added": 0}
+        self._conn = None
+
+        if path:
+            if path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS rejections ("
+                "design TEXT NOT NULL, key TEXT NOT NULL, failed TEXT NOT NULL, "
+                "created REAL NOT NULL, PRIMARY KEY (design, key))")
+            self._conn.commit()
+            rows = self._conn.execute(
+                "SELECT key, failed FROM rejections WHERE design = ? ORDER BY created DESC LIMIT ?",
+                (design or "", self.max_entries)).fetchall()
+            for key, failed in reversed(rows):
+                self._entries[key] = json.loads(failed)
+
+    def lookup(self, stimulus):
+        """The criteria stimulus failed when it was rejected before, else None"""
+        key = normalize_candidate(stimulus)
+        with self._lock:
+            self._stats["lookups"] += 1
+            failed = self._entries.get(key) if key is not None else None
+            if failed is not None:
+                self._stats["hits"] += 1
+                self._entries.move_to_end(key)
+            return failed
+
+    def add(self, stimulus, failed_criteria):
+        key = normalize_candidate(stimulus)
+        if key is None or not failed_criteria:
+            return
+        failed = list(failed_criteria)
+        with self._lock:
+            self._entries[key] = failed
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._stats["added"] += 1
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO rejections (design, key, failed, created) VALUES (?, ?, ?, ?)",
+                    (self.design or "", key, json.dumps(failed), time.time()))
+                self._conn.commit()
+                self._writes += 1
+                if self._writes % PRUNE_INTERVAL == 0:
+                    self._prune()
+
+    def _prune(self):
+        """Keep the newest max_entries rows of this design (lock held)"""
+        self._conn.execute(
+            "DELETE FROM rejections WHERE design = ? AND key NOT IN ("
+            "SELECT key FROM rejections WHERE design = ? ORDER BY created DESC LIMIT ?)",
+            (self.design or "", self.design or "", self.max_entries))
+        self._conn.commit()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        stats["hit_rate"] = stats["hits"] / \
+            stats["lookups"] if stats["lookups"] else 0.0
+        return stats
+
+
+MAX_TRACKED_DESIGNS = 100
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_rejection_cache(experiment_design, properties, scope="run", path=None,
+                        max_entries=DEFAULT_MAX_ENTRIES):
+    """
+    Rejection cache for a run validating properties for experiment_design: a new one in
+    "run" scope, the process-wide one of the design (persisted at path, if given) in
+    "design" scope
+    """
+    if scope not in SCOPES:
+        raise ValueError(
+            f"Unknown rejection cache scope: {scope} (expected one of {', '.join(SCOPES)})")
+    if scope == "run":
+        return RejectionCache(max_entries)
+    design = design_key(experiment_design, properties)
+    with _caches_lock:
+        cache = _caches.get((design, path))
+        if cache is None:
+            cache = _caches[(design, path)] = RejectionCache(
+                max_entries, path=path, design=design)
+            # keep the most recently started designs only
+            for stale in list(_caches)[:-MAX_TRACKED_DESIGNS]:
+                del _caches[stale]
+        return cache
@@ -0,0 +1,269 @@
+"""
+Content-addressed response cache for model completions
+
+Responses are keyed on model, prompt, schema and params and stored in SQLite, with
+TTL expiry and least-recently-used eviction by entry count and total size. Concurrent
+identical requests are coalesced so only one of them reaches the model, both across
+threads (get_or_compute) and across tasks of an event loop (get_or_compute_async).
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "stimulus_generator", "responses.sqlite3")
+DEFAULT_MAX_ENTRIES = 50000
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+
+# run eviction every N writes rather than on every write
+EVICTION_INTERVAL = 100
+
+
+def make_cache_key(model, prompt, properties, params):
+    """Hash of everything that determines the response"""
+    payload = json.dumps({
+        "model": model,
+        "prompt": prompt,
+        "properties": properties,
+        "params": params or {}
+    }, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _InFlight:
+    """A request currently being computed; identical requests wait on it"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+
+
+class ResponseCache:
+    """SQLite-backed response cache with TTL/LRU eviction and in-flight coalescing"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES,
+                 max_bytes=DEFAULT_MAX_BYTES, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        # (event loop id, key) -> future of the request being computed on that loop
+        self._in_flight_async = {}
+        self._writes = 0
+        # key -> time of the last hit, written to SQLite with the next write
+        self._touched = {}
+        self._stats = {"hits": 0, "misses": 0,
+                       "coalesced": 0, "evictions": 0}
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created REAL NOT NULL, last_access REAL NOT NULL)")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        self._conn.commit()
+
+    def get(self, key):
+        """Return the cached response for key, or None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                self._touched.pop(key, None)
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._touched[key] = now
+        return json.loads(row[0])
+
+    def put(self, key, value):
+        data = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._touched.pop(key, None)
+            self._flush_touched()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created, last_access) "
+                "VALUES (?, ?, ?, ?, ?)", (key, data, len(data), now, now))
+            self._conn.commit()
+            self._writes += 1
+            if self._writes % EVICTION_INTERVAL == 0:
+                self._evict()
+
+    def _flush_touched(self):
+        """Write the last_access of the entries hit since the last write (lock held, no commit)"""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE responses SET last_access = ? WHERE key = ?",
+                [(accessed, key) for key, accessed in self._touched.items()])
+            self._touched.clear()
+
+    def _evict(self):
+        """Drop expired entries, then least recently used ones until within limits (lock held)"""
+        evicted = 0
+        self._flush_touched()
+        if self.ttl_seconds:
+            evicted += self._conn.execute(
+                "DELETE FROM responses WHERE created < ?", (time.time() - self.ttl_seconds,)).rowcount
+
+        count, total_size = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if count > self.max_entries or total_size > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY last_access ASC").fetchall()
+            doomed = []
+            for key, size in rows:
+                if count <= self.max_entries and total_size <= self.max_bytes:
+                    break
+                doomed.append((key,))
+                count -= 1
+                total_size -= size
+            self._conn.executemany(
+                "DELETE FROM responses WHERE key = ?", doomed)
+            evicted += len(doomed)
+
+        self._conn.commit()
+        self._stats["evictions"] += evicted
+
+    def get_or_compute(self, key, compute):
+        """
+        Return the cached response for key, or call compute() once and cache its result.
+        Concurrent callers with the same key wait for the first one instead of calling compute().
+        Error responses ({"error": ...}) are returned but never cached.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            with self._lock:
+                self._stats["hits"] += 1
+            return cached
+
+        with self._lock:
+            in_flight = self._in_flight.get(key)
+            owner = in_flight is None
+            if owner:
+                in_flight = _InFlight()
+                self._in_flight[key] = in_flight
+                self._stats["misses"] += 1
+            else:
+                self._stats["coalesced"] += 1
+
+        if not owner:
+            in_flight.event.wait()
+            if in_flight.result is not None:
+                return in_flight.result
+            # the owner failed, make our own request
+            return compute()
+
+        try:
+            result = compute()
+            if isinstance(result, dict) and "error" not in result:
+                self.put(key, result)
+            in_flight.result = result
+            return result
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            in_flight.event.set()
+
+    async def get_or_compute_async(self, key, compute):
+        """
+        get_or_compute for coroutine functions: concurrent callers with the same key on
+        the same event loop await the first one's request.
+        """
+        loop = asyncio.get_running_loop()
+        # SQLite I/O runs on the loop's executor, never on the loop itself
+        cached = await loop.run_in_executor(None, self.get, key)
+        if cached is not None:
+            with self._lock:
+                self._stats["hits"] += 1
+            return cached
+
+        async_key = (id(loop), key)
+        with self._lock:
+            in_flight = self._in_flight_async.get(async_key)
+            owner = in_flight is None
+            if owner:
+                in_flight = self._in_flight_async[async_key] = loop.create_future()
+                self._stats["misses"] += 1
+            else:
+                self._stats["coalesced"] += 1
+
+        if not owner:
+            result = await asyncio.shield(in_flight)
+            if result is not None:
+                return result
+            # the owner failed, make our own request
+            return await compute()
+
+        result = None
+        try:
+            result = await compute()
+            if isinstance(result, dict) and "error" not in result:
+                await loop.run_in_executor(None, self.put, key, result)
+            return result
+        finally:
+            with self._lock:
+                self._in_flight_async.pop(async_key, None)
+            in_flight.set_result(
+                result if isinstance(result, dict) and "error" not in result else None)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            count, total_size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+        stats["entries"] = count
+        stats["size_bytes"] = total_size
+        stats["hit_rate"] = (stats["hits"] + stats["coalesced"]) / \
+            lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._touched.clear()
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_response_cache(path=None, **options):
+    """Get the process-wide cache for path and options (created on first use)"""
+    path = path or os.environ.get(
+        "STIMULUS_RESPONSE_CACHE", DEFAULT_CACHE_PATH)
+    cache_id = (path, tuple(sorted(options.items())))
+    with _caches_lock:
+        cache = _caches.get(cache_id)
+        if cache is None:
+            cache = ResponseCache(path, **options)
+            _caches[cache_id] = cache
+        return cache
+
+
+def get_all_cache_stats():
+    with _caches_lock:
+        caches = dict(_caches)
+    stats = {}
+    for (path, options), cache in caches.items():
+        if options:
+            path += " (" + ", ".join(f"{name}={value}" for name, value in options) + ")"
+        stats[path] = cache.get_stats()
+    return stats
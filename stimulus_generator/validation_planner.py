@@ -0,0 +1,172 @@
+"""
+Per-criterion validation statistics, criteria ordering and grouping
+
+Pass/fail counts and latency are recorded for every validation criterion, and kept
+per experiment design for the lifetime of the process, so later runs of the same
+design start from what earlier runs measured.
+
+The planner uses them in two ways. With early rejection, checking the criteria
+that are cheap and likely to fail first minimizes the expected cost of a rejected
+candidate (ascending cost / failure rate). When grouping, a criterion that often
+fails is checked alone, so a failing candidate is rejected without paying for the
+others, while criteria that almost always pass are bundled, because each extra
+request repeats the experiment design and the stimulus.
+"""
+
+import hashlib
+import json
+import threading
+
+# criteria failing at least this often (smoothed) get a request of their own
+SOLO_FAILURE_RATE = 0.2
+# largest group chosen automatically
+MAX_AUTO_GROUP_SIZE = 4
+# Beta prior on the failure rate: unmeasured criteria start at 50% and are checked alone
+PRIOR_FAILURES = 1.0
+PRIOR_PASSES = 1.0
+
+
+class CriterionStats:
+    def __init__(self):
+        self.checks = 0
+        self.failures = 0
+        self.latency_total = 0.0
+        self.latency_samples = 0
+
+    def failure_rate(self):
+        return (self.failures + PRIOR_FAILURES) / (self.checks + PRIOR_FAILURES + PRIOR_PASSES)
+
+    def mean_latency(self):
+        return self.latency_total / self.latency_samples if self.latency_samples else None
+
+
+class CriteriaStats:
+    """Thread-safe pass/fail and latency statistics per criterion"""
+
+    def __init__(self):
+        self._criteria = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, passed, latency=None):
+        """latency is only given for requests that checked this criterion alone"""
+        with self._lock:
+            stats = self._criteria.setdefault(name, CriterionStats())
+            stats.checks += 1
+            if not passed:
+                stats.failures += 1
+            if latency is not None:
+                stats.latency_total += latency
+                stats.latency_samples += 1
+
+    def failure_rate(self, name):
+        with self._lock:
+            return self._criteria.get(name, CriterionStats()).failure_rate()
+
+    def expected_costs(self, criteria):
+        """Mean latency per criterion; unmeasured ones get the mean of the measured ones (or 1)"""
+        with self._lock:
+            latencies = {name: self._criteria[name].mean_latency() if name in self._criteria else None
+                         for name in criteria}
+        measured = [latency for latency in latencies.values() if latency is not None]
+        default = sum(measured) / len(measured) if measured else 1.0
+        return {name: latency if latency is not None else default for name, latency in latencies.items()}
+
+    def get_stats(self):
+        with self._lock:
+            return {name: {
+                "checks": stats.checks,
+                "failures": stats.failures,
+                "failure_rate": round(stats.failure_rate(), 3),
+                "mean_latency_seconds": round(stats.mean_latency(), 3) if stats.latency_samples else None,
+            } for name, stats in self._criteria.items()}
+
+
+class ValidationPlanner:
+    """Chooses the checking order and grouping of criteria for one run"""
+
+    def __init__(self, stats=None, adaptive_order=False):
+        self.stats = stats or CriteriaStats()
+        self.adaptive_order = adaptive_order
+        self._last_order = None
+        self._lock = threading.Lock()
+        self._rejected = 0
+        self._calls_on_rejected = 0
+
+    def record(self, name, passed, latency=None):
+        self.stats.record(name, passed, latency)
+
+    def record_rejection(self, calls):
+        """A candidate was rejected after calls validation requests (this run only)"""
+        with self._lock:
+            self._rejected += 1
+            self._calls_on_rejected += calls
+
+    def calls_per_rejection(self):
+        with self._lock:
+            return self._calls_on_rejected / self._rejected if self._rejected else None
+
+    def order(self, criteria):
+        """
+        Checking order: as given, or with adaptive_order the ascending expected cost per
+        rejection (mean latency / failure rate). Ties keep the given order, so nothing
+        moves until there are measurements.
+        """
+        criteria = list(criteria)
+        if not self.adaptive_order:
+            return criteria
+        costs = self.stats.expected_costs(criteria)
+        return sorted(criteria, key=lambda name: costs[name] / self.stats.failure_rate(name))
+
+    def note_order(self, order):
+        """True if order differs from the previously noted one (i.e. it is worth logging)"""
+        with self._lock:
+            changed = order != self._last_order
+            self._last_order = list(order)
+            return changed
+
+    def describe_order(self, order):
+        costs = self.stats.expected_costs(order)
+        return ", ".join(f"{name} (fails {self.stats.failure_rate(name):.0%}, {costs[name]:.2f}s)"
+                         for name in order)
+
+    def plan_groups(self, criteria, group_size="auto"):
+        """
+        Partition the criteria names into groups validated with one request each, in
+        checking order. A fixed group_size chunks them in checking order. "auto" puts
+        the criteria that fail often first, each alone, followed by the rest in groups
+        of up to MAX_AUTO_GROUP_SIZE.
+        """
+        criteria = self.order(criteria)
+        if group_size != "auto":
+            size = max(1, int(group_size))
+            return [criteria[start:start + size] for start in range(0, len(criteria), size)]
+
+        rates = {name: self.stats.failure_rate(name) for name in criteria}
+        solo = [name for name in criteria if rates[name] >= SOLO_FAILURE_RATE]
+        if not self.adaptive_order:
+            solo.sort(key=lambda name: -rates[name])
+        shared = [name for name in criteria if rates[name] < SOLO_FAILURE_RATE]
+        return [[name] for name in solo] + [shared[start:start + MAX_AUTO_GROUP_SIZE]
+                                            for start in range(0, len(shared), MAX_AUTO_GROUP_SIZE)]
+
+    def get_stats(self):
+        return self.stats.get_stats()
+
+
+MAX_TRACKED_DESIGNS = 100
+_criteria_stats = {}
+_criteria_stats_lock = threading.Lock()
+
+
+def get_criteria_stats(experiment_design, properties):
+    """Process-wide statistics for the criteria of one experiment design"""
+    key = hashlib.sha256(json.dumps([experiment_design, properties], sort_keys=True,
+                                    default=str).encode("utf-8")).hexdigest()
+    with _criteria_stats_lock:
+        stats = _criteria_stats.get(key)
+        if stats is None:
+            stats = _criteria_stats[key] = CriteriaStats()
+            # keep the most recently started designs only
+            for stale in list(_criteria_stats)[:-MAX_TRACKED_DESIGNS]:
+                del _criteria_stats[stale]
+        return stats
@@ -0,0 +1,147 @@
+"""
+Attempt budgets and yield tracking for the regeneration loop
+
+Every candidate the generator proposes is an attempt that ends as accepted, repeated,
+failed validation or failed with an error. The tracker keeps the running acceptance
+rate (with a uniform prior, so the first few outcomes do not swing it) and enforces
+three budgets:
+
+    max_iteration_attempts     attempts spent on one stimulus (since the last acceptance)
+    max_run_attempts           attempts spent on the whole run
+    max_attempts_per_stimulus  projected attempts per accepted stimulus (1 / acceptance
+                               rate), checked once min_attempts attempts were made
+
+When a budget is exceeded, the policy decides what happens next: "abort" ends the run
+with an error, "partial" ends it with the stimuli accepted so far, and "relax" stops
+enforcing the validation criterion that failed most often and starts the budgets of
+the current stimulus and the projection afresh. Without a criterion left to relax (or
+with the run budget spent) "relax" ends the run like "partial".
+"""
+
+import threading
+from collections import Counter
+
+OUTCOMES = ("accepted", "repetition", "validation_fail", "error")
+POLICIES = ("abort", "partial", "relax")
+DEFAULT_MAX_ITERATION_ATTEMPTS = 100
+DEFAULT_MIN_ATTEMPTS = 20
+# attempts between streamed yield updates (every acceptance is reported as well)
+REPORT_INTERVAL = 10
+
+
+class RetryBudgetExceeded(Exception):
+    """A retry budget was exceeded under the "abort" policy"""
+
+
+class YieldTracker:
+    """Thread-safe attempt outcomes and budgets; slot identifies the stimulus being worked on"""
+
+    def __init__(self, policy="partial", max_iteration_attempts=DEFAULT_MAX_ITERATION_ATTEMPTS,
+                 max_run_attempts=None, max_attempts_per_stimulus=None,
+                 min_attempts=DEFAULT_MIN_ATTEMPTS):
+        if policy not in POLICIES:
+            raise ValueError(
+                f"Unknown retry policy: {policy} (expected one of {', '.join(POLICIES)})")
+        self.policy = policy
+        self.max_iteration_attempts = max_iteration_attempts
+        self.max_run_attempts = max_run_attempts
+        self.max_attempts_per_stimulus = max_attempts_per_stimulus
+        self.min_attempts = min_attempts
+        self.counts = {outcome: 0 for outcome in OUTCOMES}
+        self.criterion_failures = Counter()
+        self.relaxed = []
+        # set once a budget ended the run ("abort" or "partial")
+        self.exhausted = False
+        self._slot_attempts = Counter()
+        # attempts and acceptances since the start of the run or the last relaxation
+        self._window = {"attempts": 0, "accepted": 0}
+        self._lock = threading.Lock()
+
+    @property
+    def attempts(self):
+        return sum(self.counts.values())
+
+    def acceptance_rate(self):
+        with self._lock:
+            return (self.counts["accepted"] + 1) / (self.attempts + 2)
+
+    def enforced(self, failed_criteria):
+        """The failed criteria that still reject a candidate (relaxed ones do not)"""
+        with self._lock:
+            return [name for name in failed_criteria if name not in self.relaxed]
+
+    def record(self, outcome, failed_criteria=(), slot=0):
+        """
+        Record the outcome of one attempt. Returns (action, reason): (None, None) within
+        budget, else the policy's action ("abort", "partial" or "relax") and which budget
+        was exceeded. Actions ending the run also set exhausted; once it is set, attempts
+        still in flight get ("partial", None), so the end of the run is reported once.
+        """
+        with self._lock:
+            if self.exhausted:
+                self.counts[outcome] += 1
+                return ("partial", None) if outcome != "accepted" else (None, None)
+            action, reason = self._record(outcome, failed_criteria, slot)
+            if action in ("abort", "partial"):
+                self.exhausted = True
+            return action, reason
+
+    def _record(self, outcome, failed_criteria, slot):
+        """record() with the lock held"""
+        self.counts[outcome] += 1
+        self.criterion_failures.update(failed_criteria)
+        self._window["attempts"] += 1
+        if outcome == "accepted":
+            self._window["accepted"] += 1
+            self._slot_attempts.pop(slot, None)
+            return None, None
+        self._slot_attempts[slot] += 1
+
+        if self.max_run_attempts and self.attempts >= self.max_run_attempts:
+            return ("abort" if self.policy == "abort" else "partial"), \
+                f"{self.attempts} attempts used up the run budget of {self.max_run_attempts}"
+        reason = None
+        if self.max_iteration_attempts and self._slot_attempts[slot] >= self.max_iteration_attempts:
+            reason = f"{self._slot_attempts[slot]} attempts without an accepted stimulus (budget {self.max_iteration_attempts})"
+        elif self.max_attempts_per_stimulus and self._window["attempts"] >= self.min_attempts:
+            projected = (self._window["attempts"] + 2) / \
+                (self._window["accepted"] + 1)
+            if projected > self.max_attempts_per_stimulus:
+                reason = f"~{projected:.1f} projected attempts per accepted stimulus (budget {self.max_attempts_per_stimulus})"
+        if reason is None:
+            return None, None
+        if self.policy != "relax":
+            return self.policy, reason
+
+        candidates = [(failures, name) for name, failures in self.criterion_failures.items()
+                      if name not in self.relaxed]
+        if not candidates:
+            return "partial", reason + ", no criterion left to relax"
+        relaxed = max(candidates)[1]
+        self.relaxed.append(relaxed)
+        self._slot_attempts[slot] = 0
+        self._window = {"attempts": 0, "accepted": 0}
+        return "relax", f"{reason}, no longer enforcing {relaxed}"
+
+    def describe(self):
+        with self._lock:
+            counts = dict(self.counts)
+            relaxed = list(self.relaxed)
+        attempts = sum(counts.values())
+        rate = (counts["accepted"] + 1) / (attempts + 2)
+        description = (f"Yield: {counts['accepted']} accepted of {attempts} attempts "
+                       f"({counts['repetition']} repeated, {counts['validation_fail']} failed validation, "
+                       f"{counts['error']} errors), acceptance rate ~{rate:.0%}, "
+                       f"~{1 / rate:.1f} attempts per stimulus")
+        if relaxed:
+            description += f", relaxed: {', '.join(relaxed)}"
+        return description
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.counts)
+            stats["relaxed"] = list(self.relaxed)
+        stats["attempts"] = sum(stats[outcome] for outcome in OUTCOMES)
+        stats["acceptance_rate"] = (stats["accepted"] + 1) / \
+            (stats["attempts"] + 2)
+        return stats
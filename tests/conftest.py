@@ -0,0 +1,112 @@
+import threading
+import time
+from multiprocessing import Value
+
+import pytest
+
+from stimulus_generator.backend import ModelClient
+from stimulus_generator.mock_server import MockServerProfile, start_mock_server_in_thread
+
+AGENT_1_PROPERTIES = {
+    "word_pair": {"type": "string"},
+    "supportive_context": {"type": "string"},
+    "neutral_context": {"type": "string"},
+}
+AGENT_2_PROPERTIES = {
+    "word_pair_valid": {"type": "boolean", "description": "The word pair differs only in length."},
+    "contexts_valid": {"type": "boolean", "description": "The supportive context predicts the word."},
+    "grammatical": {"type": "boolean", "description": "Both contexts are grammatical."},
+}
+AGENT_3_PROPERTIES = {
+    "predictability": {"type": "integer", "description": "How predictable the word is.",
+                       "minimum": 0, "maximum": 10},
+    "naturalness": {"type": "integer", "description": "How natural the contexts are.",
+                    "minimum": 0, "maximum": 10},
+}
+
+
+@pytest.fixture
+def mock_server(request):
+    """(server, api_url) of a mock model server; profile options via @pytest.mark.mock_profile"""
+    marker = request.node.get_closest_marker("mock_profile")
+    options = {"latency_mean": 0.005, "seed": 0, "boolean_true_rate": 1.0}
+    if marker:
+        options.update(marker.kwargs)
+    server, api_url, shutdown = start_mock_server_in_thread(
+        profile=MockServerProfile(**options))
+    yield server, api_url
+    shutdown()
+
+
+@pytest.fixture
+def make_settings(mock_server):
+    """generate_stimuli settings against the mock server, updated with the given options"""
+    _, api_url = mock_server
+
+    def make(iterations=3, **options):
+        settings = {
+            'agent_1_properties': AGENT_1_PROPERTIES,
+            'agent_2_properties': AGENT_2_PROPERTIES,
+            'agent_3_properties': AGENT_3_PROPERTIES,
+            'api_key': 'mock-key',
+            'model_choice': 'custom',
+            'apiUrl': api_url,
+            'modelName': 'mock-model',
+            'experiment_design': "Each item contains a word pair and two contexts.",
+            'previous_stimuli': [{
+                "word_pair": "math/mathematics",
+                "supportive_context": "The student solved the simple arithmetic problem using basic...",
+                "neutral_context": "The student was working on a problem that required..."
+            }],
+            'iteration': iterations,
+            'stop_event': threading.Event(),
+            'current_iteration': Value('i', 0),
+            'total_iterations': Value('i', 1),
+            'session_id': 'test',
+            'websocket_callback': None,
+            'ablation': {"use_agent_2": True, "use_agent_3": True},
+            'response_cache': False,
+        }
+        settings.update(options)
+        return settings
+
+    return make
+
+
+class FakeModelClient(ModelClient):
+    """In-process model client: respond(prompt, properties) gives the parsed response"""
+
+    def __init__(self, respond, delay=0.0):
+        self.respond = respond
+        self.delay = delay
+        self.prompts = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def generate_completion(self, prompt, properties, params=None):
+        with self._lock:
+            self.prompts.append(prompt)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.delay:
+                time.sleep(self.delay)
+            return self.respond(prompt, properties)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def get_default_params(self):
+        return {}
+
+
+@pytest.fixture
+def fake_client():
+    """Factory of FakeModelClient(respond, delay)"""
+    return FakeModelClient
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "mock_profile(**options): MockServerProfile options for the mock_server fixture")
@@ -0,0 +1,39 @@
+import threading
+
+from stimulus_generator.async_backend import run_async_generation
+
+
+def test_accepts_the_requested_number_of_stimuli(make_settings):
+    df, filename = run_async_generation(make_settings(iterations=5, async_concurrency=3))
+    assert len(df) == 5
+    assert list(df["stimulus_id"]) == [1, 2, 3, 4, 5]
+    assert {"predictability", "naturalness"} <= set(df.columns)
+    assert filename.endswith(".csv")
+
+
+def test_callbacks_run_off_the_event_loop(make_settings):
+    threads = []
+    messages = []
+
+    def websocket_callback(message_type, message):
+        threads.append(threading.current_thread().name)
+        messages.append(message)
+
+    df, _ = run_async_generation(make_settings(
+        iterations=2, websocket_callback=websocket_callback,
+        session_update_callback=lambda: threads.append(threading.current_thread().name)))
+    assert len(df) == 2
+    assert threads
+    assert "async-generation-engine" not in threads
+    # delivered in order, the completion message last
+    assert messages[-1].startswith("Data generation completed")
+
+
+def test_unsupported_settings_are_reported(make_settings):
+    messages = []
+    df, _ = run_async_generation(make_settings(
+        iterations=1, agent_3_batch_scoring=True, agent_1_candidates_per_call=3,
+        agent_2_criteria_group_size=1,
+        websocket_callback=lambda message_type, message: messages.append(message)))
+    assert len(df) == 1
+    assert "Not supported by the async engine, ignoring: agent_1_candidates_per_call, agent_3_batch_scoring" in messages
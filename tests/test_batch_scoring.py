@@ -0,0 +1,92 @@
+import threading
+import time
+
+from stimulus_generator.backend import agent_3_score_stimuli_batch, generate_stimuli
+from stimulus_generator.batching import BatchCollector
+
+ASPECTS = {"clarity": {"type": "integer", "description": "Clarity", "minimum": 0, "maximum": 10},
+           "length": {"type": "integer", "description": "Length", "minimum": 1, "maximum": 5}}
+STIMULI = {1: {"word": "a"}, 2: {"word": "b"}, 3: {"word": "c"}}
+
+
+def test_one_request_scores_every_stimulus(fake_client):
+    def respond(prompt, properties):
+        return {"scores": [{"stimulus_id": 3, "clarity": 7, "length": 9},
+                           {"stimulus_id": 1, "clarity": 2, "length": 3},
+                           {"stimulus_id": 2, "clarity": -1, "length": 4}]}
+
+    client = fake_client(respond)
+    scored = agent_3_score_stimuli_batch(client, STIMULI, "design", ASPECTS)
+    # matched by stimulus_id and clamped to each aspect's range
+    assert scored == {1: {"clarity": 2, "length": 3}, 2: {"clarity": 0, "length": 4},
+                      3: {"clarity": 7, "length": 5}}
+    assert len(client.prompts) == 1
+    assert "- stimulus_id 2: {'word': 'b'}" in client.prompts[0]
+
+
+def test_unusable_ids_fall_back_to_prompt_order(fake_client):
+    def respond(prompt, properties):
+        return {"scores": [{"stimulus_id": 9, "clarity": 1, "length": 1},
+                           {"stimulus_id": 9, "clarity": 2, "length": 2},
+                           {"stimulus_id": 9, "clarity": 3, "length": 3}]}
+
+    scored = agent_3_score_stimuli_batch(fake_client(respond), STIMULI, "design", ASPECTS)
+    assert [scores["clarity"] for scores in scored.values()] == [1, 2, 3]
+
+
+def test_missing_scores_are_scored_one_by_one(fake_client):
+    def respond(prompt, properties):
+        if "scores" in properties:
+            return {"scores": [{"stimulus_id": 1, "clarity": 5, "length": 2},
+                               {"stimulus_id": 2, "clarity": "high", "length": 2}]}
+        return {"clarity": 8, "length": 1}
+
+    client = fake_client(respond)
+    scored = agent_3_score_stimuli_batch(client, STIMULI, "design", ASPECTS)
+    assert scored == {1: {"clarity": 5, "length": 2}, 2: {"clarity": 8, "length": 1},
+                      3: {"clarity": 8, "length": 1}}
+    assert len(client.prompts) == 3
+
+
+def test_collector_flushes_full_batches_at_once():
+    batches = []
+    results = {}
+    collector = BatchCollector(lambda items: batches.append(sorted(items)) or
+                               {key: item * 2 for key, item in items.items()},
+                               results.__setitem__, batch_size=2, flush_interval=10)
+    for key in range(4):
+        collector.submit(key, key)
+    assert collector.flush(timeout=5)
+    assert batches == [[0, 1], [2, 3]]
+    assert results == {0: 0, 1: 2, 2: 4, 3: 6}
+
+
+def test_collector_flushes_partial_batches_after_the_interval():
+    done = threading.Event()
+    collector = BatchCollector(lambda items: {key: True for key in items},
+                               lambda key, result: done.set(), batch_size=5, flush_interval=0.1)
+    start = time.perf_counter()
+    collector.submit("a", 1)
+    assert done.wait(2)
+    assert time.perf_counter() - start >= 0.1
+
+
+def test_collector_failures_get_the_default_result():
+    def fail(items):
+        raise ValueError("boom")
+
+    results = {}
+    collector = BatchCollector(fail, results.__setitem__, batch_size=2,
+                               default_result=lambda item: {"score": 0})
+    collector.submit("a", 1)
+    collector.submit("b", 2)
+    assert collector.flush(timeout=5)
+    assert results == {"a": {"score": 0}, "b": {"score": 0}}
+    assert collector.get_stats()["errors"] == 1
+
+
+def test_generation_with_batch_scoring(make_settings):
+    df, _ = generate_stimuli(make_settings(iterations=4, agent_3_batch_scoring=True))
+    assert len(df) == 4
+    assert df["predictability"].between(0, 10).all()
+    assert df["naturalness"].between(0, 10).all()
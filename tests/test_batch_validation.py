@@ -0,0 +1,66 @@
+from stimulus_generator.backend import agent_2_validate_stimuli_batch, generate_stimuli
+
+CRITERIA = {"word_valid": "The word is valid.", "context_valid": "The context is valid."}
+STIMULI = [{"word": "a"}, {"word": "b"}, {"word": "c"}]
+
+
+def test_one_request_validates_every_stimulus(fake_client):
+    def respond(prompt, properties):
+        assert properties["results"]["minItems"] == 3
+        return {"results": [{"word_valid": True, "context_valid": True},
+                            {"word_valid": False, "context_valid": True},
+                            {"word_valid": True, "context_valid": False}]}
+
+    client = fake_client(respond)
+    messages = []
+    results = agent_2_validate_stimuli_batch(
+        client, STIMULI, "design", CRITERIA,
+        websocket_callback=lambda message_type, message: messages.append(message))
+    assert results == [{"word_valid": True, "context_valid": True},
+                       {"word_valid": False, "context_valid": True},
+                       {"word_valid": True, "context_valid": False}]
+    assert len(client.prompts) == 1
+    assert "1. {'word': 'a'}" in client.prompts[0]
+    assert "Validated 3/3 candidates in one request" in messages
+
+
+def test_malformed_verdicts_are_validated_one_by_one(fake_client):
+    def respond(prompt, properties):
+        if "results" in properties:
+            return {"results": [{"word_valid": True, "context_valid": True},
+                                {"word_valid": "yes", "context_valid": True},
+                                {"word_valid": True}]}
+        return {"word_valid": False, "context_valid": False}
+
+    client = fake_client(respond)
+    results = agent_2_validate_stimuli_batch(client, STIMULI, "design", CRITERIA)
+    assert results[0] == {"word_valid": True, "context_valid": True}
+    assert results[1] == results[2] == {"word_valid": False, "context_valid": False}
+    assert len(client.prompts) == 3
+
+
+def test_wrong_number_of_verdicts_falls_back_for_all(fake_client):
+    def respond(prompt, properties):
+        if "results" in properties:
+            return {"results": [{"word_valid": True, "context_valid": True}]}
+        return {"word_valid": True, "context_valid": True}
+
+    client = fake_client(respond)
+    assert agent_2_validate_stimuli_batch(client, STIMULI, "design", CRITERIA) == \
+        [{"word_valid": True, "context_valid": True}] * 3
+    assert len(client.prompts) == 4
+
+
+def test_errors_fall_back_to_single_validation(fake_client):
+    def respond(prompt, properties):
+        return {"error": "down"}
+
+    results = agent_2_validate_stimuli_batch(fake_client(respond), STIMULI[:1], "design", CRITERIA)
+    assert results == [{"error": "Failed to validate stimulus: down"}]
+
+
+def test_generation_with_batch_validation(make_settings):
+    df, _ = generate_stimuli(make_settings(
+        iterations=4, agent_1_candidates_per_call=3, agent_2_batch_validation=True))
+    assert len(df) == 4
+    assert len({str(content) for content in df["stimulus_content"]}) == 4
@@ -0,0 +1,83 @@
+from stimulus_generator.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+def open_breaker(**options):
+    breaker = CircuitBreaker("test", failure_threshold=3, **options)
+    for _ in range(3):
+        breaker.record("timeout")
+    return breaker
+
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=60)
+    breaker.record("timeout")
+    breaker.record("server_error")
+    assert breaker.state == CLOSED
+    assert "3 consecutive failures" in breaker.record("connection_error")
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+
+
+def test_success_resets_consecutive_failures():
+    breaker = CircuitBreaker("test", failure_threshold=3, min_calls=100)
+    for outcome in ("timeout", "timeout", "success", "timeout", "timeout"):
+        breaker.record(outcome)
+    assert breaker.state == CLOSED
+
+
+def test_rate_limits_and_client_errors_are_not_failures():
+    breaker = CircuitBreaker("test", failure_threshold=2)
+    for outcome in ("rate_limited", "error", "rate_limited", "error"):
+        breaker.record(outcome)
+    assert breaker.state == CLOSED
+
+
+def test_opens_on_failure_rate():
+    breaker = CircuitBreaker("test", failure_threshold=100, failure_rate=0.5, min_calls=4)
+    for outcome in ("success", "timeout", "success", "timeout"):
+        breaker.record(outcome)
+    assert breaker.state == OPEN
+
+
+def test_half_open_allows_a_single_probe():
+    breaker = open_breaker(reset_timeout=0)
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow_request()
+
+
+def test_successful_probe_closes_the_circuit():
+    breaker = open_breaker(reset_timeout=0)
+    breaker.allow_request()
+    assert "probe succeeded" in breaker.record("success")
+    assert breaker.state == CLOSED
+    assert breaker.allow_request()
+
+
+def test_failed_probe_reopens_with_longer_timeout():
+    breaker = open_breaker(reset_timeout=10, max_reset_timeout=15)
+    breaker.opened_at -= 10
+    assert breaker.allow_request()
+    assert "probe failed" in breaker.record("timeout")
+    assert breaker.state == OPEN
+    assert breaker.reset_timeout == 15
+    assert not breaker.allow_request()
+
+
+def test_cancelled_probe_keeps_the_circuit_half_open():
+    breaker = open_breaker(reset_timeout=0)
+    assert breaker.allow_request()
+    assert breaker.record("cancelled") is None
+    assert breaker.state == HALF_OPEN
+    # the probe slot is free again
+    assert breaker.allow_request()
+
+
+def test_cancelled_requests_are_not_counted():
+    breaker = CircuitBreaker("test", failure_threshold=2)
+    breaker.record("timeout")
+    breaker.record("cancelled")
+    stats = breaker.get_stats()
+    assert stats["failures"] == 1
+    assert stats["successes"] == 0
+    assert breaker.consecutive_failures == 1
@@ -0,0 +1,96 @@
+import asyncio
+import threading
+import time
+
+from stimulus_generator.concurrency import AIMDConcurrencyController
+
+
+def saturate(controller):
+    while controller.in_flight < controller.current_limit:
+        assert controller.acquire()
+
+
+def run_saturated(controller, responses, outcome="success", latency=0.01):
+    """Keep every slot busy, replacing each response with a new request"""
+    saturate(controller)
+    for _ in range(responses):
+        controller.release(outcome, latency)
+        saturate(controller)
+
+
+def test_healthy_saturated_responses_grow_the_limit_by_about_one_per_round_trip():
+    controller = AIMDConcurrencyController("test", initial=4, maximum=10)
+    # a round trip at limit n is n responses, each adding 1 / limit
+    run_saturated(controller, 4 + 5 + 6)
+    assert 6 <= controller.current_limit <= 7
+    assert controller.history[-1]["reason"] == "healthy"
+
+
+def test_limit_only_grows_when_it_is_the_bottleneck():
+    controller = AIMDConcurrencyController("test", initial=4)
+    for _ in range(20):
+        controller.acquire()
+        controller.release("success", 0.01)
+    assert controller.current_limit == 4
+
+
+def test_limit_stays_within_bounds():
+    controller = AIMDConcurrencyController("test", initial=2, minimum=2, maximum=3,
+                                           cooldown_seconds=0)
+    run_saturated(controller, 50)
+    assert controller.current_limit == 3
+    for _ in range(3):
+        controller.release("rate_limited")
+    assert controller.current_limit == 2
+
+
+def test_overload_halves_the_limit_once_per_cooldown():
+    controller = AIMDConcurrencyController("test", initial=16, cooldown_seconds=10)
+    saturate(controller)
+    message = controller.release("rate_limited")
+    assert message == "Concurrency limit for test: 16 -> 8 (rate_limited)"
+    # the rest of the burst does not cut it again
+    assert controller.release("timeout") is None
+    assert controller.release("server_error") is None
+    assert controller.current_limit == 8
+
+
+def test_plain_errors_do_not_change_the_limit():
+    controller = AIMDConcurrencyController("test", initial=4, cooldown_seconds=0)
+    saturate(controller)
+    for _ in range(4):
+        controller.release("error")
+    assert controller.current_limit == 4
+
+
+def test_latency_above_the_baseline_decreases_the_limit():
+    controller = AIMDConcurrencyController("test", initial=8, cooldown_seconds=0)
+    for _ in range(20):
+        controller.acquire()
+        controller.release("success", 0.01)
+    for _ in range(5):
+        controller.acquire()
+        message = controller.release("success", 1.0)
+        if message:
+            break
+    assert "p95 latency" in message
+    assert controller.current_limit == 4
+
+
+def test_acquire_waits_for_a_free_slot():
+    controller = AIMDConcurrencyController("test", initial=1)
+    assert controller.acquire()
+    threading.Timer(0.2, controller.release, args=("success", 0.01)).start()
+    start = time.perf_counter()
+    assert controller.acquire()
+    assert time.perf_counter() - start >= 0.15
+
+
+def test_acquire_returns_false_when_stopped():
+    controller = AIMDConcurrencyController("test", initial=1)
+    controller.acquire()
+    stop_event = threading.Event()
+    stop_event.set()
+    assert controller.acquire(stop_event) is False
+    assert asyncio.run(controller.acquire_async(stop_event)) is False
+    assert controller.in_flight == 1
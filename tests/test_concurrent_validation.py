@@ -0,0 +1,58 @@
+import time
+
+from stimulus_generator.backend import agent_2_validate_stimulus_individual
+
+CRITERIA = {name: f"{name} holds." for name in ("fast_fail", "slow_a", "slow_b")}
+
+
+def verdicts(**overrides):
+    """respond() that passes every criterion after 0.5s except the overridden ones (answered at once)"""
+    def respond(prompt, properties):
+        name = next(iter(properties))
+        if name in overrides:
+            return overrides[name]
+        time.sleep(0.5)
+        return {name: True}
+    return respond
+
+
+def validate(client, **options):
+    return agent_2_validate_stimulus_individual(
+        client, {"word": "x"}, "design", CRITERIA, concurrent=True, **options)
+
+
+def test_all_criteria_are_checked_at_once(fake_client):
+    client = fake_client(verdicts(fast_fail={"fast_fail": True}))
+    start = time.perf_counter()
+    assert validate(client) == {"fast_fail": True, "slow_a": True, "slow_b": True}
+    assert time.perf_counter() - start < 1.0
+    # the two slow checks overlapped
+    assert client.max_in_flight >= 2
+
+
+def test_first_failure_rejects_without_waiting(fake_client):
+    messages = []
+    client = fake_client(verdicts(fast_fail={"fast_fail": False}))
+    start = time.perf_counter()
+    result = validate(client, websocket_callback=lambda message_type, message: messages.append(message))
+    assert result == {"fast_fail": False}
+    assert time.perf_counter() - start < 0.4
+    assert any(message.startswith("Early rejection: Criterion fast_fail failed. Cancelling 2")
+               for message in messages)
+
+
+def test_missing_verdict_counts_as_failure(fake_client):
+    result = validate(fake_client(verdicts(fast_fail={})))
+    assert result == {"fast_fail": False}
+
+
+def test_errors_reject_the_stimulus(fake_client):
+    result = validate(fake_client(verdicts(fast_fail={"error": "down"})))
+    assert result == {"error": "Failed to validate criterion fast_fail: down"}
+
+
+def test_sequential_validation_stops_at_the_first_failure(fake_client):
+    client = fake_client(verdicts(fast_fail={"fast_fail": False}))
+    result = agent_2_validate_stimulus_individual(client, {"word": "x"}, "design", CRITERIA)
+    assert result == {"fast_fail": False}
+    assert len(client.prompts) == 1
@@ -0,0 +1,113 @@
+import asyncio
+import socket
+import threading
+import time
+
+from stimulus_generator.async_backend import AsyncCustomModelClient
+from stimulus_generator.circuit_breaker import get_circuit_breaker
+from stimulus_generator.hedging import (LatencyTracker, request_kind, response_outcome,
+                                        run_hedged, run_hedged_async)
+
+
+def ok(status_code=200):
+    return {"status_code": status_code, "headers": {}, "json": {}, "text": ""}
+
+
+def warmed_tracker(latency=0.01, samples=20):
+    tracker = LatencyTracker("test")
+    for _ in range(samples):
+        tracker.count_request()
+        tracker.record(latency)
+    return tracker
+
+
+def test_request_kind():
+    assert request_kind({"a": {"type": "boolean"}}) == "validator"
+    assert request_kind({"a": {"type": "integer"}, "b": {"type": "number"}}) == "scorer"
+    assert request_kind({"a": {"type": "string"}}) == "generator"
+
+
+def test_response_outcome():
+    assert response_outcome(ok()) == "success"
+    assert response_outcome(ok(429)) == "rate_limited"
+    assert response_outcome(ok(503)) == "server_error"
+    assert response_outcome(ok(400)) == "error"
+    assert response_outcome({"error": "API call timed out after 60 seconds"}) == "timeout"
+
+
+def test_no_hedge_without_enough_samples():
+    tracker = LatencyTracker("test")
+    calls = []
+
+    def call(cancel_event, hedged):
+        calls.append(hedged)
+        return ok()
+
+    assert run_hedged(call, tracker) == ok()
+    assert calls == [False]
+
+
+def test_slow_request_is_hedged_and_both_latencies_recorded():
+    tracker = warmed_tracker()
+    finished = threading.Event()
+
+    def call(cancel_event, hedged):
+        if hedged:
+            return ok()
+        # the slow primary still answers after losing the race
+        time.sleep(0.3)
+        finished.set()
+        return ok()
+
+    assert run_hedged(call, tracker, budget=1.0) == ok()
+    assert finished.wait(2)
+    time.sleep(0.05)
+    stats = tracker.get_stats()
+    assert stats["hedged"] == 1
+    assert stats["hedge_wins"] == 1
+    # the winner's and the loser's latency
+    assert stats["samples"] == 22
+
+
+def test_budget_limits_hedges():
+    tracker = warmed_tracker()
+
+    def call(cancel_event, hedged):
+        time.sleep(0.1)
+        return ok()
+
+    run_hedged(call, tracker, budget=0.0)
+    assert tracker.get_stats()["budget_denied"] == 1
+
+
+def test_async_hedge_wins_and_loser_is_cancelled():
+    tracker = warmed_tracker()
+    cancelled = []
+
+    async def make_call(hedged):
+        if hedged:
+            return ok()
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return ok()
+
+    assert asyncio.run(run_hedged_async(make_call, tracker, budget=1.0)) == ok()
+    assert cancelled == [True]
+    assert tracker.get_stats()["hedge_wins"] == 1
+
+
+def test_async_hedged_connection_errors_reach_the_circuit_breaker():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    api_url = f"http://127.0.0.1:{port}/v1/chat/completions"
+    client = AsyncCustomModelClient(api_url, "key", "model")
+    client.hedge_requests = True
+    client.adaptive_concurrency = False
+
+    result = asyncio.run(client.generate_completion("prompt", {"a": {"type": "string"}}))
+    assert "connection error after 3 attempts" in result["error"]
+    assert get_circuit_breaker(f"http://127.0.0.1:{port}").get_stats()["failures"] == 3
@@ -0,0 +1,79 @@
+from collections import Counter
+
+import pytest
+
+from stimulus_generator.load_balancer import (MEMBER_FAILURE_THRESHOLD, BalancerMember,
+                                              EndpointBalancer)
+
+
+def make_balancer(*weights, strategy="least_outstanding"):
+    members = [BalancerMember(None, f"m{i}", f"http://balancer-test-{i}.invalid", weight)
+               for i, weight in enumerate(weights)]
+    return EndpointBalancer(members, strategy)
+
+
+def test_configuration_is_validated():
+    with pytest.raises(ValueError):
+        EndpointBalancer([])
+    with pytest.raises(ValueError):
+        make_balancer(1, strategy="random")
+
+
+def test_sequential_requests_are_weighted_round_robin():
+    balancer = make_balancer(1, 2)
+    picks = Counter()
+    for _ in range(30):
+        member = balancer.acquire()
+        picks[member.name] += 1
+        balancer.release(member, 0.1, True)
+    assert picks == {"m0": 10, "m1": 20}
+
+
+def test_least_outstanding_member_is_picked():
+    balancer = make_balancer(1, 1, 1)
+    first = balancer.acquire()
+    second = balancer.acquire()
+    third = balancer.acquire()
+    assert {first.name, second.name, third.name} == {"m0", "m1", "m2"}
+    balancer.release(second, 0.1, True)
+    assert balancer.acquire() is second
+
+
+def test_latency_strategy_prefers_the_faster_member():
+    balancer = make_balancer(1, 1, strategy="latency")
+    slow, fast = balancer.members
+    balancer.release(balancer.acquire(), 1.0, True)
+    balancer.release(balancer.acquire(), 0.1, True)
+    assert slow.latency == 1.0 and fast.latency == 0.1
+    assert balancer.acquire() is fast
+    # queued requests make the fast member's expected latency grow: with 9 outstanding
+    # it matches the idle slow member
+    picks = [balancer.acquire().name for _ in range(9)]
+    assert picks == ["m1"] * 8 + ["m0"]
+
+
+def test_failing_member_is_taken_out_of_rotation():
+    balancer = make_balancer(1, 1)
+    bad = balancer.members[0]
+    message = None
+    for _ in range(MEMBER_FAILURE_THRESHOLD):
+        message = balancer.release(balancer.acquire(exclude=("m1",)), 0.1, False)
+    assert "m0 failed" in message
+    assert not balancer.get_stats()["m0"]["healthy"]
+    assert all(balancer.acquire() is not bad for _ in range(5))
+    # when nothing else is left, the down member still gets the request
+    assert balancer.acquire(exclude=("m1",)) is bad
+
+
+def test_abandoned_requests_do_not_count():
+    balancer = make_balancer(1)
+    member = balancer.acquire()
+    assert balancer.release(member, None, None) is None
+    assert member.outstanding == 0
+    assert member.failures == 0
+    assert member.latency is None
+
+
+def test_all_members_excluded():
+    balancer = make_balancer(1, 1)
+    assert balancer.acquire(exclude=("m0", "m1")) is None
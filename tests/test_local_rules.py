@@ -0,0 +1,80 @@
+import pytest
+
+from stimulus_generator.local_rules import LocalRuleValidator
+
+
+def check(rule, stimulus):
+    results, reasons = LocalRuleValidator({"rule": rule}).check(stimulus)
+    return results["rule"], reasons.get("rule")
+
+
+def test_required_keys():
+    rule = {"required_keys": ["sentence", "target_word"]}
+    assert check(rule, {"sentence": "A cat.", "target_word": "cat"}) == (True, None)
+    assert check(rule, {"sentence": "A cat.", "target_word": " "}) == (
+        False, "target_word is missing or empty")
+
+
+def test_word_and_length_limits():
+    rule = {"field": "sentence", "min_words": 3, "max_words": 5, "max_length": 30}
+    assert check(rule, {"sentence": "The cat sat down."})[0]
+    assert check(rule, {"sentence": "Cat sat."})[1] == "sentence has 2 words (minimum 3)"
+    assert check(rule, {"sentence": "The cat sat down on the mat."})[1] == \
+        "sentence has 7 words (maximum 5)"
+    assert "characters (maximum 30)" in check(
+        rule, {"sentence": "Extraordinarily unbelievable circumstances."})[1]
+
+
+def test_patterns_ignore_case_by_default():
+    assert check({"field": "word", "pattern": "^[a-z]+$"}, {"word": "Cat"})[0]
+    assert not check({"field": "word", "pattern": "^[a-z]+$", "case_sensitive": True},
+                     {"word": "Cat"})[0]
+    assert not check({"field": "word", "forbidden_pattern": "dog"}, {"word": "DOG"})[0]
+
+
+def test_field_comparisons():
+    stimulus = {"sentence": "The Cat sat.", "target_word": "cat", "other": "dog"}
+    assert check({"field": "sentence", "contains_field": "target_word"}, stimulus)[0]
+    assert check({"field": "target_word", "equals_field": "target_word"}, stimulus)[0]
+    assert check({"field": "target_word", "differs_from_field": "other"}, stimulus)[0]
+    assert check({"field": "other", "contains_field": "target_word"}, stimulus) == (
+        False, "other does not contain target_word")
+    assert check({"field": "sentence", "contains_field": "missing"}, stimulus) == (
+        False, "missing is missing")
+
+
+def test_rules_without_field_check_every_text_value():
+    rule = {"max_words": 2}
+    assert check(rule, {"a": "one two", "b": "three"})[0]
+    assert check(rule, {"a": "one two", "b": "three four five"})[1] == \
+        "b has 3 words (maximum 2)"
+
+
+def test_non_dict_stimuli_fail_every_rule():
+    assert check({"non_empty": True}, "ERROR") == (False, "stimulus is not an object")
+
+
+def test_model_properties_excludes_local_rules():
+    validator = LocalRuleValidator({"complete": {"required_keys": ["sentence"]}})
+    properties = {"complete": "All keys present.", "grammatical": "Grammatical."}
+    assert validator.model_properties(properties) == {"grammatical": "Grammatical."}
+
+
+def test_stats_count_rejections_per_rule():
+    validator = LocalRuleValidator({"complete": {"required_keys": ["sentence"]},
+                                    "short": {"max_words": 2}})
+    validator.check({"sentence": "one two three"})
+    validator.check({"sentence": "one"})
+    assert validator.get_stats() == {
+        "checks": 2, "rejections": 1, "failures": {"complete": 0, "short": 1}}
+
+
+@pytest.mark.parametrize("rules", [
+    {"rule": "min_words 3"},
+    {"rule": {"field": "sentence", "min_word": 3}},
+    {"rule": {"field": "sentence"}},
+    {"rule": {"field": "sentence", "pattern": "("}},
+])
+def test_invalid_rules_are_rejected(rules):
+    with pytest.raises(ValueError):
+        LocalRuleValidator(rules)
@@ -0,0 +1,59 @@
+import pytest
+
+from stimulus_generator.near_duplicates import NearDuplicateIndex
+
+
+def test_finds_trivial_rewordings():
+    index = NearDuplicateIndex(threshold=0.8)
+    index.add({"sentence": "The cat sat on the mat."})
+    field, similarity = index.find_duplicate({"sentence": "the cat sat on the mats!"})
+    assert field == "sentence"
+    assert similarity >= 0.8
+
+
+def test_threshold_decides_what_counts_as_duplicate():
+    original = {"sentence": "The quick brown fox jumps over the lazy dog."}
+    candidate = {"sentence": "The quick brown fox leaps over the lazy cat."}
+    strict = NearDuplicateIndex(threshold=0.95)
+    loose = NearDuplicateIndex(threshold=0.3)
+    strict.add(original)
+    loose.add(original)
+    assert strict.find_duplicate(candidate) is None
+    assert loose.find_duplicate(candidate) is not None
+
+
+def test_unrelated_values_are_not_duplicates():
+    index = NearDuplicateIndex(threshold=0.8)
+    index.add({"sentence": "The cat sat on the mat."})
+    assert index.find_duplicate({"sentence": "Stock markets fell sharply on Monday."}) is None
+
+
+def test_values_are_compared_within_the_same_field():
+    index = NearDuplicateIndex(threshold=0.8)
+    index.add({"supportive_context": "The cat sat on the mat."})
+    assert index.find_duplicate({"neutral_context": "The cat sat on the mat."}) is None
+
+
+def test_fields_restricts_the_checked_fields():
+    index = NearDuplicateIndex(threshold=0.8, fields=["sentence"])
+    index.add({"sentence": "A", "target_word": "mathematics"})
+    assert index.find_duplicate({"sentence": "B", "target_word": "mathematics"}) is None
+
+
+def test_word_shingles():
+    index = NearDuplicateIndex(threshold=0.5, ngram=2, shingles="word")
+    index.add({"sentence": "the cat sat on the mat"})
+    assert index.find_duplicate({"sentence": "The cat sat on the mat today"}) is not None
+
+
+@pytest.mark.parametrize("options", [
+    {"threshold": 0},
+    {"threshold": 1.5},
+    {"threshold": "high"},
+    {"ngram": 0},
+    {"ngram": "x"},
+    {"shingles": "sentence"},
+])
+def test_invalid_settings_are_rejected(options):
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(**options)
@@ -0,0 +1,33 @@
+import pytest
+
+from stimulus_generator.backend import generate_stimuli
+
+
+def test_parallel_workers_accept_exactly_the_requested_number(make_settings):
+    messages = []
+    df, _ = generate_stimuli(make_settings(
+        iterations=7, parallel_workers=3,
+        websocket_callback=lambda message_type, message: messages.append(message)))
+    assert len(df) == 7
+    assert sorted(df["stimulus_id"]) == list(range(1, 8))
+    assert not df["error_occurred"].any()
+    assert "Starting parallel generation with 3 workers..." in messages
+    # no stimulus was accepted twice
+    assert len({str(content) for content in df["stimulus_content"]}) == 7
+
+
+@pytest.mark.mock_profile(boolean_true_rate=0.8, seed=1)
+def test_rejections_do_not_change_the_count(make_settings):
+    settings = make_settings(iterations=6, parallel_workers=4)
+    df, _ = generate_stimuli(settings)
+    assert len(df) == 6
+    assert settings['current_iteration'].value == 6
+
+
+def test_workers_are_capped_at_the_number_of_stimuli(make_settings):
+    messages = []
+    df, _ = generate_stimuli(make_settings(
+        iterations=2, parallel_workers=8,
+        websocket_callback=lambda message_type, message: messages.append(message)))
+    assert len(df) == 2
+    assert "Starting parallel generation with 2 workers..." in messages
@@ -0,0 +1,76 @@
+import threading
+import time
+
+import pytest
+
+from stimulus_generator.backend import generate_stimuli
+from stimulus_generator.pipeline import PipelineStage, StagePipeline
+
+
+def test_items_flow_through_every_stage():
+    produced = []
+    results = []
+    lock = threading.Lock()
+
+    def source(_):
+        with lock:
+            produced.append(len(produced))
+            return [produced[-1]]
+
+    pipeline = StagePipeline([
+        PipelineStage("source", source),
+        PipelineStage("double", lambda item: [item * 2], workers=2),
+        PipelineStage("sink", lambda item: results.append(item)),
+    ])
+    stats = pipeline.run(lambda: len(results) >= 10)
+    assert len(results) >= 10
+    assert set(results) <= {item * 2 for item in produced}
+    assert stats["double"]["workers"] == 2
+    assert stats["sink"]["processed"] >= 10
+
+
+def test_full_queues_block_the_source():
+    def sink(item):
+        time.sleep(0.05)
+
+    pipeline = StagePipeline([
+        PipelineStage("source", lambda _: [1]),
+        PipelineStage("sink", sink),
+    ], queue_size=1)
+    stats = pipeline.run(lambda: pipeline.stages[1].processed >= 5)
+    # the source waited for the slow sink instead of running ahead
+    assert stats["source"]["emitted"] <= stats["sink"]["processed"] + 3
+    assert stats["source"]["blocked_seconds"] > 0
+
+
+def test_stage_errors_are_raised():
+    def fail(item):
+        raise ValueError("boom")
+
+    pipeline = StagePipeline([
+        PipelineStage("source", lambda _: [1]),
+        PipelineStage("sink", fail),
+    ])
+    with pytest.raises(ValueError):
+        pipeline.run(lambda: False)
+
+
+def test_stop_event_ends_the_run():
+    stop_event = threading.Event()
+    threading.Timer(0.2, stop_event.set).start()
+    pipeline = StagePipeline([PipelineStage("source", lambda _: time.sleep(0.01))],
+                             stop_event=stop_event)
+    pipeline.run(lambda: False)
+    assert stop_event.is_set()
+
+
+@pytest.mark.mock_profile(boolean_true_rate=0.8, seed=1)
+def test_pipelined_generation_accepts_exactly_the_requested_number(make_settings):
+    settings = make_settings(iterations=6, pipeline=True, pipeline_generators=2,
+                             pipeline_validators=2, pipeline_scorers=2)
+    df, _ = generate_stimuli(settings)
+    assert len(df) == 6
+    assert sorted(df["stimulus_id"]) == list(range(1, 7))
+    assert {"predictability", "naturalness"} <= set(df.columns)
+    assert len({str(content) for content in df["stimulus_content"]}) == 6
+    assert settings['current_iteration'].value == 6
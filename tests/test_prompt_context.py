@@ -0,0 +1,83 @@
+import random
+
+import pytest
+
+from stimulus_generator import backend
+from stimulus_generator.backend import generate_stimuli
+from stimulus_generator.prompt_context import (CONTEXT_POLICIES, PromptContextPolicy,
+                                               estimate_stimulus_tokens)
+
+SEEDS = [{"word": f"seed{i}"} for i in range(2)]
+ACCEPTED = [{"word": f"accepted{i:02d}"} for i in range(20)]
+STIMULI = SEEDS + ACCEPTED
+
+
+def policy(name, **options):
+    return PromptContextPolicy(name, seed_count=len(SEEDS), rng=random.Random(0), **options)
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        PromptContextPolicy("newest")
+
+
+def test_all_lists_every_stimulus():
+    assert policy("all", size=3).select(STIMULI) == STIMULI
+
+
+def test_last_keeps_the_most_recent():
+    assert policy("last", size=3).select(STIMULI) == SEEDS + ACCEPTED[-3:]
+    assert policy("last", size=0).select(STIMULI) == SEEDS
+
+
+def test_random_samples_in_history_order():
+    chosen = policy("random", size=5).select(STIMULI)[len(SEEDS):]
+    assert len(chosen) == 5
+    assert all(stimulus in ACCEPTED for stimulus in chosen)
+    assert chosen == sorted(chosen, key=ACCEPTED.index)
+    assert policy("random", size=50).select(STIMULI) == STIMULI
+
+
+def test_stratified_takes_one_from_each_slice():
+    chosen = policy("stratified", size=4).select(STIMULI)[len(SEEDS):]
+    indices = [ACCEPTED.index(stimulus) for stimulus in chosen]
+    assert [index // 5 for index in indices] == [0, 1, 2, 3]
+    assert policy("stratified", size=50).select(STIMULI) == STIMULI
+
+
+def test_token_budget_keeps_the_most_recent_that_fit():
+    per_stimulus = estimate_stimulus_tokens(ACCEPTED[0])
+    seed_tokens = sum(estimate_stimulus_tokens(seed) for seed in SEEDS)
+    chosen = policy("token_budget", token_budget=seed_tokens + 3 * per_stimulus + 1).select(STIMULI)
+    assert chosen == SEEDS + ACCEPTED[-3:]
+
+
+def test_pinned_seeds_can_be_limited():
+    assert policy("last", size=1, max_pinned=1).select(STIMULI) == SEEDS[:1] + ACCEPTED[-1:]
+
+
+@pytest.mark.parametrize("name", CONTEXT_POLICIES)
+def test_every_policy_keeps_the_seeds_first(name):
+    chosen = policy(name, size=4, token_budget=40).select(STIMULI)
+    assert chosen[:len(SEEDS)] == SEEDS
+    assert all(stimulus in STIMULI for stimulus in chosen)
+    if name == "token_budget":
+        assert sum(estimate_stimulus_tokens(stimulus) for stimulus in chosen) <= 40
+    elif name != "all":
+        assert len(chosen) == len(SEEDS) + 4
+
+
+def test_generator_prompts_use_the_policy(make_settings, monkeypatch):
+    context_sizes = []
+    generate = backend.agent_1_generate_stimulus
+
+    def recording_generate(*args, **kwargs):
+        context_sizes.append(len(kwargs["previous_stimuli"]))
+        return generate(*args, **kwargs)
+
+    monkeypatch.setattr(backend, "agent_1_generate_stimulus", recording_generate)
+    df, _ = generate_stimuli(make_settings(iterations=4, context_policy="last", context_size=1))
+    assert len(df) == 4
+    # the seed stimulus plus at most the last accepted one
+    assert context_sizes[0] == 1
+    assert max(context_sizes) == 2
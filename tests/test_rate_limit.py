@@ -0,0 +1,96 @@
+import asyncio
+import time
+
+import pytest
+
+from stimulus_generator.async_backend import AsyncOpenAIClient
+from stimulus_generator.backend import OpenAIClient
+from stimulus_generator.rate_limit import (RequestScheduler, TokenBucket, parse_reset_duration,
+                                           parse_retry_after)
+
+KEY = "http://api.test#key"
+
+
+def test_parse_reset_duration():
+    assert parse_reset_duration("1s") == 1.0
+    assert parse_reset_duration("6m0s") == 360.0
+    assert parse_reset_duration("20ms") == pytest.approx(0.02)
+    assert parse_reset_duration("0.5") == 0.5
+    assert parse_reset_duration("soon") is None
+
+
+def test_parse_retry_after():
+    assert parse_retry_after({"retry-after": "2"}) == 2.0
+    assert parse_retry_after({"retry-after-ms": "1500", "retry-after": "9"}) == 1.5
+    assert parse_retry_after({}) is None
+
+
+def test_token_bucket_refills_at_its_rate():
+    bucket = TokenBucket(60)
+    now = bucket.updated
+    assert bucket.wait_time(60, now) == 0.0
+    bucket.consume(60, now)
+    assert bucket.wait_time(1, now) == pytest.approx(1.0)
+    assert bucket.wait_time(1, now + 0.5) == pytest.approx(0.5)
+    # requests bigger than the bucket wait for a full bucket
+    assert bucket.wait_time(120, now + 0.5) == pytest.approx(59.5)
+
+
+def test_requests_beyond_the_budget_wait():
+    scheduler = RequestScheduler()
+    scheduler.configure(KEY, rpm=600)
+    for _ in range(600):
+        scheduler.acquire(KEY)
+    start = time.perf_counter()
+    assert scheduler.acquire(KEY)
+    # one request refills every 0.1s
+    assert time.perf_counter() - start >= 0.05
+
+
+def test_retry_after_pauses_the_key():
+    scheduler = RequestScheduler()
+    scheduler.record_response(KEY, 429, {"Retry-After": "0.3"})
+    stats = scheduler.get_stats()[KEY]
+    assert stats["rate_limited"] == 1
+    assert 0.2 < stats["paused_for_seconds"] <= 0.3
+    start = time.perf_counter()
+    assert asyncio.run(scheduler.acquire_async(KEY))
+    assert time.perf_counter() - start >= 0.2
+
+
+def test_advertised_limits_are_adopted():
+    scheduler = RequestScheduler()
+    scheduler.record_response(KEY, 200, {"x-ratelimit-limit-requests": "500",
+                                         "x-ratelimit-limit-tokens": "30000",
+                                         "x-ratelimit-remaining-requests": "0",
+                                         "x-ratelimit-reset-requests": "2s"})
+    stats = scheduler.get_stats()[KEY]
+    assert stats["rpm"] == 500
+    assert stats["tpm"] == 30000
+    assert 1.5 < stats["paused_for_seconds"] <= 2
+
+
+def test_configured_limits_win_over_advertised_ones():
+    scheduler = RequestScheduler()
+    scheduler.configure(KEY, rpm=60)
+    scheduler.record_response(KEY, 200, {"x-ratelimit-limit-requests": "500"})
+    assert scheduler.get_stats()[KEY]["rpm"] == 60
+
+
+def test_openai_clients_pass_the_response_headers_on(mock_server):
+    _, api_url = mock_server
+    api_base = api_url[:-len("/chat/completions")]
+    properties = {"word": {"type": "string"}}
+
+    client = OpenAIClient("mock-key")
+    client.API_BASE = api_base
+    response = client._api_call("prompt", properties, {"model": "mock-model"}, "mock-key")
+    assert response["status_code"] == 200
+    assert "Content-Type" in response["headers"]
+    assert "word" in response["json"]["choices"][0]["message"]["content"]
+
+    async_client = AsyncOpenAIClient("mock-key")
+    async_client.API_BASE = api_base
+    response = asyncio.run(async_client._api_call("prompt", properties, {"model": "mock-model"}))
+    assert response["status_code"] == 200
+    assert "Content-Type" in response["headers"]
@@ -0,0 +1,68 @@
+import sqlite3
+
+import pytest
+
+from stimulus_generator import rejection_cache
+from stimulus_generator.rejection_cache import RejectionCache, get_rejection_cache
+
+
+def test_lookup_ignores_case_and_whitespace():
+    cache = RejectionCache()
+    cache.add({"sentence": "The cat  sat."}, ["grammatical"])
+    assert cache.lookup({"sentence": " the CAT sat. "}) == ["grammatical"]
+    assert cache.lookup({"sentence": "The dog sat."}) is None
+    assert cache.get_stats()["hits"] == 1
+
+
+def test_only_rejections_with_failed_criteria_are_added():
+    cache = RejectionCache()
+    cache.add({"sentence": "ok"}, [])
+    cache.add("not a stimulus", ["grammatical"])
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_memory_entries_are_bounded():
+    cache = RejectionCache(max_entries=2)
+    for index in range(3):
+        cache.add({"sentence": f"s{index}"}, ["grammatical"])
+    assert cache.lookup({"sentence": "s0"}) is None
+    assert cache.lookup({"sentence": "s2"}) == ["grammatical"]
+
+
+def test_sqlite_table_is_pruned(tmp_path, monkeypatch):
+    monkeypatch.setattr(rejection_cache, "PRUNE_INTERVAL", 5)
+    path = str(tmp_path / "rejections.sqlite3")
+    cache = RejectionCache(max_entries=3, path=path, design="design")
+    other = RejectionCache(max_entries=3, path=path, design="other")
+    other.add({"sentence": "kept"}, ["grammatical"])
+
+    def rows(design):
+        with sqlite3.connect(path) as conn:
+            return conn.execute("SELECT COUNT(*) FROM rejections WHERE design = ?",
+                                (design,)).fetchone()[0]
+
+    for index in range(4):
+        cache.add({"sentence": f"s{index}"}, ["grammatical"])
+    # not pruned before PRUNE_INTERVAL writes
+    assert rows("design") == 4
+    cache.add({"sentence": "s4"}, ["grammatical"])
+    assert rows("design") == 3
+    # other designs keep their entries
+    assert rows("other") == 1
+
+    reloaded = RejectionCache(max_entries=3, path=path, design="design")
+    assert reloaded.lookup({"sentence": "s4"}) == ["grammatical"]
+    assert reloaded.lookup({"sentence": "s0"}) is None
+
+
+def test_design_scope_shares_the_cache():
+    first = get_rejection_cache("design A", {"grammatical": "..."}, scope="design")
+    second = get_rejection_cache("design A", {"grammatical": "..."}, scope="design")
+    assert first is second
+    assert get_rejection_cache("design B", {"grammatical": "..."}, scope="design") is not first
+    assert get_rejection_cache("design A", {"grammatical": "..."}, scope="run") is not first
+
+
+def test_unknown_scope_is_rejected():
+    with pytest.raises(ValueError):
+        get_rejection_cache("design", {}, scope="global")
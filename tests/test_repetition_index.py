@@ -0,0 +1,64 @@
+import random
+import threading
+
+from stimulus_generator.backend import AcceptedStimuli, RepetitionIndex, check_stimulus_repetition
+
+WORDS = ["Apple", "apple", "Pear", "PLUM", "plum", "fig", "Kiwi", "lime", "Lime", "date"]
+
+
+def random_stimulus(rng):
+    stimulus = {"word": rng.choice(WORDS), "context": f"{rng.choice(WORDS)} {rng.randrange(30)}"}
+    if rng.random() < 0.3:
+        stimulus["extra"] = rng.choice(WORDS)
+    return stimulus
+
+
+def test_same_verdict_as_the_linear_scan():
+    rng = random.Random(0)
+    previous = []
+    index = RepetitionIndex()
+    repetitions = 0
+    for _ in range(500):
+        candidate = random_stimulus(rng)
+        verdict = index.is_repetition(candidate)
+        assert verdict == check_stimulus_repetition(candidate, previous)
+        repetitions += verdict
+        if rng.random() < 0.2:
+            previous.append(candidate)
+            index.add(candidate)
+    # both outcomes were exercised
+    assert 0 < repetitions < 500
+
+
+def test_repetition_is_per_dimension_and_case_insensitive():
+    index = RepetitionIndex([{"word": "Apple", "context": "red"}])
+    assert index.is_repetition({"word": "APPLE", "context": "green"})
+    # the same value in another dimension is not a repetition
+    assert not index.is_repetition({"word": "red", "context": "apple"})
+    assert not index.is_repetition({"other": "apple"})
+    assert not RepetitionIndex().is_repetition({"word": "Apple"})
+
+
+def test_non_string_values_are_compared_as_text():
+    index = RepetitionIndex([{"count": 3}])
+    assert index.is_repetition({"count": "3"})
+    assert not index.is_repetition({"count": 4})
+
+
+def test_concurrent_acceptance_admits_each_value_once():
+    stimuli = []
+    accepted = AcceptedStimuli(stimuli)
+    results = []
+
+    def accept():
+        results.append(accepted.try_accept({"word": "same"}))
+
+    threads = [threading.Thread(target=accept) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results.count(True) == 1
+    assert stimuli == [{"word": "same"}]
+    assert accepted.try_accept({"word": "same"}, allow_repetition=True)
+    assert len(accepted.snapshot()) == 2
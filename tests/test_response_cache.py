@@ -0,0 +1,114 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from stimulus_generator import response_cache
+from stimulus_generator.response_cache import ResponseCache, get_response_cache, make_cache_key
+
+
+@pytest.fixture
+def cache():
+    return ResponseCache(":memory:")
+
+
+def test_key_is_stable_and_covers_every_input():
+    key = make_cache_key("model", "prompt", {"a": {"type": "string"}, "b": {"type": "integer"}},
+                         {"temperature": 0})
+    # dict order does not matter
+    assert key == make_cache_key("model", "prompt", {"b": {"type": "integer"}, "a": {"type": "string"}},
+                                 {"temperature": 0})
+    assert make_cache_key("model", "prompt", {}, None) == make_cache_key("model", "prompt", {}, {})
+    assert key != make_cache_key("other", "prompt", {"a": {"type": "string"}, "b": {"type": "integer"}},
+                                 {"temperature": 0})
+    assert key != make_cache_key("model", "prompt!", {"a": {"type": "string"}, "b": {"type": "integer"}},
+                                 {"temperature": 0})
+    assert key != make_cache_key("model", "prompt", {"a": {"type": "string"}, "b": {"type": "integer"}},
+                                 {"temperature": 1})
+
+
+def test_expired_entries_are_not_returned():
+    cache = ResponseCache(":memory:", ttl_seconds=0.1)
+    cache.put("key", {"a": 1})
+    assert cache.get("key") == {"a": 1}
+    time.sleep(0.15)
+    assert cache.get("key") is None
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_least_recently_used_entries_are_evicted(monkeypatch):
+    monkeypatch.setattr(response_cache, "EVICTION_INTERVAL", 1)
+    cache = ResponseCache(":memory:", max_entries=2)
+    cache.put("first", {"n": 1})
+    time.sleep(0.01)
+    cache.put("second", {"n": 2})
+    time.sleep(0.01)
+    assert cache.get("first") == {"n": 1}
+    cache.put("third", {"n": 3})
+    assert cache.get("second") is None
+    assert cache.get("first") == {"n": 1}
+    assert cache.get("third") == {"n": 3}
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_hits_do_not_write(cache):
+    cache.put("key", {"a": 1})
+    changes = cache._conn.total_changes
+    for _ in range(5):
+        assert cache.get("key") == {"a": 1}
+    assert cache._conn.total_changes == changes
+
+
+def test_errors_are_not_cached(cache):
+    key = make_cache_key("model", "prompt", {}, None)
+    assert cache.get_or_compute(key, lambda: {"error": "boom"}) == {"error": "boom"}
+    assert cache.get_or_compute(key, lambda: {"a": 1}) == {"a": 1}
+    assert cache.get_or_compute(key, lambda: {"a": 2}) == {"a": 1}
+
+
+def test_concurrent_identical_requests_are_coalesced(cache):
+    calls = []
+
+    def compute():
+        calls.append(True)
+        time.sleep(0.2)
+        return {"a": 1}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("key", compute)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [{"a": 1}] * 5
+    assert len(calls) == 1
+    stats = cache.get_stats()
+    assert stats["misses"] == 1
+    assert stats["coalesced"] == 4
+
+
+def test_concurrent_identical_async_requests_are_coalesced(cache):
+    calls = []
+
+    async def compute():
+        calls.append(True)
+        await asyncio.sleep(0.1)
+        return {"a": 1}
+
+    async def main():
+        return await asyncio.gather(*(cache.get_or_compute_async("key", compute) for _ in range(5)))
+
+    assert asyncio.run(main()) == [{"a": 1}] * 5
+    assert len(calls) == 1
+    assert cache.get_stats()["coalesced"] == 4
+
+
+def test_process_wide_caches_are_keyed_on_options(tmp_path):
+    path = str(tmp_path / "responses.sqlite3")
+    assert get_response_cache(path) is get_response_cache(path)
+    short = get_response_cache(path, ttl_seconds=60)
+    assert short is not get_response_cache(path)
+    assert short.ttl_seconds == 60
+    assert short is get_response_cache(path, ttl_seconds=60)
@@ -0,0 +1,46 @@
+from stimulus_generator.backend import agent_3_score_stimulus_individual, clamp_score
+
+ASPECTS = {name: {"type": "integer", "description": name, "minimum": 0, "maximum": 10}
+           for name in ("a", "b", "c", "d", "e", "f")}
+
+
+def score_all(prompt, properties):
+    name = next(iter(properties))
+    return {name: ord(name) - ord("a") + 5}
+
+
+def test_clamp_score():
+    aspect = {"minimum": 1, "maximum": 7}
+    assert clamp_score(9, aspect) == 7
+    assert clamp_score(-3, aspect) == 1
+    assert clamp_score(4.8, aspect) == 4
+    assert clamp_score(True, {"minimum": 0, "maximum": 10}) == 1
+    assert clamp_score("7", aspect) is None
+    assert clamp_score(None, aspect) is None
+
+
+def test_aspects_are_scored_concurrently_by_default(fake_client):
+    client = fake_client(score_all, delay=0.1)
+    scores = agent_3_score_stimulus_individual(client, {"s": "x"}, "design", ASPECTS)
+    assert scores == {"a": 5, "b": 6, "c": 7, "d": 8, "e": 9, "f": 10}
+    assert list(scores) == list(ASPECTS)
+    # bounded fan-out
+    assert client.max_in_flight == 4
+
+
+def test_concurrency_one_scores_serially(fake_client):
+    client = fake_client(score_all, delay=0.01)
+    scores = agent_3_score_stimulus_individual(
+        client, {"s": "x"}, "design", ASPECTS, max_concurrency=1)
+    assert scores["f"] == 10
+    assert client.max_in_flight == 1
+
+
+def test_errors_and_invalid_scores_count_as_zero(fake_client):
+    def respond(prompt, properties):
+        name = next(iter(properties))
+        return {"a": {"error": "down"}, "b": {"b": "high"}, "c": {}}.get(name, {name: 3})
+
+    scores = agent_3_score_stimulus_individual(
+        fake_client(respond), {"s": "x"}, "design", ASPECTS)
+    assert scores == {"a": 0, "b": 0, "c": 0, "d": 3, "e": 3, "f": 3}
@@ -0,0 +1,83 @@
+import os
+import threading
+import time
+
+import pytest
+
+from stimulus_generator.backend import CANCELLED_ERROR, TimeoutWorkerPool
+
+
+def fail():
+    raise ValueError("boom")
+
+
+@pytest.fixture
+def pool():
+    pool = TimeoutWorkerPool(max_workers=1)
+    yield pool
+    pool.shutdown()
+
+
+def test_workers_are_reused_across_calls(pool):
+    first = pool.run(os.getpid, (), {}, timeout_seconds=10)
+    second = pool.run(os.getpid, (), {}, timeout_seconds=10)
+    assert first == second != os.getpid()
+    stats = pool.get_stats()
+    assert stats["calls"] == 2
+    assert stats["workers_spawned"] == 1
+    assert stats["idle_workers"] == 1
+
+
+def test_timed_out_worker_is_killed_and_replaced(pool):
+    first = pool.run(os.getpid, (), {}, timeout_seconds=10)
+    result = pool.run(time.sleep, (10,), {}, timeout_seconds=0.3)
+    assert "timed out" in result["error"]
+    replacement = pool.run(os.getpid, (), {}, timeout_seconds=10)
+    assert isinstance(replacement, int) and replacement != first
+    stats = pool.get_stats()
+    assert stats["timeouts"] == 1
+    assert stats["workers_killed"] == 1
+    assert stats["workers_spawned"] == 2
+
+
+def test_errors_keep_the_worker(pool):
+    first = pool.run(os.getpid, (), {}, timeout_seconds=10)
+    assert "ValueError: boom" in pool.run(fail, (), {}, timeout_seconds=10)["error"]
+    assert pool.run(os.getpid, (), {}, timeout_seconds=10) == first
+    assert pool.get_stats()["errors"] == 1
+
+
+def test_cancel_returns_cancelled_error_and_kills_the_worker(pool):
+    cancel_event = threading.Event()
+    threading.Timer(0.2, cancel_event.set).start()
+    start = time.perf_counter()
+    result = pool.run(time.sleep, (10,), {}, timeout_seconds=10, cancel_event=cancel_event)
+    assert result == {"error": CANCELLED_ERROR}
+    assert time.perf_counter() - start < 2
+    stats = pool.get_stats()
+    assert stats["cancelled"] == 1
+    assert stats["workers_killed"] == 1
+
+
+def test_cancel_before_dispatch_does_not_take_a_worker(pool):
+    cancel_event = threading.Event()
+    cancel_event.set()
+    assert pool.run(os.getpid, (), {}, cancel_event=cancel_event) == {"error": CANCELLED_ERROR}
+    assert pool.get_stats()["workers_spawned"] == 0
+
+
+def test_cancel_while_waiting_for_a_worker(pool):
+    busy = threading.Thread(target=pool.run, args=(time.sleep, (1,), {}, 10))
+    busy.start()
+    time.sleep(0.2)
+    cancel_event = threading.Event()
+    threading.Timer(0.1, cancel_event.set).start()
+    start = time.perf_counter()
+    result = pool.run(os.getpid, (), {}, timeout_seconds=10, cancel_event=cancel_event)
+    assert result == {"error": CANCELLED_ERROR}
+    assert time.perf_counter() - start < 0.8
+    busy.join()
+    stats = pool.get_stats()
+    # the busy worker finished its call and was neither killed nor replaced
+    assert stats["workers_spawned"] == 1
+    assert stats["workers_killed"] == 0
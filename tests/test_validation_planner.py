@@ -0,0 +1,97 @@
+from stimulus_generator.backend import agent_2_validate_stimulus_individual
+from stimulus_generator.validation_planner import (MAX_AUTO_GROUP_SIZE, CriteriaStats,
+                                                   ValidationPlanner)
+
+CRITERIA = ["a", "b", "c", "d", "e"]
+
+
+def measured_planner(failure_rates, checks=100, adaptive_order=False):
+    stats = CriteriaStats()
+    for name, rate in failure_rates.items():
+        for check in range(checks):
+            stats.record(name, check >= rate * checks, 0.1)
+    return ValidationPlanner(stats, adaptive_order)
+
+
+def test_fixed_group_size_chunks_in_order():
+    planner = ValidationPlanner()
+    assert planner.plan_groups(CRITERIA, 2) == [["a", "b"], ["c", "d"], ["e"]]
+    assert planner.plan_groups(CRITERIA, 1) == [[name] for name in CRITERIA]
+    assert planner.plan_groups(CRITERIA, 10) == [CRITERIA]
+
+
+def test_unmeasured_criteria_are_checked_alone():
+    assert ValidationPlanner().plan_groups(CRITERIA) == [[name] for name in CRITERIA]
+
+
+def test_auto_groups_isolate_criteria_that_often_fail():
+    planner = measured_planner({"a": 0.0, "b": 0.3, "c": 0.0, "d": 0.6, "e": 0.0})
+    # the most failing one first, then the rarely failing ones bundled
+    assert planner.plan_groups(CRITERIA) == [["d"], ["b"], ["a", "c", "e"]]
+
+
+def test_auto_groups_are_capped():
+    names = [f"c{i}" for i in range(MAX_AUTO_GROUP_SIZE + 2)]
+    planner = measured_planner({name: 0.0 for name in names})
+    assert planner.plan_groups(names) == [names[:MAX_AUTO_GROUP_SIZE], names[MAX_AUTO_GROUP_SIZE:]]
+
+
+def test_grouped_validation_stops_at_the_first_failed_group(fake_client):
+    properties = {name: f"{name} holds." for name in CRITERIA}
+
+    def respond(prompt, group):
+        return {name: name != "c" for name in group}
+
+    client = fake_client(respond)
+    result = agent_2_validate_stimulus_individual(
+        client, {"word": "x"}, "design", properties, group_size=2)
+    assert result == {"a": True, "b": True, "c": False, "d": True}
+    # the group holding e was never sent
+    assert len(client.prompts) == 2
+
+
+def test_grouped_validation_passes_every_criterion(fake_client):
+    properties = {name: f"{name} holds." for name in CRITERIA}
+    client = fake_client(lambda prompt, group: {name: True for name in group})
+    result = agent_2_validate_stimulus_individual(
+        client, {"word": "x"}, "design", properties, group_size=3)
+    assert result == {name: True for name in CRITERIA}
+    assert len(client.prompts) == 2
+
+
+def test_order_is_unchanged_without_adaptive_order():
+    planner = measured_planner({"a": 0.0, "b": 0.9})
+    assert planner.order(["a", "b"]) == ["a", "b"]
+
+
+def test_adaptive_order_puts_likely_failures_first():
+    planner = measured_planner({"a": 0.05, "b": 0.5, "c": 0.2}, adaptive_order=True)
+    assert planner.order(["a", "b", "c"]) == ["b", "c", "a"]
+
+
+def test_adaptive_order_weighs_cost_against_failure_rate():
+    stats = CriteriaStats()
+    for check in range(100):
+        # fails twice as often but takes ten times as long
+        stats.record("slow", check >= 40, 1.0)
+        stats.record("fast", check >= 20, 0.1)
+    assert ValidationPlanner(stats, adaptive_order=True).order(["slow", "fast"]) == ["fast", "slow"]
+
+
+def test_adaptive_order_keeps_the_given_order_without_measurements():
+    assert ValidationPlanner(adaptive_order=True).order(CRITERIA) == CRITERIA
+
+
+def test_sequential_validation_follows_the_adaptive_order(fake_client):
+    properties = {name: f"{name} holds." for name in ("a", "b", "c")}
+    planner = measured_planner({"a": 0.0, "b": 0.0, "c": 0.8}, adaptive_order=True)
+    client = fake_client(lambda prompt, criterion: {name: name != "c" for name in criterion})
+    messages = []
+    result = agent_2_validate_stimulus_individual(
+        client, {"word": "x"}, "design", properties, planner=planner,
+        websocket_callback=lambda message_type, message: messages.append(message))
+    # rejected by the first request
+    assert result == {"c": False}
+    assert len(client.prompts) == 1
+    assert planner.calls_per_rejection() == 1
+    assert any(message.startswith("Criteria order: c (fails") for message in messages)
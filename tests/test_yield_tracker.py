@@ -0,0 +1,122 @@
+import pytest
+
+from stimulus_generator.backend import generate_stimuli
+from stimulus_generator.yield_tracker import RetryBudgetExceeded, YieldTracker
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        YieldTracker(policy="retry")
+
+
+def test_within_budget():
+    tracker = YieldTracker(max_iteration_attempts=3)
+    assert tracker.record("validation_fail", ["grammatical"]) == (None, None)
+    assert tracker.record("accepted") == (None, None)
+    assert tracker.counts["accepted"] == 1
+    assert tracker.acceptance_rate() == pytest.approx(2 / 4)
+
+
+def test_iteration_budget_ends_the_run_once():
+    tracker = YieldTracker(policy="partial", max_iteration_attempts=2)
+    tracker.record("repetition")
+    action, reason = tracker.record("error")
+    assert action == "partial"
+    assert "2 attempts without an accepted stimulus" in reason
+    assert tracker.exhausted
+    # attempts still in flight do not report the end of the run again
+    assert tracker.record("error") == ("partial", None)
+    assert tracker.record("accepted") == (None, None)
+
+
+def test_acceptance_resets_the_iteration_budget():
+    tracker = YieldTracker(max_iteration_attempts=2)
+    tracker.record("error")
+    tracker.record("accepted")
+    assert tracker.record("error") == (None, None)
+
+
+def test_iteration_budget_is_per_slot():
+    tracker = YieldTracker(max_iteration_attempts=2)
+    assert tracker.record("error", slot=0) == (None, None)
+    assert tracker.record("error", slot=1) == (None, None)
+    assert tracker.record("error", slot=1)[0] == "partial"
+
+
+def test_run_budget_aborts():
+    tracker = YieldTracker(policy="abort", max_iteration_attempts=None, max_run_attempts=3)
+    tracker.record("accepted")
+    tracker.record("error")
+    action, reason = tracker.record("error")
+    assert action == "abort"
+    assert "run budget of 3" in reason
+
+
+def test_projected_attempts_budget_waits_for_min_attempts():
+    tracker = YieldTracker(max_iteration_attempts=None, max_attempts_per_stimulus=3,
+                           min_attempts=5)
+    for _ in range(4):
+        assert tracker.record("validation_fail", ["grammatical"]) == (None, None)
+    action, reason = tracker.record("validation_fail", ["grammatical"])
+    assert action == "partial"
+    assert "projected attempts per accepted stimulus" in reason
+
+
+def test_relax_drops_the_most_failed_criterion():
+    tracker = YieldTracker(policy="relax", max_iteration_attempts=3)
+    tracker.record("validation_fail", ["grammatical", "contexts_valid"])
+    tracker.record("validation_fail", ["grammatical"])
+    action, reason = tracker.record("validation_fail", ["contexts_valid", "grammatical"])
+    assert action == "relax"
+    assert reason.endswith("no longer enforcing grammatical")
+    assert tracker.relaxed == ["grammatical"]
+    assert not tracker.exhausted
+    assert tracker.enforced(["grammatical", "contexts_valid"]) == ["contexts_valid"]
+    # the current stimulus starts a fresh budget
+    assert tracker.record("validation_fail", ["contexts_valid"]) == (None, None)
+
+
+def test_relax_without_criteria_left_ends_the_run():
+    tracker = YieldTracker(policy="relax", max_iteration_attempts=2)
+    tracker.record("error")
+    action, reason = tracker.record("error")
+    assert action == "partial"
+    assert "no criterion left to relax" in reason
+    assert tracker.exhausted
+
+
+def test_stats():
+    tracker = YieldTracker()
+    tracker.record("accepted")
+    tracker.record("repetition")
+    stats = tracker.get_stats()
+    assert stats["attempts"] == 2
+    assert stats["repetition"] == 1
+    assert stats["acceptance_rate"] == pytest.approx(0.5)
+    assert "1 accepted of 2 attempts" in tracker.describe()
+
+
+@pytest.mark.mock_profile(boolean_true_rate=0.7)
+def test_abort_keeps_the_stimuli_accepted_so_far(make_settings):
+    messages = []
+    df, filename = generate_stimuli(make_settings(
+        iterations=20, retry_policy="abort", max_run_attempts=10,
+        websocket_callback=lambda message_type, message: messages.append(message)))
+    assert 0 < len(df) < 20
+    assert df["error_occurred"].all()
+    assert df["error_message"].iloc[0].startswith("Retry budget exceeded")
+    assert not filename.endswith("_error.csv")
+    assert not any("Error in generation" in message for message in messages)
+
+
+@pytest.mark.mock_profile(boolean_true_rate=0.0)
+def test_abort_without_stimuli_raises(make_settings):
+    with pytest.raises(RetryBudgetExceeded):
+        generate_stimuli(make_settings(retry_policy="abort", max_iteration_attempts=3))
+
+
+@pytest.mark.mock_profile(boolean_true_rate=0.0)
+@pytest.mark.parametrize("mode", [{}, {"pipeline": True}, {"parallel_workers": 2}])
+def test_partial_ends_every_mode(make_settings, mode):
+    assert generate_stimuli(make_settings(
+        retry_policy="partial", max_iteration_attempts=3, **mode)) == (None, None)